@@ -0,0 +1,8 @@
+"""
+Zouti operasyon Nala Kredi Ti Machann (Python).
+
+Each module is a standalone tool that can be run with ``python -m nala_ops.<module>``.
+Database settings are read from the same DB_* variables as .env.example.
+"""
+
+__version__ = "0.1.0"
@@ -0,0 +1,114 @@
+"""
+Tès rapid API a (ansyen test-all-apis.py, test-superadmin-login.py,
+test-domain-authorization.py, test-domain-final.py).
+
+Credentials come from NALA_API_EMAIL / NALA_API_PASSWORD (or ``--email`` and a
+getpass prompt); they are no longer hardcoded. The JWT is cached in
+``.nala_ops/tokens.json`` and shared by every command of a ``nala-ops batch``;
+the password is only asked for when no valid token is cached.
+"""
+
+import argparse
+import getpass
+import os
+
+from nala_ops.auth import BRANCH_API_URL, DEFAULT_API_URL
+from nala_ops.context import Context
+
+ENDPOINTS = [
+    ("MicrocreditLoanApplication (Submitted)", "/api/MicrocreditLoanApplication?page=1&pageSize=1&status=Submitted"),
+    ("MicrocreditLoanApplication (Approved)", "/api/MicrocreditLoanApplication?page=1&pageSize=1&status=Approved"),
+    ("MicrocreditLoan (Active)", "/api/MicrocreditLoan?status=Active&pageSize=1000"),
+    ("MicrocreditLoan (Defaulted)", "/api/MicrocreditLoan?status=Defaulted&pageSize=1000"),
+    ("MicrocreditLoan (Overdue)", "/api/MicrocreditLoan?status=Overdue&pageSize=1000"),
+]
+
+
+def _parse(prog, argv, add_arguments=None):
+    parser = argparse.ArgumentParser(prog=f"nala-ops {prog}")
+    parser.add_argument("--api-url", default=None, help=f"URL de l'API (défaut: API_BASE_URL ou {DEFAULT_API_URL})")
+    parser.add_argument("--email", default=os.environ.get("NALA_API_EMAIL", "superadmin@nalacredit.com"))
+    if add_arguments:
+        add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def _password():
+    return os.environ.get("NALA_API_PASSWORD") or getpass.getpass("Mot de passe API: ")
+
+
+def _with_context(ctx, args, body):
+    own = ctx is None
+    ctx = ctx or Context(api_url=args.api_url)
+    try:
+        return body(ctx, args.api_url or ctx.api_url)
+    finally:
+        if own:
+            ctx.close()
+
+
+def login(argv=None, ctx=None):
+    """Konekte ak API a epi montre reklamasyon JWT la (test-superadmin-login.py)."""
+    from nala_ops.auth import jwt_claims
+
+    args = _parse("login-check", argv)
+
+    def body(ctx, api_url):
+        try:
+            token = ctx.token(args.email, _password, api_url)
+        except Exception as e:
+            print(f"❌ Login échoué pour {args.email}: {e}")
+            return 1
+        claims = jwt_claims(token)
+        print(f"✅ Login réussi: {args.email}")
+        print(f"   Token: {token[:30]}...")
+        for name in ("role", "BranchId", "exp"):
+            matching = [v for k, v in claims.items() if k == name or k.endswith("/" + name)]
+            if matching:
+                print(f"   {name}: {matching[0]}")
+        return 0
+
+    return _with_context(ctx, args, body)
+
+
+def smoke(argv=None, ctx=None):
+    """Teste tout endpoint mikwokredi yo (test-all-apis.py)."""
+    args = _parse("smoke-apis", argv)
+
+    def body(ctx, api_url):
+        token = ctx.token(args.email, _password, api_url)
+        headers = {"Authorization": f"Bearer {token}"}
+        print("Test tout API endpoints:\n")
+        all_ok = True
+        for name, endpoint in ENDPOINTS:
+            r = ctx.http().get(f"{api_url}{endpoint}", headers=headers, timeout=30)
+            print(f"{'✅' if r.status_code == 200 else '❌'} {name}: {r.status_code} "
+                  f"({r.elapsed.total_seconds() * 1000:.0f} ms)")
+            if r.status_code != 200:
+                all_ok = False
+                print(f"   Error: {r.text[:100]}")
+        print("\n✅ Tout API yo fonksyone!" if all_ok else "\n❌ Gen kèk pwoblèm ankò")
+        return 0 if all_ok else 1
+
+    return _with_context(ctx, args, body)
+
+
+def domains(argv=None, ctx=None):
+    """Verifye otorizasyon pa domèn: SuperAdmin aksepte sou admin, bloke sou branch."""
+    args = _parse("domain-check", argv, lambda p: p.add_argument("--branch-url", default=BRANCH_API_URL))
+
+    def body(ctx, api_url):
+        token = ctx.token(args.email, _password, api_url)
+        headers = {"Authorization": f"Bearer {token}"}
+        print("🧪 Test Domain Authorization\n")
+        ok = True
+        for label, base_url, expected in (("admin", api_url, 200), ("branch", args.branch_url.rstrip("/"), 403)):
+            r = ctx.http().get(f"{base_url}/api/SavingsAccount?pageSize=1", headers=headers, timeout=30)
+            print(f"{'✅' if r.status_code == expected else '❌'} Access {label} domain: "
+                  f"{r.status_code} (Expected: {expected})")
+            ok = ok and r.status_code == expected
+        print(f"\n{'=' * 60}")
+        print("Domain authorization is working correctly!" if ok else "Domain authorization needs attention")
+        return 0 if ok else 1
+
+    return _with_context(ctx, args, body)
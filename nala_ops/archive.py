@@ -0,0 +1,562 @@
+#!/usr/bin/env python3
+"""
+Achive ak netwaye done fèmen yo pa ti lo, san bloke pwodiksyon (ranplase clear-*.sql yo).
+
+Replaces clear-microcredit-data.sql, clear-data-simple.sql and
+clear-microcredit-with-guarantee-unblock.sql, which delete whole tables in one
+statement. Rows are moved, in primary-key order, by batches that each run in
+their own short transaction (``lock_timeout`` with retries). The batch size
+follows the observed transaction time (``--batch-ms``) and shrinks, with a
+pause, while replication lag (pg_stat_replication) exceeds ``--max-lag-s``.
+
+Archive sets, in the order they run:
+
+* ``loans``: Completed/Cancelled microcredit loans whose last payment (or last
+  update) is older than the cutoff, with their payments, payment schedules,
+  collection notes, then their application with its documents, guarantees and
+  approval steps;
+* ``applications``: Rejected/Cancelled applications without a loan;
+* ``savings-transactions``, ``current-transactions``, ``term-transactions``
+  (group ``transactions``): account transactions older than the cutoff. The
+  last transaction before the cutoff of every account is kept, so opening
+  balances (``BalanceAfter``) stay available to nala_ops.statements;
+* ``open-loans``, ``open-applications`` (group ``open``, only with
+  ``--allow-open``): what the old scripts removed on test databases, i.e.
+  Pending/Approved/Active/Overdue loans and Draft..Approved applications.
+
+Within a batch, tables are moved children first; before running, the foreign
+keys in the catalog are checked so that no table outside the set (or later in
+the order) still references a moved table. Guarantees still blocked on a moved
+application are released first, like the old scripts, but summed per savings
+account and capped at the blocked balance, and ``BlockedGuaranteeAmount`` is
+cleared as the API does. Document files under uploads/ are left in place;
+nala_ops.uploads_scan lists them as orphans afterwards.
+
+Destinations (``--to``): ``table`` moves rows into ``archive.<table>`` (created
+with the live columns plus ``archived_at``), ``parquet`` writes one zstd
+Parquet file per table and batch under ``--out`` before the batch commits
+(needs ``pyarrow``), ``none`` only deletes. Parquet files are named after the
+set, the cutoff and the first key of the batch. That key is deleted when the
+batch commits, so no later batch reuses the name; a file left by an attempt
+that did not commit is replaced when the batch runs again.
+
+Progress is checkpointed in ``.nala_ops/archive.json`` after every batch; a run
+that stops resumes from the last committed key with the same cutoff
+(``--restart`` starts over). Without ``--apply`` only the counts are shown.
+
+Usage:
+    python -m nala_ops.archive --older-than 730
+    python -m nala_ops.archive --older-than 730 --apply --to parquet --out /srv/archive
+    python -m nala_ops.archive --sets open --allow-open --to none --apply   # base de test
+"""
+
+import argparse
+import os
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from nala_ops import db
+from nala_ops.migrate import Runner, quote_ident
+from nala_ops.state import load_json, save_json, state_path
+
+ARCHIVE_SCHEMA = "archive"
+
+# microcredit enums are stored as integers
+LOAN_CLOSED = (3, 6)  # Completed, Cancelled
+LOAN_OPEN = (0, 1, 2, 4)  # Pending, Approved, Active, Overdue
+APPLICATION_CLOSED = (4, 5)  # Rejected, Cancelled
+APPLICATION_OPEN = (0, 1, 2, 3)  # Draft, Submitted, UnderReview, Approved
+
+
+@dataclass(frozen=True)
+class Move:
+    table: str
+    column: str  # key column matched against the batch keys
+    keys: str = "root"  # "root" ids, or "applications" ids derived from them
+
+
+@dataclass(frozen=True)
+class ArchiveSet:
+    name: str
+    root: str  # table whose primary key drives the batches
+    where: str  # predicate on alias r; may use %(cutoff)s
+    moves: tuple  # foreign-key order: referencing tables first
+    application_column: str = None  # root column naming the application of each row
+    excluded: tuple = ()  # referencing tables whose rows ``where`` already rules out
+    open: bool = False  # only with --allow-open
+    pk: str = "Id"
+
+
+def _in(values):
+    return ", ".join(str(v) for v in values)
+
+
+LOAN_CHILDREN = (
+    Move("microcredit_payments", "LoanId"),
+    Move("microcredit_payment_schedules", "LoanId"),
+    Move("microcredit_collection_notes", "LoanId"),
+    Move("microcredit_loans", "Id"),
+)
+APPLICATION_CHILDREN = (
+    Move("microcredit_application_documents", "ApplicationId", "applications"),
+    Move("microcredit_guarantees", "ApplicationId", "applications"),
+    Move("microcredit_approval_steps", "ApplicationId", "applications"),
+    Move("microcredit_loan_applications", "Id", "applications"),
+)
+NO_LOAN = 'NOT EXISTS (SELECT 1 FROM microcredit_loans l WHERE l."ApplicationId" = r."Id")'
+
+
+def _transactions(name, table):
+    # Keep the newest row before the cutoff for each account (opening balance)
+    where = (f'r."ProcessedAt" < %(cutoff)s::timestamptz AND EXISTS (SELECT 1 FROM {quote_ident(table)} n '
+             f'WHERE n."AccountId" = r."AccountId" AND n."ProcessedAt" > r."ProcessedAt" '
+             f'AND n."ProcessedAt" < %(cutoff)s::timestamptz)')
+    return ArchiveSet(name, table, where, (Move(table, "Id"),))
+
+
+SETS = [
+    ArchiveSet("loans", "microcredit_loans",
+               f'r."Status" IN ({_in(LOAN_CLOSED)}) '
+               f'AND COALESCE(r."LastPaymentDate", r."UpdatedAt") < %(cutoff)s::timestamptz',
+               LOAN_CHILDREN + APPLICATION_CHILDREN, application_column="ApplicationId"),
+    ArchiveSet("applications", "microcredit_loan_applications",
+               f'r."Status" IN ({_in(APPLICATION_CLOSED)}) AND r."UpdatedAt" < %(cutoff)s::timestamptz AND {NO_LOAN}',
+               APPLICATION_CHILDREN, application_column="Id", excluded=("microcredit_loans",)),
+    _transactions("savings-transactions", "SavingsTransactions"),
+    _transactions("current-transactions", "CurrentAccountTransactions"),
+    _transactions("term-transactions", "TermSavingsTransactions"),
+    ArchiveSet("open-loans", "microcredit_loans", f'r."Status" IN ({_in(LOAN_OPEN)})',
+               LOAN_CHILDREN + APPLICATION_CHILDREN, application_column="ApplicationId", open=True),
+    ArchiveSet("open-applications", "microcredit_loan_applications",
+               f'r."Status" IN ({_in(APPLICATION_OPEN)}) AND {NO_LOAN}',
+               APPLICATION_CHILDREN, application_column="Id", excluded=("microcredit_loans",), open=True),
+]
+GROUPS = {
+    "all": [s.name for s in SETS if not s.open],
+    "transactions": ["savings-transactions", "current-transactions", "term-transactions"],
+    "open": ["open-loans", "open-applications"],
+}
+
+LOCK_ACCOUNTS_SQL = """
+    SELECT "Id" FROM "SavingsAccounts"
+    WHERE "Id" IN (SELECT "BlockedSavingsAccountId" FROM microcredit_loan_applications
+                   WHERE "Id" = ANY(%(keys)s::uuid[]) AND "BlockedGuaranteeAmount" IS NOT NULL)
+    ORDER BY "Id" FOR UPDATE
+"""
+
+# One row per account even when several of its applications are in the batch
+UNBLOCK_SQL = """
+    UPDATE "SavingsAccounts" s
+    SET "BlockedBalance" = s."BlockedBalance" - g.released,
+        "AvailableBalance" = s."AvailableBalance" + g.released,
+        "UpdatedAt" = NOW()
+    FROM (SELECT a."Id" AS id, LEAST(SUM(apps."BlockedGuaranteeAmount"), a."BlockedBalance") AS released
+          FROM microcredit_loan_applications apps
+          JOIN "SavingsAccounts" a ON a."Id" = apps."BlockedSavingsAccountId"
+          WHERE apps."Id" = ANY(%(keys)s::uuid[]) AND apps."BlockedGuaranteeAmount" IS NOT NULL
+          GROUP BY a."Id", a."BlockedBalance") g
+    WHERE s."Id" = g.id
+    RETURNING g.released
+"""
+
+CLEAR_GUARANTEE_SQL = """
+    UPDATE microcredit_loan_applications SET "BlockedGuaranteeAmount" = NULL
+    WHERE "Id" = ANY(%(keys)s::uuid[]) AND "BlockedGuaranteeAmount" IS NOT NULL
+"""
+
+LAG_SQL = """
+    SELECT max(extract(epoch FROM GREATEST(write_lag, flush_lag, replay_lag))) FROM pg_stat_replication
+"""
+
+
+def select_sets(names, allow_open):
+    chosen = []
+    for name in names:
+        for expanded in GROUPS.get(name, [name]):
+            spec = next((s for s in SETS if s.name == expanded), None)
+            if spec is None:
+                raise SystemExit(f"❌ Ensemble inconnu: {expanded} "
+                                 f"(disponibles: {', '.join([s.name for s in SETS] + list(GROUPS))})")
+            if spec.open and not allow_open:
+                raise SystemExit(f"❌ {spec.name} supprime des crédits en cours: --allow-open requis (base de test)")
+            if spec not in chosen:
+                chosen.append(spec)
+    return chosen
+
+
+# ---------------------------------------------------------------------------
+# Catalog
+# ---------------------------------------------------------------------------
+
+def columns(cur, table, schema="public"):
+    """[(name, type)] of ``schema.table`` in column order."""
+    cur.execute("""
+        SELECT attname, format_type(atttypid, atttypmod) FROM pg_attribute
+        WHERE attrelid = to_regclass(%s) AND attnum > 0 AND NOT attisdropped ORDER BY attnum
+    """, (f"{quote_ident(schema)}.{quote_ident(table)}",))
+    return cur.fetchall()
+
+
+def check_foreign_keys(cur, spec):
+    """Problems that would make deleting the set's rows fail or cascade outside the set."""
+    order = [move.table for move in spec.moves]
+    position = {quote_ident(table): i for i, table in enumerate(order)}
+    cur.execute("""
+        SELECT conrelid::regclass::text, confrelid::regclass::text, conname FROM pg_constraint
+        WHERE contype = 'f' AND confrelid = ANY(%s::regclass[])
+    """, (list(position),))
+    problems = []
+    excluded = {quote_ident(table) for table in spec.excluded}
+    for referencing, referenced, name in cur.fetchall():
+        if referencing == referenced or referencing in excluded:
+            continue
+        if referencing not in position:
+            problems.append(f"{referencing} référence {referenced} ({name}) mais n'est pas archivée")
+        elif position[referencing] > position[referenced]:
+            problems.append(f"{referencing} doit passer avant {referenced} ({name})")
+    return problems
+
+
+# ---------------------------------------------------------------------------
+# Destinations
+# ---------------------------------------------------------------------------
+
+class DeleteSink:
+    """--to none: rows are only deleted."""
+
+    def prepare(self, cur, tables):
+        pass
+
+    def move(self, cur, table, column, cast, keys, label):
+        cur.execute(f"DELETE FROM {quote_ident(table)} WHERE {quote_ident(column)} = ANY(%s::{cast}[])", (keys,))
+        return cur.rowcount
+
+
+class TableSink:
+    """--to table: DELETE ... RETURNING into archive.<table>, in the same statement."""
+
+    def __init__(self):
+        self.columns = {}
+
+    def prepare(self, cur, tables):
+        cur.execute(f"CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}")
+        for table in tables:
+            live = columns(cur, table)
+            target = f"{ARCHIVE_SCHEMA}.{quote_ident(table)}"
+            cur.execute(f"CREATE TABLE IF NOT EXISTS {target} (LIKE {quote_ident(table)} INCLUDING DEFAULTS)")
+            cur.execute(f"ALTER TABLE {target} ADD COLUMN IF NOT EXISTS archived_at timestamptz NOT NULL DEFAULT now()")
+            archived = {name for name, _ in columns(cur, table, ARCHIVE_SCHEMA)}
+            # Columns added to the live table since the archive table was created
+            for name, type_ in live:
+                if name not in archived:
+                    cur.execute(f"ALTER TABLE {target} ADD COLUMN {quote_ident(name)} {type_}")
+            self.columns[table] = ", ".join(quote_ident(name) for name, _ in live)
+
+    def move(self, cur, table, column, cast, keys, label):
+        cols = self.columns[table]
+        cur.execute(f"""
+            WITH moved AS (DELETE FROM {quote_ident(table)} WHERE {quote_ident(column)} = ANY(%s::{cast}[])
+                           RETURNING {cols})
+            INSERT INTO {ARCHIVE_SCHEMA}.{quote_ident(table)} ({cols}) SELECT {cols} FROM moved
+        """, (keys,))
+        return cur.rowcount
+
+
+class ParquetSink:
+    """--to parquet: the deleted rows are written (and fsynced) before the batch commits."""
+
+    def __init__(self, out, compression="zstd"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise SystemExit("❌ --to parquet nécessite pyarrow (pip install 'nala-ops[parquet]')")
+        self.out = out
+        self.compression = compression
+
+    def prepare(self, cur, tables):
+        for table in tables:
+            os.makedirs(os.path.join(self.out, table), exist_ok=True)
+
+    def move(self, cur, table, column, cast, keys, label):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        cur.execute(f"DELETE FROM {quote_ident(table)} WHERE {quote_ident(column)} = ANY(%s::{cast}[]) RETURNING *",
+                    (keys,))
+        rows = cur.fetchall()
+        if not rows:
+            return 0
+        names = [d[0] for d in cur.description]
+        data = pa.Table.from_pydict({name: [row[i] for row in rows] for i, name in enumerate(names)})
+        # The label's first key is locked and still live here, so an existing file
+        # with this name comes from an attempt that did not commit
+        path = os.path.join(self.out, table, f"{label}.parquet")
+        tmp = path + ".tmp"
+        pq.write_table(data, tmp, compression=self.compression)
+        with open(tmp, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        return len(rows)
+
+
+# ---------------------------------------------------------------------------
+# Batches
+# ---------------------------------------------------------------------------
+
+class Archiver:
+    def __init__(self, conn, sink, runner, cutoff, batch_size=500, min_batch=50, max_batch=5000,
+                 batch_ms=250.0, pause_ms=100.0, max_lag_s=5.0, save=None):
+        self.conn = conn
+        self.sink = sink
+        self.runner = runner
+        self.cutoff = cutoff
+        self.batch_size = batch_size
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.batch_ms = batch_ms
+        self.pause = pause_ms / 1000.0
+        self.max_lag = max_lag_s
+        self.save = save or (lambda: None)
+        self.key_types = {}
+
+    def key_type(self, cur, table, column):
+        if (table, column) not in self.key_types:
+            types = dict(columns(cur, table))
+            self.key_types[table, column] = types[column]
+        return self.key_types[table, column]
+
+    def replication_lag(self, cur):
+        try:
+            cur.execute(LAG_SQL)
+            return cur.fetchone()[0]
+        except Exception:  # no pg_monitor: lag columns are hidden, not an error
+            return None
+
+    def wait_for_replicas(self, cur):
+        lag = self.replication_lag(cur)
+        if lag is None or lag <= self.max_lag:
+            return 0.0
+        started = time.monotonic()
+        print(f"   ⏸️  réplication en retard de {lag:.1f}s, pause...", flush=True)
+        while lag is not None and lag > self.max_lag / 2:
+            time.sleep(1.0)
+            lag = self.replication_lag(cur)
+        return time.monotonic() - started
+
+    def batch(self, cur, spec, record, size):
+        """Move one batch; return the number of root rows (0 when the set is done)."""
+        root_type = self.key_type(cur, spec.root, spec.pk)
+        params = {"cutoff": self.cutoff, "after": record.get("last_key"), "limit": size}
+        after = f"AND r.{quote_ident(spec.pk)} > %(after)s::{root_type} " if params["after"] is not None else ""
+        cur.execute(f"SELECT r.{quote_ident(spec.pk)} FROM {quote_ident(spec.root)} r "
+                    f"WHERE ({spec.where}) {after}ORDER BY r.{quote_ident(spec.pk)} LIMIT %(limit)s FOR UPDATE",
+                    params)
+        keys = [row[0] for row in cur.fetchall()]
+        if not keys:
+            return 0, {}, None
+
+        applications = None
+        if spec.application_column:
+            column = quote_ident(spec.application_column)
+            pk = quote_ident(spec.pk)
+            # An application still used by a root row outside this batch stays in place
+            cur.execute(f"""
+                SELECT DISTINCT r.{column} FROM {quote_ident(spec.root)} r
+                WHERE r.{pk} = ANY(%(keys)s::{root_type}[]) AND r.{column} IS NOT NULL AND NOT EXISTS (
+                    SELECT 1 FROM {quote_ident(spec.root)} o
+                    WHERE o.{column} = r.{column} AND o.{pk} <> ALL(%(keys)s::{root_type}[]))
+            """, {"keys": keys})
+            applications = [str(row[0]) for row in cur.fetchall()]
+            cur.execute(LOCK_ACCOUNTS_SQL, {"keys": applications})
+            cur.execute(UNBLOCK_SQL, {"keys": applications})
+            released = [row[0] for row in cur.fetchall()]
+            cur.execute(CLEAR_GUARANTEE_SQL, {"keys": applications})
+            unblocked = (len(released), float(sum(released)))
+        else:
+            unblocked = (0, 0.0)
+
+        # Unique across runs and checkpoints: the first key of a committed batch is deleted with it
+        label = f"{spec.name}-{self.cutoff.replace('-', '').replace(':', '')}-{keys[0]}"
+        moved = {}
+        for move in spec.moves:
+            values = applications if move.keys == "applications" else keys
+            if values:
+                cast = self.key_type(cur, move.table, move.column)
+                moved[move.table] = self.sink.move(cur, move.table, move.column, cast, [str(v) for v in values], label)
+        return len(keys), moved, (str(keys[-1]), unblocked)
+
+    def run(self, spec, record):
+        size = record.get("batch_size") or self.batch_size
+        saved = time.monotonic()
+        with self.conn.cursor() as cur:
+            while True:
+                started = time.perf_counter()
+                _attempts, (count, moved, tail) = self.runner.short_transaction(
+                    cur, lambda cur, size=size: self.batch(cur, spec, record, size))
+                elapsed = time.perf_counter() - started
+                if not count:
+                    record["done"] = True
+                    self.save()
+                    return
+                last_key, (released, amount) = tail
+                record["last_key"] = last_key
+                record["batches"] = record.get("batches", 0) + 1
+                rows = record.setdefault("rows", {})
+                for table, n in moved.items():
+                    rows[table] = rows.get(table, 0) + n
+                if released:
+                    record["guarantees_released"] = record.get("guarantees_released", 0) + released
+                    record["amount_released"] = round(record.get("amount_released", 0.0) + amount, 2)
+
+                # Keep each transaction close to --batch-ms, then slow down for lagging replicas
+                target = self.batch_ms / 1000.0
+                size = int(size * min(2.0, max(0.5, target / max(elapsed, 1e-3))))
+                if self.wait_for_replicas(cur):
+                    size //= 2
+                size = max(self.min_batch, min(self.max_batch, size))
+                record["batch_size"] = size
+                self.save()
+                if time.monotonic() - saved > 10:
+                    print(f"   … {record['batches']} lots, {sum(rows.values())} lignes, lot {size}", flush=True)
+                    saved = time.monotonic()
+                time.sleep(self.pause)
+
+
+# ---------------------------------------------------------------------------
+# Dry run
+# ---------------------------------------------------------------------------
+
+def count_set(cur, spec, cutoff):
+    """Rows each move would touch if the set were archived now (applications still in use included)."""
+    pk = quote_ident(spec.pk)
+    roots = f"SELECT r.{pk} FROM {quote_ident(spec.root)} r WHERE {spec.where}"
+    applications = (f"SELECT r.{quote_ident(spec.application_column)} FROM {quote_ident(spec.root)} r "
+                    f"WHERE {spec.where}") if spec.application_column else None
+    counts = {}
+    for move in spec.moves:
+        source = applications if move.keys == "applications" else roots
+        cur.execute(f"SELECT count(*) FROM {quote_ident(move.table)} "
+                    f"WHERE {quote_ident(move.column)} IN ({source})", {"cutoff": cutoff})
+        counts[move.table] = cur.fetchone()[0]
+    guarantees = (0, 0)
+    if applications:
+        cur.execute(f"""
+            SELECT count(*), COALESCE(sum("BlockedGuaranteeAmount"), 0) FROM microcredit_loan_applications
+            WHERE "Id" IN ({applications})
+              AND "BlockedGuaranteeAmount" IS NOT NULL AND "BlockedSavingsAccountId" IS NOT NULL
+        """, {"cutoff": cutoff})
+        guarantees = cur.fetchone()
+    return counts, guarantees
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    db.add_dsn_argument(parser)
+    parser.add_argument("--sets", default="all",
+                        help="ensembles ou groupes séparés par des virgules (all, loans, applications, "
+                             "transactions, savings-transactions, current-transactions, term-transactions, open)")
+    parser.add_argument("--older-than", type=int, default=365, help="âge minimal en jours (défaut 365)")
+    parser.add_argument("--apply", action="store_true", help="archiver (par défaut: compter seulement)")
+    parser.add_argument("--to", choices=("table", "parquet", "none"), default="table",
+                        help=f"destination: {ARCHIVE_SCHEMA}.<table>, fichiers Parquet, ou suppression simple")
+    parser.add_argument("--out", default="archive", help="dossier Parquet (défaut ./archive)")
+    parser.add_argument("--allow-open", action="store_true", help="autoriser le groupe open (base de test)")
+    parser.add_argument("--batch-size", type=int, default=500, help="lignes racines par lot au départ")
+    parser.add_argument("--min-batch", type=int, default=50)
+    parser.add_argument("--max-batch", type=int, default=5000)
+    parser.add_argument("--batch-ms", type=float, default=250.0, help="durée visée d'une transaction de lot")
+    parser.add_argument("--pause-ms", type=float, default=100.0, help="pause entre deux lots")
+    parser.add_argument("--max-lag-s", type=float, default=5.0, help="retard de réplication toléré")
+    parser.add_argument("--lock-timeout-ms", type=int, default=2000)
+    parser.add_argument("--retries", type=int, default=30, help="tentatives après un lock_timeout")
+    parser.add_argument("--restart", action="store_true", help="ignorer le point de reprise")
+    parser.add_argument("--state", help="point de reprise (défaut: .nala_ops/archive.json)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    sets = select_sets([n.strip() for n in args.sets.split(",") if n.strip()], args.allow_open)
+
+    state_file = args.state or state_path("archive.json")
+    state = {} if args.restart else load_json(state_file)
+    if state.get("completed_at"):
+        state = {}  # the previous run finished: start a new one
+    if state.get("to") not in (None, args.to):
+        print(f"❌ Le point de reprise concerne --to {state['to']} (utilisez --restart pour recommencer)")
+        return 2
+    cutoff = state.get("cutoff") or (datetime.now() - timedelta(days=args.older_than)).isoformat(timespec="seconds")
+    if state.get("cutoff"):
+        print(f"↩️  Reprise du point de reprise {state_file} (seuil {cutoff}, --restart pour recommencer)")
+
+    conn = db.connect(args.dsn, autocommit=True)
+    try:
+        with conn.cursor() as cur:
+            print("=" * 60)
+            print(f"🗄️  ARCHIVAGE (avant {cutoff}, destination: {args.to})")
+            print("=" * 60)
+            blocked = False
+            for spec in sets:
+                counts, (guarantees, amount) = count_set(cur, spec, cutoff)
+                problems = check_foreign_keys(cur, spec)
+                print(f"\n📦 {spec.name}")
+                for table, n in counts.items():
+                    print(f"   {table:<36} {n:>10}")
+                if guarantees:
+                    print(f"   🔓 demandes avec garantie bloquée: {guarantees} ({amount:,.2f})")
+                for problem in problems:
+                    print(f"   ❌ {problem}")
+                blocked = blocked or bool(problems)
+        if not args.apply:
+            print("\nAucune modification (relancez avec --apply).")
+            return 0
+        if blocked:
+            print("\n❌ Clés étrangères non couvertes: rien n'a été archivé.")
+            return 1
+
+        if args.to == "parquet":
+            sink = ParquetSink(args.out)
+        elif args.to == "table":
+            sink = TableSink()
+        else:
+            sink = DeleteSink()
+        tables = [move.table for spec in sets for move in spec.moves]
+        with conn.cursor() as cur:
+            sink.prepare(cur, list(dict.fromkeys(tables)))
+
+        state.update({"cutoff": cutoff, "to": args.to})
+        progress = state.setdefault("sets", {})
+        archiver = Archiver(conn, sink, Runner(conn, args.lock_timeout_ms, args.retries), cutoff,
+                            args.batch_size, args.min_batch, args.max_batch, args.batch_ms, args.pause_ms,
+                            args.max_lag_s, save=lambda: save_json(state_file, state))
+        print("\n" + "=" * 60)
+        print("🚀 ARCHIVAGE")
+        print("=" * 60)
+        for spec in sets:
+            record = progress.setdefault(spec.name, {})
+            if record.get("done"):
+                print(f"\n⏭️  {spec.name}: déjà terminé")
+                continue
+            resumed = f" (reprise après {record['last_key']})" if record.get("last_key") else ""
+            print(f"\n📦 {spec.name}{resumed}")
+            started = time.perf_counter()
+            archiver.run(spec, record)
+            rows = record.get("rows", {})
+            print(f"   ✅ {record.get('batches', 0)} lots en {time.perf_counter() - started:.1f}s")
+            for table, n in rows.items():
+                print(f"   {table:<36} {n:>10}")
+            if record.get("guarantees_released"):
+                print(f"   🔓 comptes épargne débloqués: {record['guarantees_released']} "
+                      f"({record['amount_released']:,.2f})")
+        if all(progress.get(spec.name, {}).get("done") for spec in sets):
+            state["completed_at"] = datetime.now().isoformat(timespec="seconds")
+            save_json(state_file, state)
+        return 0
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
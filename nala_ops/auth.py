@@ -0,0 +1,75 @@
+"""
+JWT cache shared by the tools that call the API (``/api/auth/login``).
+
+Tokens are kept in ``.nala_ops/tokens.json`` keyed by base URL and email, and
+reused until one minute before their ``exp`` claim.
+"""
+
+import base64
+import json
+import time
+
+from nala_ops.state import load_json, save_json, state_path
+
+DEFAULT_API_URL = "https://admin.nalakreditimachann.com"
+BRANCH_API_URL = "https://branch.nalakreditimachann.com"
+
+
+def jwt_claims(token):
+    """Payload of a JWT, without signature verification."""
+    try:
+        payload = token.split(".")[1]
+        return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except (IndexError, ValueError):
+        return {}
+
+
+class TokenCache:
+    def __init__(self, path=None):
+        self.path = path or state_path("tokens.json")
+        self.tokens = load_json(self.path)
+
+    @staticmethod
+    def key(base_url, email):
+        return f"{base_url.rstrip('/')}|{email.lower()}"
+
+    def cached(self, base_url, email):
+        token = self.tokens.get(self.key(base_url, email))
+        if not token:
+            return None
+        exp = jwt_claims(token).get("exp")
+        return token if exp is None or exp - 60 > time.time() else None
+
+    def store(self, base_url, email, token):
+        self.tokens[self.key(base_url, email)] = token
+        save_json(self.path, self.tokens)
+        return token
+
+    def get(self, session, base_url, email, password):
+        """Cached token, or log in with a ``requests`` session.
+
+        ``password`` may be a callable (a getpass prompt); it is only called when
+        no valid token is cached.
+        """
+        token = self.cached(base_url, email)
+        if token:
+            return token
+        if callable(password):
+            password = password()
+        r = session.post(f"{base_url.rstrip('/')}/api/auth/login",
+                         json={"email": email, "password": password}, timeout=15)
+        r.raise_for_status()
+        return self.store(base_url, email, r.json()["token"])
+
+    async def get_async(self, session, base_url, email, password):
+        """Same as :meth:`get` with an ``aiohttp`` session."""
+        token = self.cached(base_url, email)
+        if token:
+            return token
+        if callable(password):
+            password = password()
+        async with session.post(f"{base_url.rstrip('/')}/api/auth/login",
+                                json={"email": email, "password": password}) as r:
+            r.raise_for_status()
+            token = (await r.json())["token"]
+        return self.store(base_url, email, token)
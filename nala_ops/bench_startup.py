@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Mezire tan demaraj CLI a (nala-ops --help ak <kòmand> --help) epi swiv li nan tan.
+
+Each measurement starts a fresh interpreter, ``repeat`` times, and keeps the
+median. A ``-X importtime`` run of the same command lists the heavy modules
+(psycopg2, requests, aiohttp, reportlab, pyarrow) that were imported even though
+``--help`` should never need them.
+
+Results are appended to ``.nala_ops/startup-bench.json``. With ``--check`` the
+exit status is 1 when a median is more than ``--threshold`` percent slower than
+the median of the previous runs, or when a heavy module leaks into startup.
+
+Usage:
+    python -m nala_ops.bench_startup --repeat 10 --check
+"""
+
+import argparse
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from nala_ops.state import load_json, save_json, state_path
+
+HEAVY_MODULES = ("psycopg2", "requests", "aiohttp", "reportlab", "pyarrow")
+HISTORY_LIMIT = 50
+
+
+def _command(args):
+    return [sys.executable, "-m", "nala_ops.cli"] + args
+
+
+def _env():
+    # The package is run from the checkout without being installed
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    return env
+
+
+def time_command(args, repeat):
+    env = _env()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(_command(args), env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def heavy_imports(args):
+    """Top-level heavy modules imported by ``args``, with their cumulative import time in ms."""
+    result = subprocess.run([sys.executable, "-X", "importtime"] + _command(args)[1:], env=_env(),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    found = {}
+    # "import time: self [us] | cumulative | imported package"
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) != 3 or not parts[0].startswith("import time:"):
+            continue
+        name = parts[2].strip()
+        if name in HEAVY_MODULES:
+            found[name] = int(parts[1]) / 1000.0
+    return found
+
+
+def scenarios(commands):
+    from nala_ops.cli import COMMANDS
+
+    names = commands or sorted(COMMANDS)
+    return [("--help", ["--help"])] + [(name, [name, "--help"]) for name in names]
+
+
+def compare(current, history, threshold):
+    regressions = []
+    for name, seconds in current.items():
+        previous = [run["medians"][name] for run in history if name in run.get("medians", {})]
+        if not previous:
+            continue
+        baseline = statistics.median(previous)
+        if seconds > baseline * (1 + threshold / 100.0):
+            regressions.append((name, baseline, seconds))
+    return regressions
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--command", action="append", default=[], help="limiter à ces commandes (répétable)")
+    parser.add_argument("--threshold", type=float, default=20.0, help="régression tolérée en %% (défaut 20)")
+    parser.add_argument("--check", action="store_true", help="code de sortie 1 en cas de régression")
+    parser.add_argument("--no-save", action="store_true", help="ne pas ajouter la mesure à l'historique")
+    parser.add_argument("--state", default=None, help="fichier d'historique (défaut .nala_ops/startup-bench.json)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    path = args.state or state_path("startup-bench.json")
+    history = load_json(path, default={"runs": []})["runs"]
+
+    print("=" * 60)
+    print(f"⏱️  DÉMARRAGE nala-ops (médiane de {args.repeat}, Python {platform.python_version()})")
+    print("=" * 60)
+    medians, leaks = {}, {}
+    for name, command in scenarios(args.command):
+        medians[name] = time_command(command, args.repeat)
+        heavy = heavy_imports(command)
+        if heavy:
+            leaks[name] = heavy
+        flag = "  ⚠️ " + ", ".join(f"{m} {ms:.0f}ms" for m, ms in heavy.items()) if heavy else ""
+        print(f"  {name:<18} {medians[name] * 1000:>8.1f} ms{flag}")
+
+    regressions = compare(medians, history, args.threshold)
+    for name, baseline, seconds in regressions:
+        print(f"❌ {name}: {seconds * 1000:.1f} ms (référence {baseline * 1000:.1f} ms)")
+    if not args.no_save:
+        history.append({"at": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(),
+                        "repeat": args.repeat, "medians": medians, "heavy_imports": leaks})
+        save_json(path, {"runs": history[-HISTORY_LIMIT:]})
+    if args.check and (regressions or leaks):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
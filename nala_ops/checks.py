@@ -0,0 +1,161 @@
+"""
+Tcheke rapid nan baz done a (ansyen check-active-loans.py, check-customer-mj5380.py,
+list-all-users.sh, check-production-users.sh).
+
+Every command takes ``argv`` and an optional shared Context so that ``nala-ops
+batch`` can run several of them on one connection pool.
+"""
+
+import argparse
+
+from nala_ops import db
+from nala_ops.context import Context
+
+# UserRole (backend/NalaCreditAPI/Models/User.cs); the old shell scripts used another mapping
+ROLES = {0: "💰 Caissier", 1: "🏦 Employé", 2: "👔 Manager", 3: "🛡️ Admin", 4: "📝 Secrétaire", 5: "⭐ SuperAdmin"}
+SUPERADMIN_ROLE = 5  # UserRole.SuperAdmin
+ADMIN_ROLES = (3, SUPERADMIN_ROLE)  # Admin, SuperAdmin
+LOAN_STATUSES = ["Pending", "Approved", "Active", "Completed", "Overdue", "Defaulted", "Cancelled"]
+
+
+def _parse(prog, argv, add_arguments=None):
+    parser = argparse.ArgumentParser(prog=f"nala-ops {prog}")
+    db.add_dsn_argument(parser)
+    if add_arguments:
+        add_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def _run(args, ctx, body):
+    own = ctx is None
+    ctx = ctx or Context(dsn=args.dsn)
+    try:
+        with ctx.connection(args.dsn) as conn, conn.cursor() as cur:
+            return body(cur, args)
+    finally:
+        if own:
+            ctx.close()
+
+
+def _banner(title):
+    print("=" * 60)
+    print(title)
+    print("=" * 60)
+
+
+def loans(argv=None, ctx=None):
+    """Statistiques des crédits (check-active-loans.py)."""
+    args = _parse("check-loans", argv, lambda p: p.add_argument("--sample", type=int, default=5))
+
+    def body(cur, args):
+        _banner("STATISTIQUES DES CRÉDITS")
+        # The EF table is microcredit_loans (the old script queried "MicrocreditLoans")
+        cur.execute('SELECT "Status", COUNT(*) FROM microcredit_loans GROUP BY "Status"')
+        counts = dict(cur.fetchall())
+        print(f"\nTotal crédits: {sum(counts.values())}")
+        for value, name in enumerate(LOAN_STATUSES):
+            print(f"  - {name} ({value}): {counts.get(value, 0)}")
+
+        print()
+        _banner("CRÉDITS PAR SUCCURSALE")
+        cur.execute("""
+            SELECT "BranchName", COUNT(*), COUNT(*) FILTER (WHERE "Status" = 2)
+            FROM microcredit_loans
+            GROUP BY "BranchName"
+            ORDER BY 2 DESC
+        """)
+        for name, total, active in cur.fetchall():
+            print(f"\n{name}: {total} total, {active} actif(s)")
+
+        print()
+        _banner(f"EXEMPLES DE CRÉDITS ACTIFS ({args.sample} premiers)")
+        cur.execute("""
+            SELECT ml."LoanNumber", mb."FirstName" || ' ' || mb."LastName", ml."PrincipalAmount",
+                   CASE ml."Currency" WHEN 0 THEN 'HTG' WHEN 1 THEN 'USD' END, ml."BranchName"
+            FROM microcredit_loans ml
+            LEFT JOIN microcredit_borrowers mb ON mb."Id" = ml."BorrowerId"
+            WHERE ml."Status" = 2
+            LIMIT %s
+        """, (args.sample,))
+        loans = cur.fetchall()
+        for number, borrower, amount, currency, branch in loans:
+            print(f"\n  • {number} - {borrower}")
+            print(f"    Montant: {amount} {currency}")
+            print(f"    Succursale: {branch}")
+        if not loans:
+            print("\n  Aucun crédit actif trouvé!")
+        return 0
+
+    return _run(args, ctx, body)
+
+
+def customer(argv=None, ctx=None):
+    """Chèche yon kliyan epay ak kont li yo (check-customer-mj5380.py)."""
+    args = _parse("check-customer", argv, lambda p: p.add_argument("id", help="Id kliyan, ex. MJ5380"))
+
+    def body(cur, args):
+        cur.execute("""
+            SELECT "Id", "FirstName", "LastName", "PrimaryPhone", "IsActive"
+            FROM "SavingsCustomers" WHERE "Id" = %s
+        """, (args.id,))
+        found = cur.fetchone()
+        if not found:
+            print(f"✗ Kliyan {args.id} pa jwenn nan baz done a")
+            cur.execute("""
+                SELECT "Id", "FirstName", "LastName" FROM "SavingsCustomers"
+                WHERE "Id" LIKE %s LIMIT 5
+            """, (args.id[:2] + "%",))
+            similar = cur.fetchall()
+            if similar:
+                print(f"\nKliyan ki gen ID ki sanble (ki kòmanse ak '{args.id[:2]}'):")
+                for row in similar:
+                    print(f"  - {row[0]}: {row[1]} {row[2]}")
+            return 1
+
+        print("✓ Kliyan jwenn!")
+        print(f"  ID: {found[0]}")
+        print(f"  Non: {found[1]} {found[2]}")
+        print(f"  Telefòn: {found[3]}")
+        print(f"  Aktif: {'Wi' if found[4] else 'Non'}")
+        cur.execute("""
+            SELECT COUNT(*), STRING_AGG("AccountNumber", ', ')
+            FROM "SavingsAccounts" WHERE "CustomerId" = %s
+        """, (args.id,))
+        count, accounts = cur.fetchone()
+        print(f"\n  Kont: {count}")
+        if accounts:
+            print(f"  Nimewo kont: {accounts}")
+        return 0
+
+    return _run(args, ctx, body)
+
+
+def users(argv=None, ctx=None):
+    """Lis tout itilizatè ak wòl yo (list-all-users.sh, check-production-users.sh)."""
+    args = _parse("list-users", argv, lambda p: p.add_argument(
+        "--admins", action="store_true", help="sèlman Admin ak SuperAdmin"))
+
+    def body(cur, args):
+        where = f'WHERE "Role" IN ({", ".join(str(r) for r in ADMIN_ROLES)})' if args.admins else ""
+        cur.execute(f"""
+            SELECT "Email", "FirstName" || ' ' || "LastName", "Role", "IsActive",
+                   "PasswordHash" IS NOT NULL AND LENGTH("PasswordHash") > 10
+            FROM "AspNetUsers" {where}
+            ORDER BY "Role", "Email"
+        """)
+        rows = cur.fetchall()
+        _banner("TOUT ITILIZATÈ NAN SISTÈM LAN:")
+        for email, name, role, active, has_password in rows:
+            print(f"  {'✅' if active else '❌'} {email:<40} {name:<25} {ROLES.get(role, '❓ Lòt'):<14} "
+                  f"{'🔒 Wi' if has_password else '⚠️ Non'}")
+
+        print()
+        _banner("STATISTIK:")
+        totals = {}
+        for row in rows:
+            totals[row[2]] = totals.get(row[2], 0) + 1
+        for role, total in sorted(totals.items()):
+            print(f"  {ROLES.get(role, '❓ Lòt'):<14} {total}")
+        return 0
+
+    return _run(args, ctx, body)
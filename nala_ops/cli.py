@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+nala-ops: yon sèl kòmand pou tout zouti operasyon yo.
+
+Subcommands live in a registry of ``"module:function"`` strings; a module is
+only imported when its command runs, so ``nala-ops --help`` and most commands
+start without loading psycopg2, requests, aiohttp or reportlab. Other packages
+can add commands through the ``nala_ops.commands`` entry-point group, or by
+calling :func:`register` before :func:`main`.
+
+Usage:
+    nala-ops list-users --admins
+    nala-ops batch "check-loans" "list-users --admins" "smoke-apis"
+    nala-ops batch --file nightly.txt
+
+In batch mode the commands run one after the other in this process and share
+one :class:`~nala_ops.context.Context` (connection pools, HTTP session, JWT).
+Commands marked as standalone (the long-running tools) still run in-process
+but manage their own resources.
+"""
+
+import shlex
+import sys
+import time
+from dataclasses import dataclass
+from importlib import import_module
+
+
+@dataclass(frozen=True)
+class Command:
+    target: str  # "package.module:function"
+    help: str
+    shares_context: bool = False
+
+    def load(self):
+        module, _, function = self.target.partition(":")
+        return getattr(import_module(module), function or "main")
+
+
+COMMANDS = {}
+
+
+def register(name, target, help, shares_context=False):
+    COMMANDS[name] = Command(target, help, shares_context)
+
+
+# Standalone tools: main(argv)
+register("ledger-check", "nala_ops.ledger_check:main", "cohérence des transferts, sessions de caisse et soldes")
+register("sync-diff", "nala_ops.sync_diff:main", "diff par hachage entre production et développement")
+register("statements", "nala_ops.statements:main", "relevés de compte en lot (CSV/PDF)")
+register("hub-sim", "nala_ops.hub_sim:main", "charge SignalR sur NotificationHub")
+register("hub-standin", "nala_ops.hub_standin:main", "NotificationHub local pour hub-sim")
+register("pgstat-profile", "nala_ops.pgstat_profile:main", "profil pg_stat_statements autour d'une commande")
+register("monitor", "nala_ops.monitor:main", "sonde API, PostgreSQL, Redis et RabbitMQ (alertes, /metrics)")
+register("probe-standins", "nala_ops.probe_standins:main", "cibles locales pour monitor")
+register("uploads-scan", "nala_ops.uploads_scan:main", "orphelins, doublons et fichiers manquants dans uploads/")
+register("migrate", "nala_ops.migrate:main", "applique les patchs add-*.sql en ligne (lock_timeout, CONCURRENTLY, lots)")
+register("archive", "nala_ops.archive:main", "archive/purge par lots les crédits clos et vieilles transactions")
+register("superadmin-hash", "nala_ops.superadmin:main", "hash Identity V3 et SQL pour un SuperAdmin")
+register("bench-startup", "nala_ops.bench_startup:main", "mesure le temps de démarrage du CLI")
+
+# Quick checks: main(argv, ctx=None), batchable with a shared Context
+register("check-loans", "nala_ops.checks:loans", "statistiques des crédits", shares_context=True)
+register("check-customer", "nala_ops.checks:customer", "cherche un client épargne et ses comptes", shares_context=True)
+register("list-users", "nala_ops.checks:users", "liste des utilisateurs et rôles", shares_context=True)
+register("login-check", "nala_ops.api_checks:login", "login API et claims du JWT", shares_context=True)
+register("smoke-apis", "nala_ops.api_checks:smoke", "teste les endpoints microcrédit", shares_context=True)
+register("domain-check", "nala_ops.api_checks:domains", "autorisation admin/branch par domaine", shares_context=True)
+
+_plugins_loaded = False
+
+
+def load_plugins():
+    """Register commands published under the ``nala_ops.commands`` entry-point group."""
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        return
+    try:
+        found = entry_points(group="nala_ops.commands")
+    except TypeError:  # Python < 3.10
+        found = entry_points().get("nala_ops.commands", [])
+    for ep in found:
+        if ep.name not in COMMANDS:
+            register(ep.name, ep.value, f"(plugin {ep.value})", shares_context=True)
+
+
+def usage():
+    width = max(len(name) for name in COMMANDS) + 2
+    lines = ["usage: nala-ops <commande> [options]   (nala-ops <commande> --help pour les détails)", "",
+             "Commandes:"]
+    for name, command in sorted(COMMANDS.items()):
+        lines.append(f"  {name:<{width}}{command.help}")
+    lines.append(f"  {'batch':<{width}}exécute plusieurs commandes dans ce processus (contexte partagé)")
+    return "\n".join(lines)
+
+
+def run_command(name, argv, ctx=None):
+    command = COMMANDS.get(name)
+    if command is None:
+        print(f"❌ Commande inconnue: {name}\n\n{usage()}", file=sys.stderr)
+        return 2
+    function = command.load()
+    try:
+        if command.shares_context:
+            return function(argv, ctx=ctx) or 0
+        return function(argv) or 0
+    except SystemExit as e:  # argparse errors, --help and SystemExit("message")
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+
+
+def batch(argv):
+    import argparse
+
+    from nala_ops import db
+    from nala_ops.context import Context
+
+    parser = argparse.ArgumentParser(prog="nala-ops batch")
+    db.add_dsn_argument(parser)
+    parser.add_argument("--api-url", default=None)
+    parser.add_argument("--file", help="une commande par ligne (# pour les commentaires)")
+    parser.add_argument("--keep-going", action="store_true", help="continuer après un échec")
+    parser.add_argument("commands", nargs="*", help='ex. "check-loans" "list-users --admins"')
+    args = parser.parse_args(argv)
+
+    lines = list(args.commands)
+    if args.file:
+        with open(args.file) as f:
+            lines += [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+    if not lines:
+        parser.error("aucune commande")
+
+    results = []
+    with Context(dsn=args.dsn, api_url=args.api_url) as ctx:
+        for line in lines:
+            name, *rest = shlex.split(line)
+            print(f"\n▶ nala-ops {line}")
+            started = time.perf_counter()
+            code = run_command(name, rest, ctx=ctx)
+            results.append((line, code, time.perf_counter() - started))
+            if code and not args.keep_going:
+                break
+
+    print("\n" + "=" * 60)
+    print("📋 RÉSUMÉ BATCH")
+    print("=" * 60)
+    for line, code, seconds in results:
+        print(f"  {'✅' if code == 0 else '❌'} {line:<45} {seconds:>7.2f}s")
+    skipped = len(lines) - len(results)
+    if skipped:
+        print(f"  ⏭️  {skipped} commande(s) non exécutée(s)")
+    return max((code for _, code, _ in results), default=0) or (1 if skipped else 0)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    load_plugins()
+    if not argv or argv[0] in ("-h", "--help", "help"):
+        print(usage())
+        return 0
+    if argv[0] in ("-V", "--version"):
+        from nala_ops import __version__
+
+        print(f"nala-ops {__version__}")
+        return 0
+    if argv[0] == "batch":
+        return batch(argv[1:])
+    return run_command(argv[0], argv[1:])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
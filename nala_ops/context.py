@@ -0,0 +1,61 @@
+"""
+Resources shared by the commands run in one ``nala-ops`` process.
+
+In batch mode several checks run one after the other with the same Context, so
+they reuse one connection pool per database, one HTTP session and the JWT
+cache instead of reconnecting and logging in for each script.
+"""
+
+import os
+from contextlib import contextmanager
+
+from nala_ops import db
+from nala_ops.auth import DEFAULT_API_URL, TokenCache
+
+
+class Context:
+    def __init__(self, dsn=None, api_url=None, pool_size=4):
+        self.dsn = dsn
+        self.api_url = (api_url or os.environ.get("API_BASE_URL") or DEFAULT_API_URL).rstrip("/")
+        self.pool_size = pool_size
+        self._pools = {}
+        self._http = None
+        self._tokens = None
+
+    @contextmanager
+    def connection(self, dsn=None):
+        dsn = dsn or self.dsn
+        key = dsn if isinstance(dsn, str) else None
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = db.make_pool(self.pool_size, dsn)
+        with db.pooled(pool) as conn:
+            yield conn
+
+    def http(self):
+        if self._http is None:
+            import requests
+
+            self._http = requests.Session()
+        return self._http
+
+    def token(self, email, password, api_url=None):
+        """Cached JWT for ``email``; ``password`` may be a callable, used on a cache miss only."""
+        if self._tokens is None:
+            self._tokens = TokenCache()
+        return self._tokens.get(self.http(), api_url or self.api_url, email, password)
+
+    def close(self):
+        for pool in self._pools.values():
+            pool.closeall()
+        self._pools.clear()
+        if self._http is not None:
+            self._http.close()
+            self._http = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
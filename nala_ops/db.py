@@ -0,0 +1,84 @@
+"""
+Shared PostgreSQL helpers for the nala_ops tools.
+
+psycopg2 is imported lazily so that tools which never touch the database
+(and ``--help``) start without it installed.
+"""
+
+import os
+import uuid
+from contextlib import contextmanager
+
+
+def dsn_from_env(prefix="DB_"):
+    """Build connection parameters from DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASSWORD."""
+    return {
+        "host": os.environ.get(f"{prefix}HOST", "localhost"),
+        "port": os.environ.get(f"{prefix}PORT", "5432"),
+        "dbname": os.environ.get(f"{prefix}NAME", "nalakreditimachann_db"),
+        "user": os.environ.get(f"{prefix}USER", "postgres"),
+        "password": os.environ.get(f"{prefix}PASSWORD", ""),
+    }
+
+
+def _params(dsn):
+    # A libpq string ("host=... dbname=...") is passed through untouched,
+    # otherwise fall back to the environment.
+    if isinstance(dsn, str):
+        return {"dsn": dsn}
+    return dict(dsn or dsn_from_env())
+
+
+def add_dsn_argument(parser, name="--dsn", help_text=None):
+    parser.add_argument(
+        name,
+        default=None,
+        help=help_text or "libpq connection string (default: DB_* environment variables)",
+    )
+
+
+def connect(dsn=None, autocommit=False, **options):
+    """Open a connection; ``options`` are extra libpq parameters such as connect_timeout."""
+    import psycopg2
+
+    conn = psycopg2.connect(**_params(dsn), **options)
+    conn.autocommit = autocommit
+    return conn
+
+
+def make_pool(size, dsn=None):
+    """ThreadedConnectionPool with up to ``size`` connections."""
+    from psycopg2.pool import ThreadedConnectionPool
+
+    return ThreadedConnectionPool(1, max(1, size), **_params(dsn))
+
+
+@contextmanager
+def pooled(pool):
+    """Borrow a connection from ``pool``; roll back anything left open on return."""
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        if not conn.closed:
+            conn.rollback()
+        pool.putconn(conn)
+
+
+def stream(conn, query, params=None, itersize=2000):
+    """Iterate rows through a server-side (named) cursor.
+
+    Rows are fetched ``itersize`` at a time, so memory stays flat no matter how
+    large the result is. The connection must not be in autocommit mode.
+    """
+    with conn.cursor(name=f"nala_ops_{uuid.uuid4().hex[:12]}") as cur:
+        cur.itersize = itersize
+        cur.execute(query, params)
+        yield from cur
+
+
+def scalar(conn, query, params=None):
+    with conn.cursor() as cur:
+        cur.execute(query, params)
+        row = cur.fetchone()
+    return row[0] if row else None
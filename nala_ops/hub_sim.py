@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Similatè chaj pou NotificationHub (SignalR): plizyè milye koneksyon WebSocket an menm tan.
+
+Each simulated desktop/web client negotiates, opens a WebSocket to
+``/notificationHub`` and performs the JSON protocol handshake with a bearer JWT.
+Clients are opened following a ramp schedule (``--ramp 0:0,60:2000`` means
+"grow linearly from 0 to 2000 clients over the first minute"), the way cashiers
+connect at shift start.
+
+While clients are connected, one extra "sender" connection invokes
+``SendSystemAlert`` every ``--probe-interval`` seconds with a probe id. Every
+client records when the probe arrives; the report gives:
+
+* connect time (negotiate + WebSocket + handshake) percentiles and failures;
+* fan-out latency from invocation to delivery at each client;
+* dropped messages: probes not received by clients that were connected when
+  the probe was sent.
+
+JWTs are obtained once through ``/api/auth/login`` and cached in
+``.nala_ops/tokens.json`` until they expire, so a run does not hammer the
+login endpoint. ``--standin`` starts a local stand-in hub (nala_ops.hub_standin)
+and uses unsigned tokens, so the simulator can be exercised offline.
+
+The probes are real system alerts: every client connected to the hub receives
+them, cashiers included. ``--url`` has no default and a hub that is not on
+localhost is only used with ``--allow-remote``.
+
+Requires ``aiohttp``.
+
+Usage:
+    python -m nala_ops.hub_sim --standin --ramp 0:0,10:1000 --duration 20
+    python -m nala_ops.hub_sim --url http://localhost:5000 --login cashier@nalacredit.com:Secret \\
+        --ramp 0:0,60:2000 --duration 120
+    python -m nala_ops.hub_sim --url https://staging.example.org --allow-remote --token "$JWT"
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import sys
+import time
+import uuid
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+from nala_ops.auth import TokenCache
+from nala_ops.hub_standin import CLOSE, INVOCATION, PING, decode, encode
+from nala_ops.state import save_json
+from nala_ops.stats import format_ms, summarize
+
+HUB_PATH = "/notificationHub"
+PROBE_PREFIX = "nala-sim"
+KEEPALIVE_SECONDS = 15
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1"}
+
+
+# ---------------------------------------------------------------------------
+# Tokens
+# ---------------------------------------------------------------------------
+
+def unsigned_token(user_id, branch_id):
+    """JWT-shaped token for the stand-in hub, which does not check signatures."""
+    def part(obj):
+        return base64.urlsafe_b64encode(json.dumps(obj).encode()).rstrip(b"=").decode()
+
+    claims = {"sub": user_id, "BranchId": str(branch_id), "exp": int(time.time()) + 3600}
+    return f"{part({'alg': 'none', 'typ': 'JWT'})}.{part(claims)}.sim"
+
+
+# ---------------------------------------------------------------------------
+# Clients
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Client:
+    index: int
+    ws: object = None
+    connected_at: float = None
+    received: dict = field(default_factory=dict)  # probe id -> arrival time
+    reader: asyncio.Task = None
+
+    @property
+    def open(self):
+        return self.ws is not None and not self.ws.closed
+
+
+async def open_connection(session, base_url, token):
+    """Negotiate + WebSocket + handshake; return the open websocket."""
+    headers = {"Authorization": f"Bearer {token}"}
+    async with session.post(f"{base_url}{HUB_PATH}/negotiate?negotiateVersion=1", headers=headers) as r:
+        r.raise_for_status()
+        negotiated = await r.json()
+    connection_token = negotiated.get("connectionToken") or negotiated["connectionId"]
+    ws_url = base_url.replace("https://", "wss://").replace("http://", "ws://")
+    ws = await session.ws_connect(f"{ws_url}{HUB_PATH}?id={connection_token}", headers=headers,
+                                  autoping=True, heartbeat=None)
+    await ws.send_str(encode({"protocol": "json", "version": 1}))
+    reply = await ws.receive(timeout=10)
+    handshake = decode(reply.data)[0] if isinstance(reply.data, str) else {"error": "no handshake"}
+    if handshake.get("error"):
+        await ws.close()
+        raise ConnectionError(handshake["error"])
+    return ws
+
+
+async def read_loop(client):
+    async for msg in client.ws:
+        if not isinstance(msg.data, str):
+            break
+        now = time.perf_counter()
+        for message in decode(msg.data):
+            if message.get("type") == CLOSE:
+                await client.ws.close()
+                return
+            if message.get("type") != INVOCATION or message.get("target") != "SystemAlert":
+                continue
+            text = (message.get("arguments") or [{}])[0].get("message", "")
+            if text.startswith(PROBE_PREFIX + ":"):
+                _, probe_id, _sent = text.split(":", 2)
+                client.received[probe_id] = now
+
+
+# ---------------------------------------------------------------------------
+# Simulation
+# ---------------------------------------------------------------------------
+
+def parse_ramp(spec):
+    points = sorted((float(t), int(n)) for t, n in (p.split(":") for p in spec.split(",")))
+    if points[0][0] > 0:
+        points.insert(0, (0.0, 0))
+    return points
+
+
+def target_clients(points, elapsed):
+    """Linear interpolation along the ramp; flat after the last point."""
+    for (t0, n0), (t1, n1) in zip(points, points[1:]):
+        if elapsed < t1:
+            return int(n0 + (n1 - n0) * (elapsed - t0) / (t1 - t0)) if t1 > t0 else n1
+    return points[-1][1]
+
+
+class Simulation:
+    def __init__(self, base_url, tokens, ramp, duration, probe_interval, connect_concurrency):
+        self.base_url = base_url
+        self.tokens = tokens  # list of JWTs, assigned round-robin to clients
+        self.ramp = ramp
+        self.duration = duration
+        self.probe_interval = probe_interval
+        self.connect_slots = asyncio.Semaphore(connect_concurrency)
+        self.clients = []
+        self.connect_times = []
+        self.connect_errors = {}
+        self.probes = {}  # probe id -> (sent at, ids of clients open at send time)
+        self.tasks = set()
+
+    def _spawn(self, coro):
+        task = asyncio.ensure_future(coro)
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+        return task
+
+    async def connect(self, session, client):
+        async with self.connect_slots:
+            started = time.perf_counter()
+            try:
+                client.ws = await open_connection(session, self.base_url,
+                                                  self.tokens[client.index % len(self.tokens)])
+            except Exception as e:
+                name = type(e).__name__
+                self.connect_errors[name] = self.connect_errors.get(name, 0) + 1
+                return
+            client.connected_at = time.perf_counter()
+            self.connect_times.append(client.connected_at - started)
+            client.reader = self._spawn(read_loop(client))
+
+    async def keepalive(self):
+        # The server drops clients that stay silent past its timeout (30s by default)
+        while True:
+            await asyncio.sleep(KEEPALIVE_SECONDS)
+            for client in self.clients:
+                if client.open:
+                    self._spawn(client.ws.send_str(encode({"type": PING})))
+
+    async def probe_loop(self, sender):
+        seq = 0
+        while True:
+            await asyncio.sleep(self.probe_interval)
+            open_ids = {c.index for c in self.clients if c.open}
+            if not open_ids:
+                continue
+            seq += 1
+            probe_id = f"{seq}-{uuid.uuid4().hex[:6]}"
+            sent_at = time.perf_counter()
+            self.probes[probe_id] = (sent_at, open_ids)
+            await sender.send_str(encode({
+                "type": INVOCATION,
+                "target": "SendSystemAlert",
+                "arguments": [f"{PROBE_PREFIX}:{probe_id}:{sent_at}", "info"],
+            }))
+
+    async def run(self, grace=5.0):
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=0)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            sender = await open_connection(session, self.base_url, self.tokens[0])
+            # The sender receives its own broadcasts too; drain them so its buffer never fills
+            background = [self._spawn(read_loop(Client(-1, sender))),
+                          self._spawn(self.keepalive()), self._spawn(self.probe_loop(sender))]
+            started = time.perf_counter()
+            last_print = 0
+            while (elapsed := time.perf_counter() - started) < self.duration:
+                want = target_clients(self.ramp, elapsed)
+                while len(self.clients) < want:
+                    client = Client(len(self.clients))
+                    self.clients.append(client)
+                    self._spawn(self.connect(session, client))
+                if elapsed - last_print >= 5:
+                    last_print = elapsed
+                    live = sum(1 for c in self.clients if c.open)
+                    print(f"  t={elapsed:5.0f}s  clients ouverts {live}/{want}  sondes {len(self.probes)}")
+                await asyncio.sleep(0.1)
+
+            for task in background:
+                task.cancel()
+            await asyncio.sleep(grace)  # let in-flight probes arrive
+            await sender.close()
+            await asyncio.gather(*(c.ws.close() for c in self.clients if c.open), return_exceptions=True)
+            for task in list(self.tasks):
+                task.cancel()
+
+    def results(self):
+        latencies, expected, delivered = [], 0, 0
+        clients = {c.index: c for c in self.clients}
+        for probe_id, (sent_at, open_ids) in self.probes.items():
+            for index in open_ids:
+                expected += 1
+                arrived = clients[index].received.get(probe_id)
+                if arrived is not None:
+                    delivered += 1
+                    latencies.append(arrived - sent_at)
+        return {
+            "clients": len(self.clients),
+            "connected": len(self.connect_times),
+            "connect_errors": self.connect_errors,
+            "connect": summarize(self.connect_times),
+            "probes": len(self.probes),
+            "expected": expected,
+            "delivered": delivered,
+            "dropped": expected - delivered,
+            "fanout": summarize(latencies),
+        }
+
+
+def report(results):
+    print("\n" + "=" * 60)
+    print("📡 RÉSULTATS NotificationHub")
+    print("=" * 60)
+    c = results["connect"]
+    print(f"Clients: {results['connected']}/{results['clients']} connectés")
+    if results["connect_errors"]:
+        print(f"  ❌ Échecs: {results['connect_errors']}")
+    print(f"Connexion   p50 {format_ms(c['p50'])}  p95 {format_ms(c['p95'])}  "
+          f"p99 {format_ms(c['p99'])}  max {format_ms(c['max'])}")
+    f = results["fanout"]
+    print(f"Diffusion   p50 {format_ms(f['p50'])}  p95 {format_ms(f['p95'])}  "
+          f"p99 {format_ms(f['p99'])}  max {format_ms(f['max'])}")
+    expected = results["expected"] or 1
+    print(f"Messages: {results['delivered']}/{results['expected']} reçus, "
+          f"{results['dropped']} perdus ({100.0 * results['dropped'] / expected:.2f}%) "
+          f"sur {results['probes']} sondes")
+
+
+def is_local(url):
+    return (urlsplit(url).hostname or "") in LOCAL_HOSTS
+
+
+async def _main(args):
+    runner = None
+    if not args.standin:
+        if not args.url:
+            raise SystemExit("--url ou --standin est requis")
+        if not is_local(args.url) and not args.allow_remote:
+            raise SystemExit(f"{args.url} n'est pas local: les sondes SendSystemAlert seraient reçues par "
+                             "tous les clients connectés. Ajouter --allow-remote pour confirmer.")
+    base_url = (args.url or "").rstrip("/")
+    if args.standin:
+        from nala_ops.hub_standin import start
+
+        _hub, runner, base_url = await start(delay_ms=args.standin_delay_ms,
+                                             drop_rate=args.standin_drop_rate)
+        tokens = [unsigned_token(f"sim-{i}", 1 + i % max(1, args.branches)) for i in range(args.branches)]
+        print(f"🛰️  Hub local: {base_url}{HUB_PATH}")
+    elif args.token:
+        tokens = args.token
+    else:
+        import aiohttp
+
+        if not args.login:
+            raise SystemExit("--login email:password, --token ou --standin est requis")
+        cache = TokenCache(args.token_cache)
+        async with aiohttp.ClientSession() as session:
+            tokens = [await cache.get_async(session, base_url, *login.split(":", 1)) for login in args.login]
+
+    try:
+        sim = Simulation(base_url, tokens, parse_ramp(args.ramp), args.duration,
+                         args.probe_interval, args.connect_concurrency)
+        await sim.run(grace=args.grace)
+        results = sim.results()
+    finally:
+        if runner is not None:
+            await runner.cleanup()
+    report(results)
+    if args.json:
+        save_json(args.json, results)
+    return 1 if results["dropped"] or results["connect_errors"] else 0
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--url", help="URL de base de l'API (localhost, sinon avec --allow-remote)")
+    parser.add_argument("--allow-remote", action="store_true",
+                        help="accepter un hub non local (les sondes sont diffusées à tous ses clients)")
+    parser.add_argument("--login", action="append", help="email:motdepasse; répétable, tokens en cache")
+    parser.add_argument("--token", action="append", help="JWT à utiliser tel quel; répétable")
+    parser.add_argument("--token-cache", help="fichier cache des JWT (défaut: .nala_ops/tokens.json)")
+    parser.add_argument("--ramp", default="0:0,30:500", help="paliers secondes:clients, ex. 0:0,60:2000")
+    parser.add_argument("--duration", type=float, default=60.0, help="durée totale en secondes")
+    parser.add_argument("--probe-interval", type=float, default=2.0, help="secondes entre deux sondes")
+    parser.add_argument("--connect-concurrency", type=int, default=200, help="connexions ouvertes en parallèle")
+    parser.add_argument("--grace", type=float, default=5.0, help="attente des derniers messages à la fin")
+    parser.add_argument("--standin", action="store_true", help="démarrer un hub local (hors ligne)")
+    parser.add_argument("--branches", type=int, default=5, help="succursales simulées avec --standin")
+    parser.add_argument("--standin-delay-ms", type=float, default=0.0)
+    parser.add_argument("--standin-drop-rate", type=float, default=0.0)
+    parser.add_argument("--json", help="écrire les résultats dans ce fichier JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
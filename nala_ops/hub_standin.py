@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Ranplasan lokal pou NotificationHub (SignalR, pwotokòl JSON) pou teste similatè a san rezo.
+
+Implements just enough of the ASP.NET Core SignalR JSON protocol to stand in for
+backend/NalaCreditAPI/Hubs/NotificationHub.cs:
+
+* ``POST /notificationHub/negotiate`` returning a connection token;
+* a WebSocket at ``/notificationHub`` with the ``{"protocol":"json","version":1}``
+  handshake, pings and close messages;
+* the hub methods ``SendSystemAlert`` (broadcast to everyone),
+  ``SendCashSessionAlert`` / ``SendTransactionNotification`` (branch group),
+  ``JoinBranchGroup`` / ``LeaveBranchGroup``; on connect the client joins
+  ``Branch_<BranchId>`` from its JWT, like OnConnectedAsync does.
+
+JWTs are decoded but not verified. ``--delay-ms`` and ``--drop-rate`` inject
+fan-out latency and message loss so the simulator's measurements can be checked.
+
+Usage:
+    python -m nala_ops.hub_standin --port 5055 --delay-ms 5 --drop-rate 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from nala_ops.auth import jwt_claims
+
+RECORD_SEPARATOR = "\x1e"
+
+# SignalR hub protocol message types
+INVOCATION, PING, CLOSE = 1, 6, 7
+
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":")) + RECORD_SEPARATOR
+
+
+def decode(payload):
+    return [json.loads(part) for part in payload.split(RECORD_SEPARATOR) if part]
+
+
+class StandInHub:
+    def __init__(self, delay_ms=0.0, drop_rate=0.0, require_token=True):
+        self.delay = delay_ms / 1000.0
+        self.drop_rate = drop_rate
+        self.require_token = require_token
+        self.pending_tokens = {}
+        self.clients = {}  # connection id -> websocket
+        self.groups = defaultdict(set)
+        self.delivered = 0
+        self.dropped = 0
+
+    # -- HTTP -------------------------------------------------------------
+
+    def app(self):
+        from aiohttp import web
+
+        app = web.Application()
+        app.router.add_post("/notificationHub/negotiate", self.negotiate)
+        app.router.add_get("/notificationHub", self.websocket)
+        app.router.add_get("/api/health", self.health)
+        return app
+
+    def _token(self, request):
+        header = request.headers.get("Authorization", "")
+        if header.startswith("Bearer "):
+            return header[len("Bearer "):]
+        return request.query.get("access_token")
+
+    async def health(self, request):
+        from aiohttp import web
+
+        return web.json_response({"status": "Healthy", "connections": len(self.clients)})
+
+    async def negotiate(self, request):
+        from aiohttp import web
+
+        token = self._token(request)
+        if self.require_token and not token:
+            raise web.HTTPUnauthorized()
+        connection_token = uuid.uuid4().hex
+        self.pending_tokens[connection_token] = jwt_claims(token or "")
+        return web.json_response({
+            "negotiateVersion": 1,
+            "connectionId": uuid.uuid4().hex,
+            "connectionToken": connection_token,
+            "availableTransports": [{"transport": "WebSockets", "transferFormats": ["Text"]}],
+        })
+
+    async def websocket(self, request):
+        from aiohttp import WSMsgType, web
+
+        claims = self.pending_tokens.pop(request.query.get("id", ""), None)
+        if claims is None:
+            raise web.HTTPNotFound()
+
+        ws = web.WebSocketResponse(heartbeat=None)
+        await ws.prepare(request)
+        connection_id = uuid.uuid4().hex
+        handshaken = False
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    break
+                for message in decode(msg.data):
+                    if not handshaken:
+                        # {"protocol":"json","version":1}
+                        await ws.send_str(encode({}))
+                        handshaken = True
+                        self.clients[connection_id] = ws
+                        branch_id = claims.get("BranchId")
+                        if branch_id:
+                            self.groups[f"Branch_{branch_id}"].add(connection_id)
+                        continue
+                    await self.handle(connection_id, ws, message)
+        finally:
+            self.clients.pop(connection_id, None)
+            for members in self.groups.values():
+                members.discard(connection_id)
+        return ws
+
+    # -- Hub methods -------------------------------------------------------
+
+    async def handle(self, connection_id, ws, message):
+        kind = message.get("type")
+        if kind == PING:
+            await ws.send_str(encode({"type": PING}))
+            return
+        if kind == CLOSE:
+            await ws.close()
+            return
+        if kind != INVOCATION:
+            return
+
+        target, args = message.get("target"), message.get("arguments", [])
+        now = datetime.now(timezone.utc).isoformat()
+        if target == "JoinBranchGroup":
+            self.groups[f"Branch_{args[0]}"].add(connection_id)
+        elif target == "LeaveBranchGroup":
+            self.groups[f"Branch_{args[0]}"].discard(connection_id)
+        elif target == "SendSystemAlert":
+            severity = args[1] if len(args) > 1 else "info"
+            await self.fan_out(list(self.clients), "SystemAlert",
+                               {"message": args[0], "severity": severity, "timestamp": now})
+        elif target == "SendCashSessionAlert":
+            await self.fan_out(list(self.groups[f"Branch_{args[0]}"]), "CashSessionAlert",
+                               {"message": args[1], "timestamp": now})
+        elif target == "SendTransactionNotification":
+            await self.fan_out(list(self.groups[f"Branch_{args[0]}"]), "TransactionProcessed", args[1])
+
+        if message.get("invocationId"):
+            await ws.send_str(encode({"type": 3, "invocationId": message["invocationId"], "result": None}))
+
+    async def fan_out(self, connection_ids, target, payload):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        frame = encode({"type": INVOCATION, "target": target, "arguments": [payload]})
+        for connection_id in connection_ids:
+            ws = self.clients.get(connection_id)
+            if ws is None or ws.closed:
+                continue
+            if self.drop_rate and random.random() < self.drop_rate:
+                self.dropped += 1
+                continue
+            await ws.send_str(frame)
+            self.delivered += 1
+
+
+async def start(host="127.0.0.1", port=0, **options):
+    """Start a stand-in hub; return (hub, runner, base_url). Stop with ``await runner.cleanup()``."""
+    from aiohttp import web
+
+    hub = StandInHub(**options)
+    runner = web.AppRunner(hub.app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return hub, runner, f"http://{host}:{bound_port}"
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="latence ajoutée à chaque diffusion")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction de messages perdus (0-1)")
+    parser.add_argument("--no-auth", action="store_true", help="accepter les connexions sans JWT")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    async def serve():
+        _hub, runner, url = await start(args.host, args.port, delay_ms=args.delay_ms,
+                                        drop_rate=args.drop_rate, require_token=not args.no_auth)
+        print(f"🛰️  NotificationHub local sur {url}/notificationHub (Ctrl+C pour arrêter)")
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,524 @@
+#!/usr/bin/env python3
+"""
+Verifikasyon konsistans grand-livre (ledger) pou transfè ant sikisyal, sesyon kès ak rezèv.
+
+Checks, partitioned by branch and day:
+
+* transfers  - each InterBranchTransfers row is internally consistent
+               (source != destination, ConvertedAmount = Amount x ExchangeRate,
+               completed transfers were approved, processed and logged);
+* sessions   - for every closed CashSession (Status 2), opening + movements =
+               closing in HTG and USD, where the movements are:
+               - completed Transactions of the session: Deposit and
+                 CreditPayment (1, 5) in, Withdrawal and CreditDisbursement
+                 (2, 4) out;
+               - completed (Status 2) savings and current account transactions
+                 processed by the cashier during the session: Deposit and
+                 OpeningDeposit (0, 4) in, Withdrawal (1) out;
+               - exchanges by the cashier during the session, signed like
+                 CashSessionController's ExchangeHTGIn/Out and ExchangeUSDIn/Out;
+               - microcredit payments by the cashier created during the session;
+* accounts   - every savings/current account transaction moves the balance by
+               its amount and starts where the previous one ended;
+* reserves   - CurrencyMovements keep BalanceBefore/BalanceAfter continuous.
+
+One extra partition per branch ("all" days) compares the stored account and
+reserve balances with the sum of their transactions.
+
+For every partition a digest is computed on the server (md5 over the rows the
+check would read). The digest is stored in a state file; on the next run only
+partitions whose digest changed, or that had discrepancies, are re-verified.
+
+Usage:
+    python -m nala_ops.ledger_check --from 2025-01-01 --to 2025-01-31 --workers 8
+"""
+
+import argparse
+import hashlib
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from nala_ops import db
+from nala_ops.state import load_json, save_json, state_path
+
+TOLERANCE = Decimal("0.01")
+
+# Enum values as stored by EF Core (see backend/NalaCreditAPI/Models)
+TRANSFER_APPROVED, TRANSFER_IN_TRANSIT, TRANSFER_COMPLETED = 1, 3, 4
+SAVINGS_CREDIT_TYPES = (0, 2, 4)  # Deposit, Interest, OpeningDeposit
+SAVINGS_DEBIT_TYPES = (1, 3)  # Withdrawal, Fee
+
+ALL_DAYS = None
+
+
+@dataclass(frozen=True)
+class Partition:
+    scope: str  # "branch" (integer Branches.Id) or "reserve" (CurrencyReserves.BranchId uuid)
+    branch: str
+    day: date = ALL_DAYS
+
+    @property
+    def key(self):
+        return f"{self.scope}:{self.branch}:{self.day.isoformat() if self.day else 'all'}"
+
+    def params(self):
+        start = self.day or date(1900, 1, 1)
+        end = self.day + timedelta(days=1) if self.day else date(9999, 1, 1)
+        return {"branch": self.branch, "start": start, "end": end}
+
+
+@dataclass
+class Discrepancy:
+    partition: str
+    check: str
+    ref: str
+    message: str
+
+
+@dataclass
+class Check:
+    name: str
+    scope: str
+    daily: bool
+    rows_sql: str
+    verify: callable = field(repr=False)
+
+    def applies_to(self, partition):
+        return partition.scope == self.scope and (partition.day is not None) == self.daily
+
+    @property
+    def digest_sql(self):
+        return f"SELECT count(*), md5(string_agg(q::text, '|' ORDER BY q::text)) FROM ({self.rows_sql}) q"
+
+
+def _money(value):
+    return Decimal(value or 0)
+
+
+def _off(a, b):
+    return abs(_money(a) - _money(b)) > TOLERANCE
+
+
+# ---------------------------------------------------------------------------
+# Transfers
+# ---------------------------------------------------------------------------
+
+TRANSFERS_SQL = """
+    SELECT t."Id", t."TransferNumber", t."FromBranchId", t."ToBranchId",
+           t."Amount", t."ExchangeRate", t."ConvertedAmount", t."Status",
+           t."ApprovedAt", t."ProcessedAt", t."UpdatedAt",
+           EXISTS (SELECT 1 FROM "InterBranchTransferLogs" l
+                   WHERE l."TransferId" = t."Id" AND l."Action" = 'Processed') AS processed_logged
+    FROM "InterBranchTransfers" t
+    WHERE t."FromBranchId" = %(branch)s::int
+      AND t."CreatedAt" >= %(start)s AND t."CreatedAt" < %(end)s
+"""
+
+
+def verify_transfers(rows):
+    for (_id, number, from_branch, to_branch, amount, rate, converted, status,
+         approved_at, processed_at, _updated, processed_logged) in rows:
+        if from_branch == to_branch:
+            yield number, "source et destination identiques"
+        if _money(amount) <= 0:
+            yield number, f"montant non positif ({amount})"
+        expected = _money(amount) if _money(rate) == 1 else _money(amount) * _money(rate)
+        if _off(expected, converted):
+            yield number, f"ConvertedAmount {converted} != Amount x ExchangeRate {expected:.2f}"
+        if status in (TRANSFER_APPROVED, TRANSFER_IN_TRANSIT, TRANSFER_COMPLETED) and approved_at is None:
+            yield number, f"statut {status} sans ApprovedAt"
+        if status == TRANSFER_COMPLETED:
+            if processed_at is None:
+                yield number, "transfert complété sans ProcessedAt"
+            if not processed_logged:
+                yield number, "transfert complété sans log 'Processed'"
+
+
+# ---------------------------------------------------------------------------
+# Cash sessions
+# ---------------------------------------------------------------------------
+
+SESSIONS_SQL = """
+    SELECT cs."Id", cs."UserId",
+           cs."OpeningBalanceHTG", cs."OpeningBalanceUSD",
+           cs."ClosingBalanceHTG", cs."ClosingBalanceUSD",
+           COALESCE(tx.htg, 0) + COALESCE(sv.htg, 0) + COALESCE(ca.htg, 0)
+             + COALESCE(ex.htg, 0) + COALESCE(mp.htg, 0) AS net_htg,
+           COALESCE(tx.usd, 0) + COALESCE(sv.usd, 0) + COALESCE(ca.usd, 0)
+             + COALESCE(ex.usd, 0) + COALESCE(mp.usd, 0) AS net_usd
+    FROM "CashSessions" cs
+    LEFT JOIN LATERAL (
+        SELECT SUM(CASE WHEN t."Type" IN (1, 5) THEN t."Amount"
+                        WHEN t."Type" IN (2, 4) THEN -t."Amount" ELSE 0 END)
+                 FILTER (WHERE t."Currency" = 1) AS htg,
+               SUM(CASE WHEN t."Type" IN (1, 5) THEN t."Amount"
+                        WHEN t."Type" IN (2, 4) THEN -t."Amount" ELSE 0 END)
+                 FILTER (WHERE t."Currency" = 2) AS usd
+        FROM "Transactions" t
+        WHERE t."CashSessionId" = cs."Id" AND t."Status" = 1
+    ) tx ON true
+    LEFT JOIN LATERAL (
+        SELECT SUM(CASE WHEN s."Type" IN (0, 4) THEN s."Amount"
+                        WHEN s."Type" = 1 THEN -s."Amount" ELSE 0 END)
+                 FILTER (WHERE s."Currency" = 0) AS htg,
+               SUM(CASE WHEN s."Type" IN (0, 4) THEN s."Amount"
+                        WHEN s."Type" = 1 THEN -s."Amount" ELSE 0 END)
+                 FILTER (WHERE s."Currency" = 1) AS usd
+        FROM "SavingsTransactions" s
+        WHERE s."ProcessedBy" = cs."UserId" AND s."Status" = 2
+          AND s."ProcessedAt" >= cs."SessionStart" AND s."ProcessedAt" < cs."SessionEnd"
+    ) sv ON true
+    LEFT JOIN LATERAL (
+        SELECT SUM(CASE WHEN c."Type" IN (0, 4) THEN c."Amount"
+                        WHEN c."Type" = 1 THEN -c."Amount" ELSE 0 END)
+                 FILTER (WHERE c."Currency" = 0) AS htg,
+               SUM(CASE WHEN c."Type" IN (0, 4) THEN c."Amount"
+                        WHEN c."Type" = 1 THEN -c."Amount" ELSE 0 END)
+                 FILTER (WHERE c."Currency" = 1) AS usd
+        FROM "CurrentAccountTransactions" c
+        WHERE c."ProcessedBy" = cs."UserId" AND c."Status" = 2
+          AND c."ProcessedAt" >= cs."SessionStart" AND c."ProcessedAt" < cs."SessionEnd"
+    ) ca ON true
+    LEFT JOIN LATERAL (
+        -- Same sign convention as CashSessionController (ExchangeHTGIn/Out, ExchangeUSDIn/Out)
+        SELECT SUM(CASE WHEN e."FromCurrency" = 2 THEN e."ToAmount" ELSE -e."FromAmount" END)
+                 FILTER (WHERE e."FromCurrency" IN (1, 2)) AS htg,
+               SUM(CASE WHEN e."FromCurrency" = 1 THEN e."ToAmount" ELSE -e."FromAmount" END)
+                 FILTER (WHERE e."FromCurrency" IN (1, 2)) AS usd
+        FROM "ExchangeTransactions" e
+        WHERE e."ProcessedBy" = cs."UserId"
+          AND e."CreatedAt" >= cs."SessionStart" AND e."CreatedAt" < cs."SessionEnd"
+    ) ex ON true
+    LEFT JOIN LATERAL (
+        SELECT SUM(p."Amount") FILTER (WHERE p."Currency" = 0) AS htg,
+               SUM(p."Amount") FILTER (WHERE p."Currency" = 1) AS usd
+        FROM microcredit_payments p
+        -- PaymentDate is a date; CreatedAt keeps two sessions of the same day apart
+        WHERE p."ProcessedBy" = cs."UserId"
+          AND p."CreatedAt" >= cs."SessionStart" AND p."CreatedAt" < cs."SessionEnd"
+    ) mp ON true
+    WHERE cs."BranchId" = %(branch)s::int
+      AND cs."SessionStart" >= %(start)s AND cs."SessionStart" < %(end)s
+      AND cs."Status" = 2
+"""
+
+
+def verify_sessions(rows):
+    for (session_id, user_id, open_htg, open_usd, close_htg, close_usd, net_htg, net_usd) in rows:
+        ref = f"session {session_id} ({user_id})"
+        for currency, opening, closing, net in (("HTG", open_htg, close_htg, net_htg),
+                                                ("USD", open_usd, close_usd, net_usd)):
+            if closing is None:
+                yield ref, f"session fermée sans solde de clôture {currency}"
+                continue
+            expected = _money(opening) + _money(net)
+            if _off(expected, closing):
+                yield ref, (f"{currency}: ouverture {opening} + mouvements {_money(net)} = {expected} "
+                            f"mais clôture {closing} (écart {_money(closing) - expected})")
+
+
+# ---------------------------------------------------------------------------
+# Account transactions (per day) and balances (all days)
+# ---------------------------------------------------------------------------
+
+_ACCOUNT_TX_SQL = """
+    SELECT '{kind}' AS kind, t."Id", t."AccountNumber", t."Type", t."Amount", t."Fees",
+           t."BalanceBefore", t."BalanceAfter",
+           (SELECT p."BalanceAfter" FROM "{tx_table}" p
+            WHERE p."AccountId" = t."AccountId" AND p."Status" = 2
+              AND (p."ProcessedAt", p."CreatedAt", p."Id") < (t."ProcessedAt", t."CreatedAt", t."Id")
+            ORDER BY p."ProcessedAt" DESC, p."CreatedAt" DESC, p."Id" DESC
+            LIMIT 1) AS previous_after
+    FROM "{tx_table}" t
+    JOIN "{account_table}" a ON a."Id" = t."AccountId"
+    WHERE a."BranchId" = %(branch)s::int AND t."Status" = 2
+      AND t."ProcessedAt" >= %(start)s AND t."ProcessedAt" < %(end)s
+"""
+
+ACCOUNT_TX_SQL = (
+    _ACCOUNT_TX_SQL.format(kind="savings", tx_table="SavingsTransactions", account_table="SavingsAccounts")
+    + " UNION ALL "
+    + _ACCOUNT_TX_SQL.format(kind="current", tx_table="CurrentAccountTransactions", account_table="CurrentAccounts")
+)
+
+
+def verify_account_transactions(rows):
+    for (kind, tx_id, account, tx_type, amount, fees, before, after, previous_after) in rows:
+        ref = f"{kind} {account} tx {tx_id}"
+        delta = _money(after) - _money(before)
+        if tx_type in SAVINGS_CREDIT_TYPES:
+            expected = (_money(amount),)
+        elif tx_type in SAVINGS_DEBIT_TYPES:
+            # Fees may or may not be taken from the balance together with the amount
+            expected = (-_money(amount), -_money(amount) - _money(fees))
+        else:
+            expected = (delta,)
+        if all(_off(delta, e) for e in expected):
+            yield ref, f"type {tx_type}: solde {before} -> {after} ne correspond pas au montant {amount}"
+        if previous_after is not None and _off(previous_after, before):
+            yield ref, f"BalanceBefore {before} != BalanceAfter précédent {previous_after}"
+
+
+_BALANCES_SQL = """
+    SELECT '{kind}' AS kind, a."AccountNumber", a."Balance",
+           (SELECT SUM(t."BalanceAfter" - t."BalanceBefore") FROM "{tx_table}" t
+            WHERE t."AccountId" = a."Id" AND t."Status" = 2) AS tx_sum,
+           (SELECT t."BalanceAfter" FROM "{tx_table}" t
+            WHERE t."AccountId" = a."Id" AND t."Status" = 2
+            ORDER BY t."ProcessedAt" DESC, t."CreatedAt" DESC, t."Id" DESC
+            LIMIT 1) AS last_after
+    FROM "{account_table}" a
+    WHERE a."BranchId" = %(branch)s::int
+"""
+
+BALANCES_SQL = (
+    _BALANCES_SQL.format(kind="savings", tx_table="SavingsTransactions", account_table="SavingsAccounts")
+    + " UNION ALL "
+    + _BALANCES_SQL.format(kind="current", tx_table="CurrentAccountTransactions", account_table="CurrentAccounts")
+)
+
+
+def verify_balances(rows):
+    for (kind, account, balance, tx_sum, last_after) in rows:
+        ref = f"{kind} {account}"
+        if _off(balance, tx_sum):
+            yield ref, f"solde {balance} != somme des transactions {_money(tx_sum)}"
+        if last_after is not None and _off(balance, last_after):
+            yield ref, f"solde {balance} != BalanceAfter de la dernière transaction {last_after}"
+
+
+# ---------------------------------------------------------------------------
+# Currency reserves
+# ---------------------------------------------------------------------------
+
+RESERVE_MOVEMENTS_SQL = """
+    SELECT m."Id", r."Currency", m."Reference", m."MovementType", m."Amount",
+           m."BalanceBefore", m."BalanceAfter",
+           (SELECT p."BalanceAfter" FROM "CurrencyMovements" p
+            WHERE p."CurrencyReserveId" = m."CurrencyReserveId"
+              AND (p."MovementDate", p."CreatedAt", p."Id") < (m."MovementDate", m."CreatedAt", m."Id")
+            ORDER BY p."MovementDate" DESC, p."CreatedAt" DESC, p."Id" DESC
+            LIMIT 1) AS previous_after
+    FROM "CurrencyMovements" m
+    JOIN "CurrencyReserves" r ON r."Id" = m."CurrencyReserveId"
+    WHERE r."BranchId" = %(branch)s::uuid
+      AND m."MovementDate" >= %(start)s AND m."MovementDate" < %(end)s
+"""
+
+
+def verify_reserve_movements(rows):
+    for (movement_id, currency, reference, movement_type, amount, before, after, previous_after) in rows:
+        ref = f"mouvement {reference or movement_id} (devise {currency})"
+        # The sign depends on the movement type and on the side of an exchange,
+        # so only the magnitude is checked here.
+        if _off(abs(_money(after) - _money(before)), abs(_money(amount))):
+            yield ref, f"type {movement_type}: {before} -> {after} ne correspond pas au montant {amount}"
+        if previous_after is not None and _off(previous_after, before):
+            yield ref, f"BalanceBefore {before} != BalanceAfter précédent {previous_after}"
+
+
+RESERVE_BALANCES_SQL = """
+    SELECT r."Id", r."Currency", r."CurrentBalance",
+           (SELECT m."BalanceAfter" FROM "CurrencyMovements" m
+            WHERE m."CurrencyReserveId" = r."Id"
+            ORDER BY m."MovementDate" DESC, m."CreatedAt" DESC, m."Id" DESC
+            LIMIT 1) AS last_after
+    FROM "CurrencyReserves" r
+    WHERE r."BranchId" = %(branch)s::uuid
+"""
+
+
+def verify_reserve_balances(rows):
+    for (reserve_id, currency, balance, last_after) in rows:
+        if last_after is not None and _off(balance, last_after):
+            yield f"réserve {reserve_id} (devise {currency})", \
+                f"CurrentBalance {balance} != dernier BalanceAfter {last_after}"
+
+
+CHECKS = [
+    Check("transfers", "branch", True, TRANSFERS_SQL, verify_transfers),
+    Check("sessions", "branch", True, SESSIONS_SQL, verify_sessions),
+    Check("accounts", "branch", True, ACCOUNT_TX_SQL, verify_account_transactions),
+    Check("balances", "branch", False, BALANCES_SQL, verify_balances),
+    Check("reserves", "reserve", True, RESERVE_MOVEMENTS_SQL, verify_reserve_movements),
+    Check("reserve-balances", "reserve", False, RESERVE_BALANCES_SQL, verify_reserve_balances),
+]
+
+
+# ---------------------------------------------------------------------------
+# Partitioning and execution
+# ---------------------------------------------------------------------------
+
+PARTITIONS_SQL = """
+    SELECT 'branch', "FromBranchId"::text, "CreatedAt"::date FROM "InterBranchTransfers"
+     WHERE "CreatedAt" >= %(start)s AND "CreatedAt" < %(end)s
+    UNION
+    SELECT 'branch', "BranchId"::text, "SessionStart"::date FROM "CashSessions"
+     WHERE "SessionStart" >= %(start)s AND "SessionStart" < %(end)s
+    UNION
+    SELECT 'branch', a."BranchId"::text, t."ProcessedAt"::date
+      FROM "SavingsTransactions" t JOIN "SavingsAccounts" a ON a."Id" = t."AccountId"
+     WHERE t."ProcessedAt" >= %(start)s AND t."ProcessedAt" < %(end)s
+    UNION
+    SELECT 'branch', a."BranchId"::text, t."ProcessedAt"::date
+      FROM "CurrentAccountTransactions" t JOIN "CurrentAccounts" a ON a."Id" = t."AccountId"
+     WHERE t."ProcessedAt" >= %(start)s AND t."ProcessedAt" < %(end)s
+    UNION
+    SELECT 'reserve', r."BranchId"::text, m."MovementDate"::date
+      FROM "CurrencyMovements" m JOIN "CurrencyReserves" r ON r."Id" = m."CurrencyReserveId"
+     WHERE m."MovementDate" >= %(start)s AND m."MovementDate" < %(end)s
+    UNION
+    SELECT 'branch', "Id"::text, NULL FROM "Branches"
+    UNION
+    SELECT 'reserve', "BranchId"::text, NULL FROM "CurrencyReserves"
+"""
+
+
+def list_partitions(conn, start, end, branches=None):
+    with conn.cursor() as cur:
+        cur.execute(PARTITIONS_SQL, {"start": start, "end": end + timedelta(days=1)})
+        partitions = [Partition(scope, branch, day) for scope, branch, day in cur.fetchall()]
+    if branches:
+        partitions = [p for p in partitions if p.branch in branches]
+    return sorted(partitions, key=lambda p: (p.scope, p.branch, p.day or date.max))
+
+
+def partition_digest(conn, partition):
+    digest = hashlib.md5()
+    params = partition.params()
+    for check in CHECKS:
+        if check.applies_to(partition):
+            with conn.cursor() as cur:
+                cur.execute(check.digest_sql, params)
+                count, md5 = cur.fetchone()
+            digest.update(f"{check.name}:{count}:{md5 or ''};".encode())
+    return digest.hexdigest()
+
+
+def verify_partition(conn, partition, itersize=2000):
+    found = []
+    params = partition.params()
+    for check in CHECKS:
+        if check.applies_to(partition):
+            rows = db.stream(conn, check.rows_sql, params, itersize=itersize)
+            for ref, message in check.verify(rows):
+                found.append(Discrepancy(partition.key, check.name, ref, message))
+    return found
+
+
+def process_partition(pool, partition, previous, full=False):
+    """Return (partition, digest, discrepancies or None when skipped as unchanged)."""
+    with db.pooled(pool) as conn:
+        # One snapshot for the digest and the verification of this partition
+        conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        digest = partition_digest(conn, partition)
+        if not full and previous.get("checksum") == digest and previous.get("discrepancies") == 0:
+            return partition, digest, None
+        return partition, digest, verify_partition(conn, partition)
+
+
+def run(args):
+    start = args.date_from or (date.today() - timedelta(days=30))
+    end = args.date_to or date.today()
+    state_file = args.state or state_path("ledger-check.json")
+    state = load_json(state_file)
+    partition_state = state.setdefault("partitions", {})
+
+    pool = db.make_pool(args.workers, args.dsn)
+    try:
+        with db.pooled(pool) as conn:
+            partitions = list_partitions(conn, start, end, set(args.branch or []))
+
+        print("=" * 60)
+        print("VÉRIFICATION DU GRAND-LIVRE")
+        print("=" * 60)
+        print(f"Période: {start} -> {end}")
+        print(f"Partitions: {len(partitions)} ({args.workers} workers)")
+
+        started = time.perf_counter()
+        verified = skipped = 0
+        discrepancies, failures = [], {}
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            futures = {
+                executor.submit(process_partition, pool, p, partition_state.get(p.key, {}), args.full): p
+                for p in partitions
+            }
+            for future in as_completed(futures):
+                try:
+                    partition, digest, found = future.result()
+                except Exception as e:  # keep the other partitions and their checksums
+                    partition = futures[future]
+                    failures[partition.key] = f"{type(e).__name__}: {e}".strip()
+                    partition_state[partition.key] = {
+                        "error": failures[partition.key],
+                        "checked_at": datetime.now().isoformat(timespec="seconds"),
+                    }
+                    continue
+                if found is None:
+                    skipped += 1
+                    continue
+                verified += 1
+                discrepancies.extend(found)
+                partition_state[partition.key] = {
+                    "checksum": digest,
+                    "discrepancies": len(found),
+                    "checked_at": datetime.now().isoformat(timespec="seconds"),
+                }
+        elapsed = time.perf_counter() - started
+    finally:
+        pool.closeall()
+
+    state["last_run"] = datetime.now().isoformat(timespec="seconds")
+    save_json(state_file, state)
+
+    report(discrepancies, failures)
+    print(f"\nVérifiées: {verified}, inchangées (ignorées): {skipped}, en erreur: {len(failures)}, "
+          f"durée: {elapsed:.1f}s")
+    if args.json:
+        save_json(args.json, [d.__dict__ for d in discrepancies]
+                  + [{"partition": key, "check": None, "ref": None, "message": error}
+                     for key, error in sorted(failures.items())])
+    if failures:
+        return 2
+    return 1 if discrepancies else 0
+
+
+def report(discrepancies, failures=None):
+    print("\n" + "=" * 60)
+    print(f"ÉCARTS TROUVÉS: {len(discrepancies)}")
+    print("=" * 60)
+    for d in sorted(discrepancies, key=lambda d: (d.partition, d.check, d.ref)):
+        print(f"  ❌ [{d.partition}] {d.check} - {d.ref}: {d.message}")
+    if not discrepancies:
+        print("  ✅ Aucun écart")
+    for key, error in sorted((failures or {}).items()):
+        print(f"  ⚠️  [{key}] non vérifiée: {error}")
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    db.add_dsn_argument(parser)
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat,
+                        help="premier jour (YYYY-MM-DD, défaut: il y a 30 jours)")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat,
+                        help="dernier jour inclus (défaut: aujourd'hui)")
+    parser.add_argument("--branch", action="append",
+                        help="limiter à une succursale (Id, ou uuid pour les réserves); répétable")
+    parser.add_argument("--workers", type=int, default=4, help="partitions vérifiées en parallèle")
+    parser.add_argument("--state", help="fichier d'état des checksums (défaut: .nala_ops/ledger-check.json)")
+    parser.add_argument("--full", action="store_true", help="re-vérifier même les partitions inchangées")
+    parser.add_argument("--json", help="écrire aussi les écarts dans ce fichier JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
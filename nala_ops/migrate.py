@@ -0,0 +1,965 @@
+#!/usr/bin/env python3
+"""
+Aplike patch SQL yo (add-*.sql) sou baz done ki an sèvis san bloke kesye yo.
+
+Each script is split into statements (``DO $$ ... $$`` blocks made of
+``IF NOT EXISTS ... THEN ALTER TABLE ...`` guards are unwrapped into plain
+``IF NOT EXISTS`` statements). For every statement the runner predicts the lock
+it takes and how long it would hold it, from the table sizes in ``pg_class``:
+
+* ``ADD COLUMN`` without default, or with a non-volatile default on
+  PostgreSQL >= 11, only touches the catalog;
+* volatile defaults, type changes, ``SET NOT NULL`` and constraint
+  validation scan or rewrite the table under a lock that blocks writes;
+* a plain ``CREATE INDEX`` blocks writes for the whole build.
+
+Statements whose blocking time exceeds ``--max-blocking-ms`` are rewritten into
+online forms: ``CREATE INDEX CONCURRENTLY``, ``UNIQUE ... USING INDEX`` on a
+concurrently built index, ``NOT VALID`` constraints validated afterwards,
+``SET NOT NULL`` through a validated CHECK (PostgreSQL >= 12), and volatile
+defaults / large ``UPDATE`` / ``DELETE`` as primary-key ordered batches, each in
+its own short transaction. Consecutive catalog-only ``ALTER TABLE`` statements
+on the same table are merged so the lock is taken once.
+
+Every DDL step runs with ``lock_timeout`` and is retried with backoff, so a
+long-running cashier transaction makes the patch wait instead of queueing all
+the cashiers behind it. Timings per step are written to
+``.nala_ops/migrate.json``; completed steps are skipped when a script is rerun.
+
+Without ``--apply`` only the plan is printed. ``--offline`` plans without a
+database (sizes unknown, everything that could block is rewritten). To try a
+patch first, restore nalakredit_schema_before.sql into a local PostgreSQL, seed
+the tables and run with ``--dsn`` pointing at it.
+
+Usage:
+    python -m nala_ops.migrate add-related-transaction-id-column.sql
+    python -m nala_ops.migrate --apply add-rowversion-column.sql scripts/add-unique-indexes.sql
+"""
+
+import argparse
+import hashlib
+import random
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from nala_ops import db
+from nala_ops.state import load_json, save_json, state_path
+
+ACCESS_SHARE = "ACCESS SHARE"
+ROW_EXCLUSIVE = "ROW EXCLUSIVE"
+SHARE_UPDATE_EXCLUSIVE = "SHARE UPDATE EXCLUSIVE"
+SHARE = "SHARE"
+SHARE_ROW_EXCLUSIVE = "SHARE ROW EXCLUSIVE"
+ACCESS_EXCLUSIVE = "ACCESS EXCLUSIVE"
+
+LOCK_ORDER = [None, ACCESS_SHARE, ROW_EXCLUSIVE, SHARE_UPDATE_EXCLUSIVE, SHARE, SHARE_ROW_EXCLUSIVE,
+              ACCESS_EXCLUSIVE]
+# Locks that conflict with the ROW EXCLUSIVE taken by every INSERT/UPDATE/DELETE
+BLOCKS_WRITES = {SHARE, SHARE_ROW_EXCLUSIVE, ACCESS_EXCLUSIVE}
+
+# What a step does to the table: "metadata" only touches the catalog
+WORK_ORDER = ["none", "metadata", "rows", "scan", "index", "rewrite"]
+WORK_LABELS = {"none": "-", "metadata": "catalogue", "rows": "lignes", "scan": "lecture complète",
+               "index": "construction d'index", "rewrite": "réécriture de la table"}
+
+_IDENT = r'(?:"(?:[^"]|"")+"|[A-Za-z_][A-Za-z_0-9$]*)'
+_QUALIFIED = rf"{_IDENT}(?:\s*\.\s*{_IDENT})?"
+_DOLLAR_TAG = re.compile(r"\$(?:[A-Za-z_][A-Za-z_0-9]*)?\$")
+
+_VOLATILE = re.compile(r"\b(?:random|gen_random_uuid|uuid_generate_v\w+|clock_timestamp|timeofday|nextval"
+                       r"|txid_current)\s*\(", re.I)
+_SERIAL = re.compile(r"^\s*(?:small|big)?serial\b", re.I)
+_COLUMN_KEYWORDS = r"(?:DEFAULT|NOT\s+NULL|NULL|CONSTRAINT|REFERENCES|UNIQUE|PRIMARY\s+KEY|CHECK|COLLATE|GENERATED)"
+_MYSQL = re.compile(r"\bENGINE\s*=|\bTINYINT\b|\bDATETIME\b|\bAUTO_INCREMENT\b|ON\s+UPDATE\s+CURRENT_TIMESTAMP"
+                    r"|^\s*(?:UNIQUE\s+)?(?:INDEX|KEY)\s+\w+\s*\(", re.I | re.M)
+_CATALOG_GUARD = re.compile(r"information_schema\.|pg_indexes|pg_tables|pg_class|pg_constraint|pg_attribute", re.I)
+
+
+class NotPostgres(Exception):
+    pass
+
+
+# -- SQL text ----------------------------------------------------------------
+
+
+def split_statements(sql):
+    """Split a script into (line, statement) on top-level semicolons; comments are dropped."""
+    statements, buf, line, first_line = [], [], 1, None
+    i, n = 0, len(sql)
+
+    def flush():
+        text = "".join(buf).strip()
+        if text:
+            statements.append((first_line, text))
+
+    while i < n:
+        c = sql[i]
+        if sql.startswith("--", i):
+            end = sql.find("\n", i)
+            i = n if end < 0 else end
+            continue
+        if sql.startswith("/*", i):
+            end = sql.find("*/", i + 2)
+            end = n if end < 0 else end + 2
+            line += sql.count("\n", i, end)
+            i = end
+            continue
+        if c == ";":
+            flush()
+            buf, first_line = [], None
+            i += 1
+            continue
+        end = i + 1
+        if c in "'\"":
+            while True:
+                end = sql.find(c, end)
+                if end < 0:
+                    end = n
+                    break
+                if sql.startswith(c * 2, end):
+                    end += 2
+                    continue
+                end += 1
+                break
+        elif c == "$":
+            tag = _DOLLAR_TAG.match(sql, i)
+            if tag:
+                close = sql.find(tag.group(0), tag.end())
+                end = n if close < 0 else close + len(tag.group(0))
+        chunk = sql[i:end]
+        if first_line is None and not chunk.isspace():
+            first_line = line
+        buf.append(chunk)
+        line += chunk.count("\n")
+        i = end
+    flush()
+    return statements
+
+
+def split_top_level(text, sep=","):
+    parts, buf, depth, quote = [], [], 0, None
+    for c in text:
+        if quote:
+            quote = None if c == quote else quote
+        elif c in "'\"":
+            quote = c
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+        elif c == sep and depth == 0:
+            parts.append("".join(buf))
+            buf = []
+            continue
+        buf.append(c)
+    parts.append("".join(buf))
+    return [p.strip() for p in parts if p.strip()]
+
+
+def parse_ident(text):
+    text = text.strip()
+    return text[1:-1].replace('""', '"') if text.startswith('"') else text.lower()
+
+
+def parse_name(text):
+    parts = [parse_ident(p) for p in re.findall(_IDENT, text)]
+    return (parts[0], parts[1]) if len(parts) > 1 else ("public", parts[0])
+
+
+def quote_ident(name):
+    return name if re.fullmatch(r"[a-z_][a-z0-9_$]*", name) else '"' + name.replace('"', '""') + '"'
+
+
+def qualified(table):
+    return f"{quote_ident(table[0])}.{quote_ident(table[1])}"
+
+
+def _one_line(sql, width=90):
+    sql = " ".join(sql.split())
+    return sql if len(sql) <= width else sql[: width - 3] + "..."
+
+
+# -- Catalog -----------------------------------------------------------------
+
+
+@dataclass
+class TableInfo:
+    rows: int
+    bytes: int  # heap + TOAST
+    index_bytes: int
+    pk: tuple  # primary key columns
+
+
+TABLE_SQL = """
+    SELECT GREATEST(c.reltuples, 0)::bigint, pg_table_size(c.oid), pg_indexes_size(c.oid),
+           (SELECT array_agg(a.attname::text ORDER BY k.ord)
+              FROM pg_index i
+              CROSS JOIN LATERAL unnest(i.indkey) WITH ORDINALITY AS k(attnum, ord)
+              JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+             WHERE i.indrelid = c.oid AND i.indisprimary)
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = %s AND c.relname = %s AND c.relkind IN ('r', 'p')
+"""
+
+
+class Catalog:
+    """Table sizes from pg_class, or nothing when planning offline."""
+
+    def __init__(self, conn=None, pg_version=150000):
+        self.conn = conn
+        self.pg_version = pg_version
+        self._tables = {}
+        if conn is not None:
+            self.pg_version = int(db.scalar(conn, "SELECT current_setting('server_version_num')"))
+
+    def table(self, table):
+        if self.conn is None or table is None:
+            return None
+        if table not in self._tables:
+            with self.conn.cursor() as cur:
+                cur.execute(TABLE_SQL, table)
+                row = cur.fetchone()
+            # A table created earlier in the same script does not exist yet: it will be empty
+            self._tables[table] = TableInfo(*row[:3], tuple(row[3] or ())) if row else TableInfo(0, 0, 0, ())
+        return self._tables[table]
+
+
+# -- Plan --------------------------------------------------------------------
+
+
+@dataclass
+class Options:
+    pg_version: int = 150000
+    scan_rate: float = 200e6  # bytes/s read by a sequential scan
+    write_rate: float = 40e6  # bytes/s for rewrites, index builds and batched updates
+    max_blocking: float = 0.5  # seconds a write-blocking lock may be held
+
+
+@dataclass
+class Step:
+    kind: str  # ddl | dml | concurrent | backfill | query | session
+    sql: str
+    table: tuple = None
+    lock: str = None
+    work: str = "none"
+    seconds: float = 0.0  # predicted time holding the lock, None when unknown
+    note: str = ""
+    blocking: bool = False  # still blocks writes for too long after planning
+    guard: tuple = None  # (sql, params): skip the step when it returns a row
+    index: str = None  # concurrent index to drop first if left INVALID by a failed build
+    backfill: dict = None
+    prefix: str = None  # "ALTER TABLE x" for catalog-only steps that can be merged
+    actions: list = None
+
+    @property
+    def digest(self):
+        return hashlib.md5(f"{self.kind}:{self.sql}".encode()).hexdigest()[:16]
+
+
+@dataclass
+class Planned:
+    line: int
+    sql: str
+    original: Step  # how the statement would run as written
+    steps: list
+
+
+@dataclass
+class Script:
+    path: str
+    sha256: str
+    statements: list = field(default_factory=list)
+    steps: list = field(default_factory=list)
+    skipped: str = None
+
+
+def _stronger(a, b):
+    return a if LOCK_ORDER.index(a) >= LOCK_ORDER.index(b) else b
+
+
+def _heavier(a, b):
+    return a if WORK_ORDER.index(a) >= WORK_ORDER.index(b) else b
+
+
+class Planner:
+    def __init__(self, catalog, options):
+        self.catalog = catalog
+        self.options = options
+
+    def predict(self, work, info):
+        if work in ("none", "metadata"):
+            return 0.0
+        if info is None:
+            return None
+        if work == "scan":
+            return info.bytes / self.options.scan_rate
+        if work == "rewrite":
+            return (info.bytes + info.index_bytes) / self.options.write_rate
+        return info.bytes / self.options.write_rate
+
+    def risky(self, lock, work, seconds):
+        if lock not in BLOCKS_WRITES and work != "rows":
+            return False
+        if work in ("none", "metadata"):
+            return False
+        return seconds is None or seconds > self.options.max_blocking
+
+    def step(self, kind, sql, table, lock, work, **kwargs):
+        info = self.catalog.table(table)
+        return Step(kind, sql, table, lock, work, self.predict(work, info), **kwargs)
+
+    # -- statements --------------------------------------------------------
+
+    def plan_script(self, path):
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        script = Script(path, hashlib.sha256(text.encode()).hexdigest())
+        try:
+            for line, sql in split_statements(text):
+                original, steps = self.plan_statement(sql)
+                script.statements.append(Planned(line, sql, original, steps))
+        except NotPostgres as e:
+            script.skipped = str(e)
+            return script
+        script.steps = merge_steps([s for p in script.statements for s in p.steps])
+        return script
+
+    def plan_statement(self, sql):
+        """Return (original step, steps to execute)."""
+        word = sql.split(None, 1)[0].upper()
+        if word == "DO":
+            return self.plan_do(sql)
+        if word in ("SELECT", "WITH", "SHOW", "TABLE", "VALUES", "EXPLAIN"):
+            step = Step("query", sql, lock=ACCESS_SHARE)
+            return step, [step]
+        if word in ("BEGIN", "START", "COMMIT", "END", "ROLLBACK"):
+            # Each step gets its own short transaction
+            return Step("session", sql, note="ignoré: le runner gère les transactions"), []
+        if word in ("SET", "RESET"):
+            step = Step("session", sql)
+            return step, [step]
+
+        m = re.match(rf"ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?(?P<table>{_QUALIFIED})\s+(?P<rest>.*)$",
+                     sql, re.I | re.S)
+        if m:
+            return self.plan_alter(sql, m)
+        m = re.match(rf"CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?P<concurrently>CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?"
+                     rf"(?P<name>{_IDENT}\s+)?ON\s+(?:ONLY\s+)?(?P<table>{_QUALIFIED})", sql, re.I)
+        if m:
+            return self.plan_index(sql, m)
+        m = re.match(rf"DROP\s+INDEX\s+(?P<concurrently>CONCURRENTLY\s+)?", sql, re.I)
+        if m:
+            if m["concurrently"]:
+                step = Step("concurrent", sql, lock=SHARE_UPDATE_EXCLUSIVE, work="metadata")
+                return step, [step]
+            original = Step("ddl", sql, lock=ACCESS_EXCLUSIVE, work="metadata")
+            online = Step("concurrent", re.sub(r"^DROP\s+INDEX\s+", "DROP INDEX CONCURRENTLY ", sql, flags=re.I),
+                          lock=SHARE_UPDATE_EXCLUSIVE, work="metadata",
+                          note="n'attend pas derrière les requêtes de lecture")
+            return original, [online]
+        m = re.match(rf"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(?P<table>{_QUALIFIED})", sql, re.I)
+        if m:
+            if _MYSQL.search(sql):
+                raise NotPostgres("syntaxe MySQL (ENGINE, TINYINT, DATETIME...): script ignoré")
+            refs = re.findall(rf"REFERENCES\s+({_QUALIFIED})", sql, re.I)
+            if refs:
+                # The new table is empty; the referenced table is locked while the FK is attached
+                step = self.step("ddl", sql, parse_name(refs[0]), SHARE_ROW_EXCLUSIVE, "metadata")
+            else:
+                step = Step("ddl", sql, parse_name(m["table"]), ACCESS_EXCLUSIVE, "metadata")
+            return step, [step]
+        if word == "COMMENT":
+            step = Step("ddl", sql, lock=SHARE_UPDATE_EXCLUSIVE, work="metadata")
+            return step, [step]
+        if word in ("UPDATE", "DELETE"):
+            return self.plan_dml(sql)
+        if word == "INSERT":
+            step = Step("dml", sql, lock=ROW_EXCLUSIVE, work="none")
+            return step, [step]
+        step = Step("ddl", sql, lock=ACCESS_EXCLUSIVE, work="metadata", seconds=None, note="instruction non analysée")
+        return step, [step]
+
+    def plan_alter(self, sql, m):
+        table_sql = m["table"]
+        table = parse_name(table_sql)
+        info = self.catalog.table(table)
+        prefix = " ".join(sql[: m.start("rest")].split())
+        kept, follow = [], []
+        original_lock, original_work, original_seconds = None, "none", 0.0
+        kept_lock, kept_work, blocking = None, "none", False
+
+        for action in split_top_level(m["rest"]):
+            lock, work, online = self.alter_action(prefix, table_sql, table, info, action)
+            seconds = self.predict(work, info)
+            original_lock, original_work = _stronger(original_lock, lock), _heavier(original_work, work)
+            original_seconds = None if seconds is None or original_seconds is None else original_seconds + seconds
+            if self.risky(lock, work, seconds) and online is not None:
+                kept_action, steps = online
+                follow += steps
+                if kept_action is None:
+                    continue
+                lock, work = ACCESS_EXCLUSIVE, "metadata"
+                action = kept_action
+            elif self.risky(lock, work, seconds):
+                blocking = True
+            kept.append(action)
+            kept_lock, kept_work = _stronger(kept_lock, lock), _heavier(kept_work, work)
+
+        original = Step("ddl", sql, table, original_lock, original_work, original_seconds)
+        steps = []
+        if kept:
+            steps.append(Step("ddl", f"{prefix} {', '.join(kept)}", table, kept_lock, kept_work,
+                              self.predict(kept_work, info), blocking=blocking,
+                              note="aucune forme en ligne: réécriture sous verrou exclusif" if blocking else "",
+                              prefix=prefix if kept_work == "metadata" else None, actions=kept))
+        return original, steps + follow
+
+    def alter_action(self, prefix, table_sql, table, info, action):
+        """Return (lock, work, online) for one ALTER TABLE action.
+
+        ``online`` is None when there is no better form, else
+        (action kept in the ALTER TABLE or None, follow-up steps).
+        """
+        flags = re.I | re.S
+        m = re.match(rf"ADD\s+(?:CONSTRAINT\s+(?P<name>{_IDENT})\s+)?(?P<kind>UNIQUE|PRIMARY\s+KEY)\s*(?P<rest>.*)$",
+                     action, flags)
+        if m:
+            rest = m["rest"]
+            if re.match(r"USING\s+INDEX\b", rest, re.I):
+                return ACCESS_EXCLUSIVE, "metadata", None
+            cols = re.match(r"\((?P<cols>[^()]*)\)\s*(?P<tail>.*)$", rest, re.S)
+            if not m["name"] or not cols or re.search(r"\bDEFERRABLE\b", cols["tail"], re.I):
+                return ACCESS_EXCLUSIVE, "index", None
+            name, kind = m["name"], " ".join(m["kind"].upper().split())
+            tail = f" {cols['tail']}" if cols["tail"] else ""
+            index_name = qualified((table[0], parse_ident(name)))
+            steps = [
+                self.step("concurrent", f"CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                          f"ON {table_sql} ({cols['cols']}){tail}", table, SHARE_UPDATE_EXCLUSIVE, "index",
+                          index=index_name),
+                self.step("ddl", f"{prefix} ADD CONSTRAINT {name} {kind} USING INDEX {name}", table,
+                          ACCESS_EXCLUSIVE, "metadata", guard=self.constraint_guard(table, name),
+                          note="PRIMARY KEY: les colonnes doivent déjà être NOT NULL" if kind != "UNIQUE" else ""),
+            ]
+            return ACCESS_EXCLUSIVE, "index", (None, steps)
+
+        m = re.match(rf"ADD\s+(?:CONSTRAINT\s+(?P<name>{_IDENT})\s+)?(?P<kind>FOREIGN\s+KEY|CHECK)\b", action, flags)
+        if m:
+            lock = SHARE_ROW_EXCLUSIVE if m["kind"].upper().startswith("F") else ACCESS_EXCLUSIVE
+            if re.search(r"\bNOT\s+VALID\s*$", action, re.I):
+                return lock, "metadata", None
+            if not m["name"]:
+                return lock, "scan", None
+            steps = [
+                self.step("ddl", f"{prefix} {action} NOT VALID", table, lock, "metadata",
+                          guard=self.constraint_guard(table, m["name"])),
+                self.step("ddl", f"{prefix} VALIDATE CONSTRAINT {m['name']}", table, SHARE_UPDATE_EXCLUSIVE, "scan"),
+            ]
+            return lock, "scan", (None, steps)
+
+        m = re.match(rf"ADD\s+(?:COLUMN\s+)?(?P<ine>IF\s+NOT\s+EXISTS\s+)?(?P<column>{_IDENT})\s+(?P<definition>.*)$",
+                     action, flags)
+        if m and m["column"].upper() not in ("CONSTRAINT", "UNIQUE", "PRIMARY", "FOREIGN", "CHECK", "EXCLUDE"):
+            return self.add_column(prefix, table_sql, table, info, m)
+
+        m = re.match(rf"ALTER\s+(?:COLUMN\s+)?(?P<column>{_IDENT})\s+(?:SET\s+DATA\s+)?TYPE\b", action, flags)
+        if m:
+            return ACCESS_EXCLUSIVE, "rewrite", None
+        m = re.match(rf"ALTER\s+(?:COLUMN\s+)?(?P<column>{_IDENT})\s+SET\s+NOT\s+NULL\s*$", action, flags)
+        if m:
+            if self.catalog.pg_version < 120000:
+                return ACCESS_EXCLUSIVE, "scan", None
+            return ACCESS_EXCLUSIVE, "scan", (None, self.not_null_steps(prefix, table, m["column"]))
+        if re.match(r"VALIDATE\s+CONSTRAINT\b", action, re.I):
+            return SHARE_UPDATE_EXCLUSIVE, "scan", None
+        return ACCESS_EXCLUSIVE, "metadata", None
+
+    def add_column(self, prefix, table_sql, table, info, m):
+        definition = m["definition"].strip()
+        keyword = re.search(rf"\s{_COLUMN_KEYWORDS}\b", " " + definition, re.I)
+        column_type = (" " + definition)[: keyword.start()].strip() if keyword else definition
+        default = re.search(rf"\bDEFAULT\s+(?P<expr>.+?)(?=\s+{_COLUMN_KEYWORDS}\b|\s*$)", definition, re.I | re.S)
+        default = default["expr"] if default else None
+        not_null = re.search(r"\bNOT\s+NULL\b", definition, re.I)
+
+        if re.search(r"\bGENERATED\b", definition, re.I) or _SERIAL.match(column_type):
+            return ACCESS_EXCLUSIVE, "rewrite", None
+        if re.search(r"\b(?:UNIQUE|PRIMARY\s+KEY)\b", definition, re.I):
+            return ACCESS_EXCLUSIVE, "index", None
+        volatile = default is not None and (_VOLATILE.search(default) or self.catalog.pg_version < 110000)
+        if not volatile:
+            # Non-volatile defaults are stored in the catalog since PostgreSQL 11
+            return ACCESS_EXCLUSIVE, "metadata", None
+        if re.search(r"\b(?:REFERENCES|CHECK|CONSTRAINT)\b", definition, re.I):
+            return ACCESS_EXCLUSIVE, "rewrite", None
+
+        column = m["column"]
+        backfill = self.backfill(f"UPDATE {table_sql} SET {column} = {default}", f"{column} IS NULL", table, info)
+        if backfill is None:
+            return ACCESS_EXCLUSIVE, "rewrite", None
+        steps = [
+            self.step("ddl", f"{prefix} ALTER COLUMN {column} SET DEFAULT {default}", table, ACCESS_EXCLUSIVE,
+                      "metadata", prefix=prefix, actions=[f"ALTER COLUMN {column} SET DEFAULT {default}"]),
+            backfill,
+        ]
+        if not_null:
+            steps += self.not_null_steps(prefix, table, column)
+        return ACCESS_EXCLUSIVE, "rewrite", (f"ADD COLUMN {m['ine'] or ''}{column} {column_type}", steps)
+
+    def not_null_steps(self, prefix, table, column):
+        check = quote_ident(f"{table[1]}_{parse_ident(column)}_not_null"[:63])
+        return [
+            self.step("ddl", f"{prefix} DROP CONSTRAINT IF EXISTS {check}, "
+                      f"ADD CONSTRAINT {check} CHECK ({column} IS NOT NULL) NOT VALID", table,
+                      ACCESS_EXCLUSIVE, "metadata"),
+            self.step("ddl", f"{prefix} VALIDATE CONSTRAINT {check}", table, SHARE_UPDATE_EXCLUSIVE, "scan"),
+            self.step("ddl", f"{prefix} ALTER COLUMN {column} SET NOT NULL", table, ACCESS_EXCLUSIVE, "metadata",
+                      note="la contrainte CHECK validée évite la lecture complète"),
+            self.step("ddl", f"{prefix} DROP CONSTRAINT IF EXISTS {check}", table, ACCESS_EXCLUSIVE, "metadata"),
+        ]
+
+    def constraint_guard(self, table, name):
+        return ("SELECT 1 FROM pg_constraint WHERE conrelid = to_regclass(%s) AND conname = %s",
+                (qualified(table), parse_ident(name)))
+
+    def backfill(self, body, where, table, info):
+        """Batched UPDATE/DELETE on the primary key, or None when it cannot be chunked."""
+        if info is not None and len(info.pk) != 1:
+            return None
+        return self.step("backfill", f"{body} WHERE {where}" if where else body, table, ROW_EXCLUSIVE, "rows",
+                         backfill={"body": body, "where": where, "pk": info.pk[0] if info else None})
+
+    def plan_index(self, sql, m):
+        table = parse_name(m["table"])
+        if m["concurrently"]:
+            step = self.step("concurrent", sql, table, SHARE_UPDATE_EXCLUSIVE, "index")
+            return step, [step]
+        original = self.step("ddl", sql, table, SHARE, "index")
+        if not self.risky(original.lock, original.work, original.seconds):
+            return original, [original]
+        online = self.step("concurrent", re.sub(r"^(CREATE\s+(?:UNIQUE\s+)?INDEX)\s+", r"\1 CONCURRENTLY ", sql,
+                                                flags=re.I), table, SHARE_UPDATE_EXCLUSIVE, "index",
+                           index=qualified((table[0], parse_ident(m["name"]))) if m["name"] else None)
+        return original, [online]
+
+    def plan_dml(self, sql):
+        m = re.match(rf"(?P<body>(?:UPDATE\s+(?:ONLY\s+)?(?P<u>{_QUALIFIED})(?:\s+(?:AS\s+)?(?!SET\b){_IDENT})?"
+                     rf"\s+SET\s+.*?)|(?:DELETE\s+FROM\s+(?:ONLY\s+)?(?P<d>{_QUALIFIED})"
+                     rf"(?:\s+(?:AS\s+)?(?!WHERE\b){_IDENT})?))(?:\s+WHERE\s+(?P<where>.*))?$", sql, re.I | re.S)
+        table = parse_name(m["u"] or m["d"]) if m else None
+        original = self.step("dml", sql, table, ROW_EXCLUSIVE, "rows")
+        if (not m or not self.risky(original.lock, original.work, original.seconds)
+                or m["body"].count("(") != m["body"].count(")")
+                or re.search(r"\b(?:FROM|USING|RETURNING)\b", sql[m.end("d") if m["d"] else m.end("u"):], re.I)):
+            return original, [original]
+        online = self.backfill(m["body"], m["where"], table, self.catalog.table(table))
+        return original, [online or original]
+
+    def plan_do(self, sql):
+        inner = unwrap_do(sql)
+        if inner is None:
+            step = Step("ddl", sql, lock=ACCESS_EXCLUSIVE, work="metadata", seconds=None,
+                        note="bloc DO non décomposé: exécuté tel quel avec lock_timeout")
+            return step, [step]
+        lock, work, seconds, steps = None, "none", 0.0, []
+        for statement in inner:
+            original, inner_steps = self.plan_statement(statement)
+            lock, work = _stronger(lock, original.lock), _heavier(work, original.work)
+            seconds = None if seconds is None or original.seconds is None else seconds + original.seconds
+            steps += inner_steps
+        # The whole block is one transaction: every lock is held until its end
+        return Step("ddl", sql, steps[0].table if steps else None, lock, work, seconds), steps
+
+
+def _existence_guard(cond):
+    """Table named by an information_schema.tables / pg_tables existence query, or None."""
+    if not re.search(r"\bFROM\s+(?:information_schema\.tables|pg_tables)\b", cond, re.I):
+        return None
+    names = re.findall(r"\b(?:table_name|tablename)\s*=\s*'((?:[^']|'')*)'", cond, re.I)
+    if len(names) != 1 or re.search(r"\b(?:OR|NOT)\b", cond, re.I):
+        return None
+    return names[0].replace("''", "'")
+
+
+def unwrap_do(sql):
+    """Plain DDL statements of an ``IF NOT EXISTS (catalog query) THEN ... END IF`` DO block, or None.
+
+    The ``IF NOT EXISTS`` condition is dropped because every statement is made
+    idempotent instead (``ADD COLUMN IF NOT EXISTS``, ``CREATE INDEX IF NOT
+    EXISTS``). ``IF EXISTS`` is only accepted when it checks that the altered
+    table exists, which ``ALTER TABLE IF EXISTS`` expresses; any other
+    condition keeps the block as it is.
+    """
+    m = re.match(r"DO\s*(?P<tag>\$\w*\$)(?P<body>.*)(?P=tag)\s*(?:LANGUAGE\s+plpgsql\s*)?$", sql, re.I | re.S)
+    if not m:
+        return None
+    body = re.match(r"\s*BEGIN\b(?P<inner>.*)\bEND\s*;?\s*$", m["body"], re.I | re.S)
+    if not body:
+        return None
+
+    control = re.compile(r"^\s*(?:(?P<if>(?:ELS)?IF\s+(?P<not>NOT\s+)?EXISTS\s*\((?P<cond>(?:[^()']|'[^']*'"
+                         r"|\((?:[^()']|'[^']*')*\))*)\)\s*THEN)|(?P<else>ELSE)|(?P<end>END\s+IF))\s*", re.I | re.S)
+    statements, stack = [], []  # stack: [in_else, table that must exist (IF EXISTS) or None]
+    for _line, piece in split_statements(body["inner"]):
+        while True:
+            c = control.match(piece)
+            if not c:
+                break
+            if c["if"]:
+                if not _CATALOG_GUARD.search(c["cond"]):
+                    return None
+                if c["if"].upper().startswith("ELSIF"):
+                    return None
+                required = None
+                if not c["not"]:
+                    required = _existence_guard(c["cond"])
+                    if required is None:
+                        return None
+                stack.append([False, required])
+            elif c["else"]:
+                if not stack:
+                    return None
+                stack[-1][0] = True
+            elif stack:
+                stack.pop()
+            piece = piece[c.end():]
+        if not piece or re.match(r"RAISE\b", piece, re.I):
+            continue
+        if any(in_else for in_else, _ in stack):
+            return None
+        required = {table for _, table in stack if table is not None}
+        alter = re.match(rf"ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?P<table>{_QUALIFIED})\s+(?P<rest>.*)$",
+                         piece, re.I | re.S)
+        if required and not (alter and required == {parse_name(alter["table"])[1]}):
+            return None
+        if alter:
+            actions = split_top_level(alter["rest"])
+            if not all(re.match(r"ADD\s+COLUMN\b|DROP\s+COLUMN\s+IF\s+EXISTS\b", a, re.I) for a in actions):
+                return None
+            piece = re.sub(r"\bADD\s+COLUMN\s+(?!IF\s+NOT\s+EXISTS)", "ADD COLUMN IF NOT EXISTS ", piece, flags=re.I)
+            if required:
+                piece = re.sub(r"^ALTER\s+TABLE\s+(?!IF\s+EXISTS)", "ALTER TABLE IF EXISTS ", piece, flags=re.I)
+            statements.append(piece)
+        elif re.match(rf"CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?{_IDENT}\s+ON\b",
+                      piece, re.I):
+            statements.append(re.sub(r"^(CREATE\s+(?:UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?)(?!IF\s+NOT\s+EXISTS)",
+                                     r"\1IF NOT EXISTS ", piece, flags=re.I))
+        else:
+            return None
+    return statements if not stack else None
+
+
+def merge_steps(steps):
+    """Merge consecutive catalog-only ALTER TABLE steps on the same table into one."""
+    merged = []
+    for step in steps:
+        previous = merged[-1] if merged else None
+        if (previous is not None and step.prefix and previous.prefix == step.prefix
+                and step.guard is None and previous.guard is None):
+            previous.actions = previous.actions + step.actions
+            previous.sql = f"{previous.prefix} {', '.join(previous.actions)}"
+            previous.lock = _stronger(previous.lock, step.lock)
+            continue
+        merged.append(step)
+    return merged
+
+
+# -- Execution ---------------------------------------------------------------
+
+
+class Runner:
+    def __init__(self, conn, lock_timeout_ms=2000, retries=30, batch_size=5000, batch_ms=200,
+                 pause_ms=50, save=None):
+        self.conn = conn
+        self.lock_timeout_ms = lock_timeout_ms
+        self.retries = retries
+        self.batch_size = batch_size
+        self.batch_ms = batch_ms
+        self.pause = pause_ms / 1000.0
+        self.save = save or (lambda: None)
+
+    def backoff(self, attempt):
+        time.sleep(min(10.0, 0.2 * 2 ** attempt) * random.uniform(0.5, 1.0))
+
+    def short_transaction(self, cur, work):
+        """Run ``work(cur)`` in its own transaction with lock_timeout, retrying on lock timeouts."""
+        from psycopg2 import errors
+
+        for attempt in range(1, self.retries + 1):
+            try:
+                cur.execute("BEGIN")
+                cur.execute(f"SET LOCAL lock_timeout = {int(self.lock_timeout_ms)}")
+                result = work(cur)
+                cur.execute("COMMIT")
+                return attempt, result
+            except errors.LockNotAvailable:
+                cur.execute("ROLLBACK")
+                if attempt == self.retries:
+                    raise
+                self.backoff(attempt)
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+    def run(self, step, record):
+        with self.conn.cursor() as cur:
+            if step.kind in ("ddl", "dml"):
+                def work(cur):
+                    if step.guard:
+                        cur.execute(*step.guard)
+                        if cur.fetchone():
+                            return "déjà appliqué"
+                    cur.execute(step.sql)
+                    return cur.rowcount if step.kind == "dml" else None
+
+                record["attempts"], result = self.short_transaction(cur, work)
+                if isinstance(result, str):
+                    record["note"] = result
+                elif result is not None:
+                    record["rows"] = result
+            elif step.kind == "concurrent":
+                record["attempts"] = self.concurrent(cur, step)
+            elif step.kind == "backfill":
+                self.batched(cur, step, record)
+            elif step.kind == "query":
+                cur.execute(step.sql)
+                if cur.description:
+                    print_rows(cur)
+            else:
+                cur.execute(step.sql)
+        for notice in self.conn.notices:
+            print(f"      {notice.strip()}")
+        del self.conn.notices[:]
+
+    def concurrent(self, cur, step):
+        """CONCURRENTLY statements cannot run in a transaction block: autocommit with lock_timeout."""
+        from psycopg2 import errors
+
+        cur.execute(f"SET lock_timeout = {int(self.lock_timeout_ms)}")
+        try:
+            for attempt in range(1, self.retries + 1):
+                if step.index:
+                    # A failed concurrent build leaves an INVALID index that IF NOT EXISTS would keep
+                    cur.execute("SELECT NOT indisvalid FROM pg_index WHERE indexrelid = to_regclass(%s)",
+                                (step.index,))
+                    invalid = cur.fetchone()
+                    if invalid and invalid[0]:
+                        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {step.index}")
+                try:
+                    cur.execute(step.sql)
+                    return attempt
+                except errors.LockNotAvailable:
+                    if attempt == self.retries:
+                        raise
+                    self.backoff(attempt)
+        finally:
+            cur.execute("RESET lock_timeout")
+
+    def batched(self, cur, step, record):
+        spec = step.backfill
+        if spec["pk"] is None:
+            raise RuntimeError("clé primaire inconnue (plan hors ligne)")
+        table = qualified(step.table)
+        pk = quote_ident(spec["pk"])
+        # The script's SQL runs with bound parameters: a literal % (LIKE 'x%') must be doubled
+        body = spec["body"].replace("%", "%%")
+        where = f" AND ({spec['where'].replace('%', '%%')})" if spec["where"] else ""
+        size = self.batch_size
+        last = record.get("last_pk")
+        record.setdefault("rows", 0)
+        record.setdefault("batches", 0)
+        saved = time.monotonic()
+        while True:
+            def work(cur, last=last, size=size):
+                lower, params = (f"WHERE {pk} > %s ", [last]) if last is not None else ("", [])
+                cur.execute(f"SELECT max({pk}), count(*) FROM (SELECT {pk} FROM {table} {lower}"
+                            f"ORDER BY {pk} LIMIT %s) batch", params + [size])
+                upper, count = cur.fetchone()
+                if not count:
+                    return None, 0
+                bound = f"{pk} > %s AND {pk} <= %s" if last is not None else f"{pk} <= %s"
+                cur.execute(f"{body} WHERE {bound}{where}", params + [upper])
+                return upper, cur.rowcount
+
+            started = time.perf_counter()
+            _attempts, (upper, rows) = self.short_transaction(cur, work)
+            if upper is None:
+                return
+            elapsed = time.perf_counter() - started
+            last = upper
+            record["rows"] += max(rows, 0)
+            record["batches"] += 1
+            record["last_pk"] = last
+            # Keep each transaction close to --batch-ms
+            target = self.batch_ms / 1000.0
+            size = max(100, min(self.batch_size * 10, int(size * min(2.0, max(0.5, target / max(elapsed, 1e-3))))))
+            if time.monotonic() - saved > 10:
+                self.save()
+                saved = time.monotonic()
+            time.sleep(self.pause)
+
+
+def print_rows(cur, limit=20):
+    columns = [d[0] for d in cur.description]
+    rows = cur.fetchmany(limit)
+    print("      " + " | ".join(columns))
+    for row in rows:
+        print("      " + " | ".join("" if v is None else str(v) for v in row))
+    if cur.rowcount > limit:
+        print(f"      ... ({cur.rowcount} lignes)")
+
+
+# -- Report ------------------------------------------------------------------
+
+
+def _size(info):
+    if info is None:
+        return "taille inconnue"
+    rows = f"{info.rows:,}".replace(",", " ")
+    return f"{rows} lignes, {info.bytes / 1e6:.1f} MB"
+
+
+def _duration(seconds):
+    if seconds is None:
+        return "durée inconnue"
+    return f"~{seconds * 1000:.0f} ms" if seconds < 1 else f"~{seconds:.1f} s"
+
+
+def describe(step, catalog):
+    blocks = " (bloque les écritures)" if step.lock in BLOCKS_WRITES else ""
+    table = f" sur {qualified(step.table)} [{_size(catalog.table(step.table))}]" if step.table else ""
+    return f"🔒 {step.lock or '-'}{blocks} · {WORK_LABELS[step.work]} · {_duration(step.seconds)}{table}"
+
+
+def print_plan(script, planner):
+    print("\n" + "=" * 60)
+    print(f"📄 {script.path}")
+    print("=" * 60)
+    if script.skipped:
+        print(f"  ⏭️  {script.skipped}")
+        return
+    for planned in script.statements:
+        original = planned.original
+        risky = planner.risky(original.lock, original.work, original.seconds)
+        print(f"  L{planned.line:<4} {_one_line(planned.sql)}")
+        print(f"        {describe(original, planner.catalog)}{'  ⚠️ risqué' if risky else ''}")
+        if original.note:
+            print(f"        ℹ️  {original.note}")
+    print(f"\n  Plan d'exécution ({len(script.steps)} étapes):")
+    for number, step in enumerate(script.steps, 1):
+        flag = "  ❌ bloquant" if step.blocking else ""
+        print(f"  {number:>3}. [{step.kind}] {_one_line(step.sql, 80)}")
+        print(f"        {describe(step, planner.catalog)}{flag}")
+        if step.note:
+            print(f"        ℹ️  {step.note}")
+
+
+def apply_script(script, runner, journal, force=False):
+    entry = journal.setdefault(script.path, {})
+    if entry.get("sha256") != script.sha256:
+        entry.clear()
+        entry["sha256"] = script.sha256
+    if entry.get("completed_at") and not force:
+        print(f"  ✅ déjà appliqué le {entry['completed_at']} (--force pour rejouer)")
+        return True
+    steps = entry.setdefault("steps", {})
+    for number, step in enumerate(script.steps, 1):
+        record = steps.setdefault(step.digest, {"sql": _one_line(step.sql, 200), "kind": step.kind,
+                                                "predicted_s": step.seconds})
+        if record.get("status") == "ok" and not force:
+            print(f"  ⏭️  [{number}/{len(script.steps)}] déjà fait: {_one_line(step.sql, 70)}")
+            continue
+        print(f"  ▶ [{number}/{len(script.steps)}] {step.kind}: {_one_line(step.sql, 70)}")
+        record["started_at"] = datetime.now().isoformat(timespec="seconds")
+        started = time.perf_counter()
+        try:
+            runner.run(step, record)
+        except Exception as e:
+            record.update(status="failed", error=str(e).strip(), seconds=round(time.perf_counter() - started, 3))
+            runner.save()
+            print(f"  ❌ {str(e).strip()}")
+            return False
+        record.update(status="ok", seconds=round(time.perf_counter() - started, 3))
+        runner.save()
+        extra = "".join(f", {k}={record[k]}" for k in ("attempts", "rows", "batches") if record.get(k))
+        print(f"    ✅ {record['seconds']:.3f}s{extra}{' - ' + record['note'] if record.get('note') else ''}")
+    entry["completed_at"] = datetime.now().isoformat(timespec="seconds")
+    runner.save()
+    return True
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    db.add_dsn_argument(parser)
+    parser.add_argument("scripts", nargs="+", help="fichiers SQL, appliqués dans l'ordre donné")
+    parser.add_argument("--apply", action="store_true", help="exécuter (par défaut: afficher le plan seulement)")
+    parser.add_argument("--offline", action="store_true", help="planifier sans base de données")
+    parser.add_argument("--pg-version", type=int, default=15, help="version supposée hors ligne (défaut 15)")
+    parser.add_argument("--max-blocking-ms", type=float, default=500.0,
+                        help="durée max d'un verrou bloquant les écritures avant réécriture (défaut 500)")
+    parser.add_argument("--scan-mb-s", type=float, default=200.0, help="débit de lecture séquentielle estimé")
+    parser.add_argument("--write-mb-s", type=float, default=40.0, help="débit de réécriture/indexation estimé")
+    parser.add_argument("--lock-timeout-ms", type=int, default=2000)
+    parser.add_argument("--retries", type=int, default=30, help="tentatives après un lock_timeout")
+    parser.add_argument("--batch-size", type=int, default=5000, help="lignes par lot au départ")
+    parser.add_argument("--batch-ms", type=float, default=200.0, help="durée visée d'une transaction de lot")
+    parser.add_argument("--pause-ms", type=float, default=50.0, help="pause entre deux lots")
+    parser.add_argument("--allow-blocking", action="store_true",
+                        help="appliquer même les étapes sans forme en ligne (réécritures sous verrou)")
+    parser.add_argument("--force", action="store_true", help="rejouer les scripts/étapes déjà appliqués")
+    parser.add_argument("--state", help="journal des exécutions (défaut: .nala_ops/migrate.json)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.apply and args.offline:
+        print("❌ --apply nécessite une connexion (incompatible avec --offline)")
+        return 2
+    options = Options(
+        pg_version=args.pg_version * 10000 if args.pg_version < 100 else args.pg_version,
+        scan_rate=args.scan_mb_s * 1e6, write_rate=args.write_mb_s * 1e6, max_blocking=args.max_blocking_ms / 1000.0,
+    )
+    conn = None if args.offline else db.connect(args.dsn, autocommit=True)
+    try:
+        catalog = Catalog(conn, options.pg_version)
+        planner = Planner(catalog, options)
+        scripts = [planner.plan_script(path) for path in args.scripts]
+        for script in scripts:
+            print_plan(script, planner)
+        if not args.apply:
+            return 0
+
+        blocking = [(s.path, step) for s in scripts for step in s.steps if step.blocking]
+        if blocking and not args.allow_blocking:
+            print("\n❌ Étapes sans forme en ligne (relancez avec --allow-blocking en heures creuses):")
+            for path, step in blocking:
+                print(f"  - {path}: {_one_line(step.sql, 70)}")
+            return 1
+
+        state_file = args.state or state_path("migrate.json")
+        state = load_json(state_file)
+        journal = state.setdefault("scripts", {})
+        runner = Runner(conn, args.lock_timeout_ms, args.retries, args.batch_size, args.batch_ms,
+                        args.pause_ms, save=lambda: save_json(state_file, state))
+        print("\n" + "=" * 60)
+        print("🚀 APPLICATION")
+        print("=" * 60)
+        for script in scripts:
+            if script.skipped:
+                continue
+            print(f"\n📄 {script.path}")
+            if not apply_script(script, runner, journal, args.force):
+                return 1
+        return 0
+    finally:
+        if conn is not None:
+            conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
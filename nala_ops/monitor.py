@@ -0,0 +1,580 @@
+#!/usr/bin/env python3
+"""
+Monitè sante: API (admin ak branch), PostgreSQL, Redis ak RabbitMQ an paralèl, ak alèt ak metrik Prometheus.
+
+Replaces monitor-containers.sh, check-docker-status.sh and check-backend-logs.sh.
+Every ``--interval`` seconds all targets are probed concurrently, each under
+``--timeout``:
+
+* ``api-admin`` / ``api-branch``: ``GET /api/Health`` must answer 200 with
+  ``status: Healthy`` (HealthController);
+* ``api-admin-db`` / ``api-branch-db``: ``GET /api/DatabaseCheck/database-status``
+  must report ``databaseConnected: true``;
+* ``postgres``: ``SELECT 1`` on a new connection (``--dsn`` / DB_*), or only the
+  protocol handshake for a ``pgping://host:port`` target;
+* ``redis``: ``PING`` (``AUTH`` first when REDIS_PASSWORD is set);
+* ``rabbitmq``: AMQP 0-9-1 handshake up to Connection.Start.
+
+Each target keeps a rolling window of the last ``--window`` results. A target
+is *down* after ``--fail-threshold`` consecutive failures, and *degraded* when
+the median of its last ``--recent`` latencies exceeds ``--degrade-ratio`` times
+its baseline (a longer window fed only while the target is healthy), when the
+window's error rate exceeds ``--max-error-rate``, or when latency has grown by
+more than ``--max-trend-ms-per-min`` across a full window.
+
+State changes are printed, appended to ``.nala_ops/monitor-alerts.jsonl``,
+POSTed to ``--webhook`` and, for *down*, can run ``--on-down`` (for example
+``"docker compose restart {service}"``, like monitor-containers.sh). Metrics
+are served on ``http://<host>:--metrics-port/metrics`` for Prometheus.
+
+``--standin`` replaces every target with the local stand-ins of
+nala_ops.probe_standins. HTTP probes, the webhook and the metrics endpoint
+require ``aiohttp``; the postgres probe requires ``psycopg2``.
+
+Usage:
+    python -m nala_ops.monitor --interval 15 --on-down "docker compose restart {service}"
+    python -m nala_ops.monitor --once --only api-admin,postgres
+    python -m nala_ops.monitor --standin --standin-ramp-ms-per-min 60 --interval 1 --rounds 120
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import shlex
+import statistics
+import struct
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from nala_ops import db
+from nala_ops.auth import BRANCH_API_URL, DEFAULT_API_URL
+from nala_ops.state import state_path
+from nala_ops.stats import format_ms, slope, summarize
+
+HEALTH_PATH = "/api/Health"
+DATABASE_STATUS_PATH = "/api/DatabaseCheck/database-status"
+SSL_REQUEST = struct.pack("!II", 8, 80877103)
+AMQP_HEADER = b"AMQP\x00\x00\x09\x01"
+
+UP, DEGRADED, DOWN = "up", "degraded", "down"
+STATE_VALUES = {UP: 0, DEGRADED: 1, DOWN: 2}
+ICONS = {UP: "✅", DEGRADED: "⚠️ ", DOWN: "❌"}
+
+
+class ProbeError(Exception):
+    pass
+
+
+# ---------------------------------------------------------------------------
+# Targets and probes
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class Target:
+    name: str
+    kind: str  # http, postgres, pgping, redis, amqp
+    address: object  # URL, or a DSN (str / None for DB_*) for postgres
+    service: str = None  # docker compose service, for --on-down
+    expect: tuple = None  # (json field, value) for http targets
+
+
+def _host_port(url, default_port):
+    parts = urlsplit(url)
+    return parts.hostname or "localhost", parts.port or default_port
+
+
+def _json_field(body, name):
+    # ASP.NET serializes camelCase, the stand-ins and older builds may not
+    if isinstance(body, dict):
+        for key, value in body.items():
+            if key.lower() == name.lower():
+                return value
+    return None
+
+
+async def probe_http(target, session, timeout):
+    async with session.get(target.address) as response:
+        if response.status != 200:
+            raise ProbeError(f"HTTP {response.status}")
+        if target.expect:
+            field_name, expected = target.expect
+            value = _json_field(await response.json(content_type=None), field_name)
+            if value != expected:
+                raise ProbeError(f"{field_name}={value!r}")
+
+
+async def probe_postgres(target, session, timeout):
+    def select_one():
+        # wait_for cannot cancel the executor thread: libpq must give up by itself
+        conn = db.connect(target.address, autocommit=True, connect_timeout=max(1, int(timeout)))
+        try:
+            if db.scalar(conn, "SELECT 1") != 1:
+                raise ProbeError("SELECT 1 inattendu")
+        finally:
+            conn.close()
+
+    await asyncio.get_running_loop().run_in_executor(None, select_one)
+
+
+async def _exchange(url, default_port, talk):
+    reader, writer = await asyncio.open_connection(*_host_port(url, default_port))
+    try:
+        await talk(reader, writer)
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def probe_pgping(target, session, timeout):
+    async def talk(reader, writer):
+        writer.write(SSL_REQUEST)
+        await writer.drain()
+        # 'S' or 'N' both mean the postmaster is accepting connections
+        if await reader.read(1) not in (b"S", b"N"):
+            raise ProbeError("pas de réponse au SSLRequest")
+
+    await _exchange(target.address, 5432, talk)
+
+
+def _resp(*words):
+    encoded = [w.encode() for w in words]
+    return b"*%d\r\n" % len(encoded) + b"".join(b"$%d\r\n%s\r\n" % (len(w), w) for w in encoded)
+
+
+async def probe_redis(target, session, timeout):
+    password = urlsplit(target.address).password or os.environ.get("REDIS_PASSWORD")
+
+    async def talk(reader, writer):
+        if password:
+            writer.write(_resp("AUTH", password))
+            await writer.drain()
+            if not (await reader.readline()).startswith(b"+OK"):
+                raise ProbeError("AUTH refusé")
+        writer.write(_resp("PING"))
+        await writer.drain()
+        line = await reader.readline()
+        if not line.startswith(b"+PONG"):
+            raise ProbeError(line.decode(errors="replace").strip() or "pas de réponse")
+
+    await _exchange(target.address, 6379, talk)
+
+
+async def probe_amqp(target, session, timeout):
+    async def talk(reader, writer):
+        writer.write(AMQP_HEADER)
+        await writer.drain()
+        frame_type, _channel, size = struct.unpack("!BHI", await reader.readexactly(7))
+        if frame_type != 1:
+            raise ProbeError("protocole AMQP refusé")
+        payload = await reader.readexactly(size + 1)
+        if struct.unpack("!HH", payload[:4]) != (10, 10) or payload[-1:] != b"\xce":
+            raise ProbeError("Connection.Start attendu")
+
+    await _exchange(target.address, 5672, talk)
+
+
+PROBES = {"http": probe_http, "postgres": probe_postgres, "pgping": probe_pgping,
+          "redis": probe_redis, "amqp": probe_amqp}
+
+
+def build_targets(args):
+    targets = []
+    for label, base_url in (("admin", args.admin_url), ("branch", args.branch_url)):
+        base_url = base_url.rstrip("/")
+        targets.append(Target(f"api-{label}", "http", base_url + HEALTH_PATH, "api", ("status", "Healthy")))
+        targets.append(Target(f"api-{label}-db", "http", base_url + DATABASE_STATUS_PATH, "api",
+                              ("databaseConnected", True)))
+    if isinstance(args.dsn, str) and args.dsn.startswith("pgping://"):
+        targets.append(Target("postgres", "pgping", args.dsn, "postgres"))
+    else:
+        targets.append(Target("postgres", "postgres", args.dsn, "postgres"))
+    targets.append(Target("redis", "redis", args.redis, "redis"))
+    targets.append(Target("rabbitmq", "amqp", args.rabbitmq, "rabbitmq"))
+
+    only = {n.strip() for n in args.only.split(",")} if args.only else None
+    skip = {n.strip() for n in args.skip.split(",")} if args.skip else set()
+    unknown = ((only or set()) | skip) - {t.name for t in targets}
+    if unknown:
+        raise SystemExit(f"Cible(s) inconnue(s): {', '.join(sorted(unknown))} "
+                         f"(disponibles: {', '.join(t.name for t in targets)})")
+    return [t for t in targets if (only is None or t.name in only) and t.name not in skip]
+
+
+# ---------------------------------------------------------------------------
+# Rolling windows and degradation
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Policy:
+    window: int = 40
+    recent: int = 5
+    baseline: int = 240
+    fail_threshold: int = 3
+    degrade_ratio: float = 2.0
+    min_delta: float = 0.05  # seconds
+    max_error_rate: float = 0.2
+    max_trend: float = 50.0  # ms per minute, 0 disables
+
+
+@dataclass
+class Series:
+    target: Target
+    policy: Policy
+    samples: deque = None  # (monotonic time, latency in seconds or None)
+    baseline: deque = None  # latencies recorded while the target was up
+    state: str = UP
+    reason: str = ""
+    consecutive_failures: int = 0
+    probes: int = 0
+    failures: int = 0
+    latency_sum: float = 0.0
+    last_error: str = None
+    trend: float = None  # ms per minute
+    changed_at: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        self.samples = deque(maxlen=self.policy.window)
+        self.baseline = deque(maxlen=self.policy.baseline)
+
+    def latencies(self):
+        return [latency for _, latency in self.samples if latency is not None]
+
+    def record(self, at, latency, error=None):
+        """Add one probe result; return (previous state, new state) when it changed."""
+        self.probes += 1
+        self.samples.append((at, latency))
+        if latency is None:
+            self.failures += 1
+            self.consecutive_failures += 1
+            self.last_error = error
+        else:
+            self.latency_sum += latency
+            self.consecutive_failures = 0
+
+        state, reason = self.evaluate()
+        if state == UP and latency is not None:
+            self.baseline.append(latency)
+        if state == self.state:
+            self.reason = reason
+            return None
+        previous, self.state, self.reason, self.changed_at = self.state, state, reason, time.time()
+        return previous, state
+
+    def evaluate(self):
+        p = self.policy
+        ok = [(at, latency) for at, latency in self.samples if latency is not None]
+        self.trend = slope([(at / 60.0, latency * 1000.0) for at, latency in ok])
+        if self.consecutive_failures >= p.fail_threshold:
+            return DOWN, f"{self.consecutive_failures} échecs consécutifs: {self.last_error}"
+
+        errors = sum(1 for _, latency in self.samples if latency is None)
+        if len(self.samples) >= p.recent and errors / len(self.samples) > p.max_error_rate:
+            return DEGRADED, f"taux d'erreur {100.0 * errors / len(self.samples):.0f}% sur {len(self.samples)} sondes"
+
+        if len(ok) < p.recent:
+            return UP, ""
+
+        recent = statistics.median(latency for _, latency in ok[-p.recent:])
+        if len(self.baseline) >= 2 * p.recent:
+            reference = statistics.median(self.baseline)
+            if recent > reference * p.degrade_ratio and recent - reference > p.min_delta:
+                return DEGRADED, f"médiane récente {format_ms(recent)} vs référence {format_ms(reference)}"
+        if (p.max_trend and self.trend is not None and len(self.samples) == p.window
+                and self.trend > p.max_trend and recent - min(self.latencies()) > p.min_delta):
+            return DEGRADED, f"latence en hausse de {self.trend:.0f} ms/min"
+        return UP, ""
+
+
+# ---------------------------------------------------------------------------
+# Alerts
+# ---------------------------------------------------------------------------
+
+class Alerts:
+    def __init__(self, log_path, webhook=None, on_down=None, cooldown=300.0):
+        self.log_path = log_path
+        self.webhook = webhook
+        self.on_down = on_down
+        self.cooldown = cooldown
+        self.last_action = {}  # service -> time of the last --on-down run
+        self.sent = 0
+
+    async def notify(self, series, previous, session):
+        target = series.target
+        event = {
+            "at": datetime.now().isoformat(timespec="seconds"),
+            "target": target.name,
+            "service": target.service,
+            "from": previous,
+            "to": series.state,
+            "reason": series.reason,
+            "p50_ms": _ms(summarize(series.latencies())["p50"]),
+            "trend_ms_per_min": None if series.trend is None else round(series.trend, 1),
+        }
+        self.sent += 1
+        label = "rétabli" if series.state == UP else series.state.upper()
+        print(f"[{event['at']}] {ICONS[series.state]} {target.name} {label}"
+              f"{': ' + series.reason if series.reason else ''}", flush=True)
+        if self.log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(event, ensure_ascii=False) + "\n")
+        if self.webhook and session is not None:
+            text = f"{ICONS[series.state]} Nala {target.name}: {previous} → {series.state} {series.reason}".strip()
+            try:
+                async with session.post(self.webhook, json=dict(event, text=text)) as response:
+                    if response.status >= 400:
+                        print(f"⚠️  Webhook: HTTP {response.status}", file=sys.stderr)
+            except Exception as e:
+                print(f"⚠️  Webhook: {e}", file=sys.stderr)
+        if series.state == DOWN and self.on_down and target.service:
+            await self.run_on_down(target.service)
+
+    async def run_on_down(self, service):
+        now = time.monotonic()
+        if now - self.last_action.get(service, -math.inf) < self.cooldown:
+            print(f"   ⏭️  {service}: action déjà lancée il y a moins de {self.cooldown:.0f}s")
+            return
+        self.last_action[service] = now
+        command = shlex.split(self.on_down.format(service=service))
+        print(f"   🔄 {' '.join(command)}", flush=True)
+        try:
+            process = await asyncio.create_subprocess_exec(*command)
+            await process.wait()
+        except OSError as e:
+            print(f"   ❌ {e}", file=sys.stderr)
+            return
+        if process.returncode:
+            print(f"   ❌ code de sortie {process.returncode}", file=sys.stderr)
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000.0, 1)
+
+
+# ---------------------------------------------------------------------------
+# Prometheus metrics
+# ---------------------------------------------------------------------------
+
+def render_metrics(series_list):
+    lines = [
+        "# HELP nala_probe_up 1 when the last probe succeeded.",
+        "# TYPE nala_probe_up gauge",
+    ]
+    for s in series_list:
+        up = 1 if s.samples and s.samples[-1][1] is not None else 0
+        lines.append(f'nala_probe_up{{target="{s.target.name}"}} {up}')
+    lines += ["# HELP nala_probe_state 0 up, 1 degraded, 2 down.", "# TYPE nala_probe_state gauge"]
+    lines += [f'nala_probe_state{{target="{s.target.name}"}} {STATE_VALUES[s.state]}' for s in series_list]
+    lines += ["# HELP nala_probe_latency_seconds Probe latency over the rolling window.",
+              "# TYPE nala_probe_latency_seconds summary"]
+    for s in series_list:
+        summary = summarize(s.latencies())
+        for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+            value = "NaN" if summary[key] is None else f"{summary[key]:.6f}"
+            lines.append(f'nala_probe_latency_seconds{{target="{s.target.name}",quantile="{quantile}"}} {value}')
+        lines.append(f'nala_probe_latency_seconds_sum{{target="{s.target.name}"}} {s.latency_sum:.6f}')
+        lines.append(f'nala_probe_latency_seconds_count{{target="{s.target.name}"}} {s.probes - s.failures}')
+    lines += ["# HELP nala_probe_failures_total Failed probes since start.", "# TYPE nala_probe_failures_total counter"]
+    lines += [f'nala_probe_failures_total{{target="{s.target.name}"}} {s.failures}' for s in series_list]
+    lines += ["# HELP nala_probe_trend_ms_per_min Least-squares latency trend over the window.",
+              "# TYPE nala_probe_trend_ms_per_min gauge"]
+    lines += [f'nala_probe_trend_ms_per_min{{target="{s.target.name}"}} '
+              f'{"NaN" if s.trend is None else f"{s.trend:.3f}"}' for s in series_list]
+    return "\n".join(lines) + "\n"
+
+
+async def serve_metrics(series_list, host, port):
+    from aiohttp import web
+
+    async def metrics(request):
+        return web.Response(text=render_metrics(series_list), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
+
+
+# ---------------------------------------------------------------------------
+# Scheduling
+# ---------------------------------------------------------------------------
+
+class Monitor:
+    def __init__(self, targets, policy, alerts, timeout):
+        self.series = [Series(target, policy) for target in targets]
+        self.alerts = alerts
+        self.timeout = timeout
+        self.session = None
+
+    async def probe(self, series):
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(PROBES[series.target.kind](series.target, self.session, self.timeout),
+                                   self.timeout)
+        except asyncio.TimeoutError:
+            return started, None, f"délai de {self.timeout:.0f}s dépassé"
+        except Exception as e:  # any failure of the probed service counts as a failed probe
+            return started, None, str(e) or type(e).__name__
+        return started, time.monotonic() - started, None
+
+    async def round(self):
+        results = await asyncio.gather(*(self.probe(s) for s in self.series))
+        for series, (at, latency, error) in zip(self.series, results):
+            changed = series.record(at, latency, error)
+            if changed:
+                await self.alerts.notify(series, changed[0], self.session)
+        return results
+
+    async def run(self, interval, rounds=None, verbose=False):
+        """Probe every ``interval`` seconds on a fixed cadence; missed ticks are skipped."""
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        done = 0
+        while True:
+            results = await self.round()
+            done += 1
+            if verbose or done == 1:
+                print_round(self.series, results)
+            if rounds and done >= rounds:
+                return
+            next_at += interval
+            late = loop.time() - next_at
+            if late > 0:
+                next_at += math.ceil(late / interval) * interval
+            await asyncio.sleep(next_at - loop.time())
+
+
+def print_round(series_list, results):
+    stamp = datetime.now().strftime("%H:%M:%S")
+    for series, (_at, latency, error) in zip(series_list, results):
+        if latency is None:
+            print(f"[{stamp}] ❌ {series.target.name:<14} {error}", flush=True)
+        else:
+            print(f"[{stamp}] {ICONS[series.state]} {series.target.name:<14} {format_ms(latency)}", flush=True)
+
+
+def report(series_list, alerts):
+    print("\n" + "=" * 60)
+    print("📊 RÉSUMÉ MONITEUR")
+    print("=" * 60)
+    print(f"  {'cible':<14} {'état':<9} {'sondes':>6} {'échecs':>6} {'p50':>9} {'p95':>9} {'p99':>9}  tendance")
+    for s in series_list:
+        summary = summarize(s.latencies())
+        trend = "-" if s.trend is None else f"{s.trend:+.1f} ms/min"
+        print(f"  {s.target.name:<14} {s.state:<9} {s.probes:>6} {s.failures:>6} {format_ms(summary['p50']):>9} "
+              f"{format_ms(summary['p95']):>9} {format_ms(summary['p99']):>9}  {trend}")
+    print(f"\n  Alertes émises: {alerts.sent}")
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--interval", type=float, default=15.0, help="secondes entre deux tours (défaut 15)")
+    parser.add_argument("--timeout", type=float, default=5.0, help="délai maximal par sonde en secondes")
+    parser.add_argument("--once", action="store_true", help="un seul tour; code 1 si une cible échoue")
+    parser.add_argument("--rounds", type=int, default=None, help="arrêter après N tours")
+    parser.add_argument("--verbose", action="store_true", help="afficher chaque tour")
+    parser.add_argument("--only", help="cibles à sonder, séparées par des virgules")
+    parser.add_argument("--skip", help="cibles à ignorer, séparées par des virgules")
+
+    group = parser.add_argument_group("cibles")
+    group.add_argument("--admin-url", default=os.environ.get("API_BASE_URL") or DEFAULT_API_URL)
+    group.add_argument("--branch-url", default=BRANCH_API_URL)
+    db.add_dsn_argument(group, help_text="libpq (défaut: DB_*), ou pgping://hôte:port pour la poignée de main seule")
+    group.add_argument("--redis", default=f"redis://{os.environ.get('REDIS_HOST', 'localhost')}:"
+                                          f"{os.environ.get('REDIS_PORT', '6379')}")
+    group.add_argument("--rabbitmq", default=f"amqp://{os.environ.get('RABBITMQ_HOST', 'localhost')}:5672")
+
+    group = parser.add_argument_group("fenêtres et seuils")
+    group.add_argument("--window", type=int, default=40, help="sondes par fenêtre glissante (défaut 40)")
+    group.add_argument("--recent", type=int, default=5, help="sondes récentes comparées à la référence")
+    group.add_argument("--baseline", type=int, default=240, help="latences saines gardées comme référence")
+    group.add_argument("--fail-threshold", type=int, default=3, help="échecs consécutifs avant 'down'")
+    group.add_argument("--degrade-ratio", type=float, default=2.0, help="médiane récente / référence")
+    group.add_argument("--min-delta-ms", type=float, default=50.0, help="écart minimal pour 'degraded'")
+    group.add_argument("--max-error-rate", type=float, default=0.2, help="taux d'erreur de la fenêtre (0-1)")
+    group.add_argument("--max-trend-ms-per-min", type=float, default=50.0, help="hausse tolérée (0 désactive)")
+
+    group = parser.add_argument_group("alertes et métriques")
+    group.add_argument("--alert-log", default=None, help="JSONL des alertes (défaut .nala_ops/monitor-alerts.jsonl)")
+    group.add_argument("--webhook", help="URL recevant chaque alerte en POST JSON")
+    group.add_argument("--on-down", help='commande lancée quand une cible tombe, ex. "docker compose restart {service}"')
+    group.add_argument("--on-down-cooldown", type=float, default=300.0, help="secondes entre deux actions par service")
+    group.add_argument("--metrics-host", default="0.0.0.0")
+    group.add_argument("--metrics-port", type=int, default=9108, help="port /metrics Prometheus (0 désactive)")
+
+    group = parser.add_argument_group("cibles locales")
+    group.add_argument("--standin", action="store_true", help="sonder les stand-ins de nala_ops.probe_standins")
+    group.add_argument("--standin-delay-ms", type=float, default=0.0)
+    group.add_argument("--standin-ramp-ms-per-min", type=float, default=0.0)
+    group.add_argument("--standin-fail-rate", type=float, default=0.0)
+    return parser
+
+
+async def _main(args):
+    standins = None
+    if args.standin:
+        from nala_ops.probe_standins import StandIns
+
+        standins = StandIns(args.standin_delay_ms, args.standin_fail_rate, args.standin_ramp_ms_per_min)
+        only = {n.strip() for n in (args.only or "").split(",") if n.strip()}
+        skip = {n.strip() for n in (args.skip or "").split(",") if n.strip()}
+        # The API stand-ins need aiohttp; leave them out when no API target is probed
+        api = {"api-admin", "api-admin-db", "api-branch", "api-branch-db"}
+        wants_http = (api & only) if only else bool(api - skip)
+        for option, url in (await standins.start(http=bool(wants_http))).items():
+            setattr(args, option[2:].replace("-", "_"), url)
+
+    targets = build_targets(args)
+    policy = Policy(args.window, args.recent, args.baseline, args.fail_threshold, args.degrade_ratio,
+                    args.min_delta_ms / 1000.0, args.max_error_rate, args.max_trend_ms_per_min)
+    alerts = Alerts(args.alert_log or state_path("monitor-alerts.jsonl"), args.webhook, args.on_down,
+                    args.on_down_cooldown)
+    monitor = Monitor(targets, policy, alerts, args.timeout)
+
+    metrics = None
+    try:
+        if args.webhook or any(t.kind == "http" for t in targets):
+            import aiohttp
+
+            monitor.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=args.timeout))
+        if args.metrics_port and not args.once:
+            metrics = await serve_metrics(monitor.series, args.metrics_host, args.metrics_port)
+            print(f"📈 Métriques: http://{args.metrics_host}:{args.metrics_port}/metrics")
+        print(f"🔍 {len(targets)} cible(s), un tour toutes les {args.interval:g}s")
+        await monitor.run(args.interval, 1 if args.once else args.rounds, args.verbose)
+    finally:
+        if monitor.session is not None:
+            await monitor.session.close()
+        if metrics is not None:
+            await metrics.cleanup()
+        if standins is not None:
+            await standins.close()
+        report(monitor.series, alerts)
+    return monitor.series
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        series_list = asyncio.run(_main(args))
+    except KeyboardInterrupt:
+        return 0
+    if args.once:
+        return 0 if all(s.samples[-1][1] is not None for s in series_list) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
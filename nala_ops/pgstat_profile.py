@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Pwofilè SQL: foto pg_stat_statements anvan ak apre yon script, epi diferans lan.
+
+Wraps any command (typically one of the test-*.py smoke scripts) without
+touching its code::
+
+    python -m nala_ops.pgstat_profile -- python test-all-apis.py
+    python -m nala_ops.pgstat_profile --top 15 -- test-complete-final.py
+
+Before and after the command, ``pg_stat_statements`` and
+``pg_stat_user_tables`` are snapshotted on the database the API uses. The two
+snapshots are diffed and total time, calls, rows and shared-buffer hits/reads
+are attributed to normalized queries (pg_stat_statements already replaces
+constants with $n; lists such as ``IN ($1, $2, $3)`` are further collapsed so
+that EF Core queries differing only by list length are grouped together).
+The top offenders and the tables with the most new sequential scans are
+printed.
+
+It can also be used from Python around a benchmark::
+
+    with profile(dsn) as p:
+        run_benchmark()
+    print_report(p.result)
+
+The extension must be installed on the server (shared_preload_libraries =
+'pg_stat_statements' and ``CREATE EXTENSION pg_stat_statements``). Other
+sessions running at the same time are counted too, so profile on a quiet
+database when possible; the profiler's own snapshot queries are tagged and
+left out.
+
+From PostgreSQL 15, backends report their table counters lazily (an idle
+backend, such as a pooled API connection, flushes them within 10 s), so the
+second snapshot waits ``--flush-wait`` seconds first.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+
+from nala_ops import db
+from nala_ops.state import save_json
+
+# Leading comment on every snapshot query, kept in pg_stat_statements.query
+MARKER = "/* nala_ops.pgstat_profile */"
+# PGSTAT_IDLE_INTERVAL is 10 s: an idle backend has flushed its table counters by then
+FLUSH_WAIT_SECONDS = 11.0
+
+STATEMENT_FIELDS = ("calls", "time_ms", "rows", "shared_hit", "shared_read")
+TABLE_FIELDS = ("seq_scan", "seq_tup_read", "idx_scan", "idx_tup_fetch", "n_tup_ins", "n_tup_upd", "n_tup_del")
+
+STATEMENTS_SQL = MARKER + """
+    SELECT s.queryid, s.userid, s.query, s.calls, s.{time_column}, s.rows,
+           s.shared_blks_hit, s.shared_blks_read
+    FROM pg_stat_statements s
+    JOIN pg_database d ON d.oid = s.dbid
+    WHERE d.datname = current_database()
+"""
+
+TABLES_SQL = MARKER + """
+    SELECT schemaname || '.' || relname, {fields}
+    FROM pg_stat_user_tables
+""".replace("{fields}", ", ".join(f"COALESCE({f}, 0)" for f in TABLE_FIELDS))
+
+
+@dataclass
+class Snapshot:
+    taken_at: float
+    statements: dict  # (queryid, userid) -> (query, {field: value})
+    tables: dict  # table -> {field: value}
+    version: int = 0  # server_version_num
+
+
+@dataclass
+class ProfileResult:
+    seconds: float
+    queries: list = field(default_factory=list)  # dicts, sorted by time_ms desc
+    tables: list = field(default_factory=list)
+
+
+def snapshot(conn):
+    with conn.cursor() as cur:
+        cur.execute(f"{MARKER} SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")
+        if cur.fetchone() is None:
+            raise RuntimeError("pg_stat_statements n'est pas installé: ajoutez-le à shared_preload_libraries "
+                               "puis exécutez CREATE EXTENSION pg_stat_statements;")
+        cur.execute(f"{MARKER} SELECT current_setting('server_version_num')::int")
+        version = cur.fetchone()[0]
+        # total_time was split into plan/exec time in PostgreSQL 13
+        time_column = "total_exec_time" if version >= 130000 else "total_time"
+        cur.execute(STATEMENTS_SQL.format(time_column=time_column))
+        statements = {
+            (queryid, userid): (query, dict(zip(STATEMENT_FIELDS, (calls, float(ms), rows, hit, read))))
+            for queryid, userid, query, calls, ms, rows, hit, read in cur.fetchall()
+            if MARKER not in (query or "")
+        }
+        cur.execute(TABLES_SQL)
+        tables = {row[0]: dict(zip(TABLE_FIELDS, row[1:])) for row in cur.fetchall()}
+    return Snapshot(time.time(), statements, tables, version)
+
+
+_IN_LIST = re.compile(r"\(\s*\$\d+(?:\s*,\s*\$\d+)+\s*\)")
+_VALUES_LIST = re.compile(r"(VALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    query = _WHITESPACE.sub(" ", query).strip()
+    query = _IN_LIST.sub("(...)", query)
+    return _VALUES_LIST.sub(r"\1, ...", query)
+
+
+def _delta(after, before, fields):
+    if before is None or after[fields[0]] < before[fields[0]]:
+        # New entry, or the statistics were reset / evicted during the run
+        return dict(after)
+    return {f: after[f] - before[f] for f in fields}
+
+
+def diff(before, after):
+    grouped = {}
+    for key, (query, counters) in after.statements.items():
+        previous = before.statements.get(key)
+        delta = _delta(counters, previous[1] if previous else None, STATEMENT_FIELDS)
+        if delta["calls"] <= 0:
+            continue
+        entry = grouped.setdefault(normalize_query(query), dict.fromkeys(STATEMENT_FIELDS, 0))
+        for f in STATEMENT_FIELDS:
+            entry[f] += delta[f]
+
+    queries = []
+    for query, totals in grouped.items():
+        blocks = totals["shared_hit"] + totals["shared_read"]
+        queries.append(dict(
+            totals, query=query,
+            mean_ms=totals["time_ms"] / totals["calls"],
+            hit_ratio=totals["shared_hit"] / blocks if blocks else None,
+        ))
+    queries.sort(key=lambda q: q["time_ms"], reverse=True)
+
+    tables = []
+    for table, counters in after.tables.items():
+        delta = _delta(counters, before.tables.get(table), TABLE_FIELDS)
+        if any(delta.values()):
+            tables.append(dict(delta, table=table))
+    tables.sort(key=lambda t: (t["seq_tup_read"], t["seq_scan"]), reverse=True)
+    return ProfileResult(after.taken_at - before.taken_at, queries, tables)
+
+
+class Profiler:
+    def __init__(self, dsn=None, flush_wait=FLUSH_WAIT_SECONDS):
+        self.dsn = dsn
+        self.flush_wait = flush_wait
+        self.before = None
+        self.result = None
+
+    def __enter__(self):
+        # A separate short connection for each snapshot so the profiler's own
+        # session does not stay open (and visible) during the run.
+        conn = db.connect(self.dsn, autocommit=True)
+        try:
+            self.before = snapshot(conn)
+        finally:
+            conn.close()
+        return self
+
+    def __exit__(self, *exc):
+        # pg_stat_force_next_flush() only affects the calling backend, not the
+        # workload's connections, so wait for them instead
+        waited = 0.0
+        if self.before.version >= 150000 and self.flush_wait > 0:
+            time.sleep(self.flush_wait)
+            waited = self.flush_wait
+        conn = db.connect(self.dsn, autocommit=True)
+        try:
+            self.result = diff(self.before, snapshot(conn))
+        finally:
+            conn.close()
+        self.result.seconds -= waited
+        return False
+
+
+def profile(dsn=None, flush_wait=FLUSH_WAIT_SECONDS):
+    return Profiler(dsn, flush_wait)
+
+
+def _shorten(query, width):
+    return query if len(query) <= width else query[: width - 3] + "..."
+
+
+def print_report(result, top=10, width=100):
+    print("\n" + "=" * 60)
+    print(f"📈 PROFIL SQL ({result.seconds:.1f}s, {len(result.queries)} requêtes distinctes)")
+    print("=" * 60)
+    total_ms = sum(q["time_ms"] for q in result.queries) or 1.0
+    print(f"{'temps ms':>10} {'%':>5} {'appels':>7} {'moy ms':>8} {'lignes':>8} {'hit':>9} {'read':>8} {'hit%':>6}")
+    for q in result.queries[:top]:
+        hit_ratio = "-" if q["hit_ratio"] is None else f"{100 * q['hit_ratio']:.0f}"
+        print(f"{q['time_ms']:>10.1f} {100 * q['time_ms'] / total_ms:>5.1f} {q['calls']:>7} "
+              f"{q['mean_ms']:>8.2f} {q['rows']:>8} {q['shared_hit']:>9} {q['shared_read']:>8} {hit_ratio:>6}")
+        print(f"    {_shorten(q['query'], width)}")
+
+    if result.tables:
+        print("\nTables (delta pg_stat_user_tables):")
+        print(f"{'seq_scan':>9} {'seq_lus':>10} {'idx_scan':>9} {'idx_lus':>9}  table")
+        for t in result.tables[:top]:
+            print(f"{t['seq_scan']:>9} {t['seq_tup_read']:>10} {t['idx_scan']:>9} {t['idx_tup_fetch']:>9}  {t['table']}")
+
+
+def resolve_command(command):
+    """Allow ``-- test-all-apis.py`` as a shortcut for ``-- python test-all-apis.py``."""
+    if command and command[0].endswith(".py") and os.path.exists(command[0]):
+        return [sys.executable] + command
+    return command
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    db.add_dsn_argument(parser)
+    parser.add_argument("--top", type=int, default=10, help="nombre de requêtes affichées")
+    parser.add_argument("--width", type=int, default=100, help="largeur max du texte SQL affiché")
+    parser.add_argument("--json", help="écrire le diff complet dans ce fichier JSON")
+    parser.add_argument("--flush-wait", type=float, default=FLUSH_WAIT_SECONDS,
+                        help=f"attente avant la 2e photo sur PostgreSQL 15+ (défaut {FLUSH_WAIT_SECONDS:g}s, "
+                             "compteurs de tables écrits en différé)")
+    parser.add_argument("command", nargs=argparse.REMAINDER, help="commande à profiler, après --")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    command = args.command[1:] if args.command[:1] == ["--"] else args.command
+    if not command:
+        print("❌ Commande manquante, ex.: python -m nala_ops.pgstat_profile -- python test-all-apis.py")
+        return 2
+
+    try:
+        with Profiler(args.dsn, args.flush_wait) as p:
+            returncode = subprocess.call(resolve_command(command))
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 2
+
+    print_report(p.result, args.top, args.width)
+    if args.json:
+        save_json(args.json, {"seconds": p.result.seconds, "returncode": returncode,
+                              "queries": p.result.queries, "tables": p.result.tables})
+    return returncode
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Ranplasan lokal pou tout sib monitè a: API (admin ak branch), PostgreSQL, Redis, RabbitMQ.
+
+Each stand-in answers just what the corresponding probe of nala_ops.monitor
+checks:
+
+* admin / branch API: ``GET /api/Health`` and
+  ``GET /api/DatabaseCheck/database-status`` with the JSON of HealthController
+  and DatabaseCheckController (aiohttp);
+* PostgreSQL: the SSLRequest of the startup handshake, answered with ``N``;
+* Redis: ``AUTH`` / ``PING`` in RESP;
+* RabbitMQ: the AMQP 0-9-1 protocol header, answered with Connection.Start.
+
+``--delay-ms`` adds latency, ``--ramp-ms-per-min`` makes it grow over time (to
+exercise trend detection) and ``--fail-rate`` makes a fraction of requests fail
+(HTTP 503, or the connection is closed without an answer).
+
+Usage:
+    python -m nala_ops.probe_standins --delay-ms 5 --ramp-ms-per-min 30
+"""
+
+import argparse
+import asyncio
+import random
+import struct
+import sys
+import time
+from datetime import datetime, timezone
+
+SSL_REQUEST_CODE = 80877103
+AMQP_HEADER = b"AMQP\x00\x00\x09\x01"
+
+
+def _amqp_connection_start():
+    def longstr(value):
+        return struct.pack("!I", len(value)) + value
+
+    # class 10 (connection), method 10 (start), version 0-9, empty server properties
+    payload = struct.pack("!HHBB", 10, 10, 0, 9) + struct.pack("!I", 0) + longstr(b"PLAIN") + longstr(b"en_US")
+    return struct.pack("!BHI", 1, 0, len(payload)) + payload + b"\xce"
+
+
+class StandIns:
+    def __init__(self, delay_ms=0.0, fail_rate=0.0, ramp_ms_per_min=0.0):
+        self.delay = delay_ms / 1000.0
+        self.fail_rate = fail_rate
+        self.ramp = ramp_ms_per_min / 1000.0
+        self.started = time.monotonic()
+        self.servers = []
+        self.runners = []
+        self.requests = 0
+
+    async def pause(self):
+        """Injected latency; return False when this request should fail."""
+        self.requests += 1
+        delay = self.delay + self.ramp * (time.monotonic() - self.started) / 60.0
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return not (self.fail_rate and random.random() < self.fail_rate)
+
+    # -- HTTP --------------------------------------------------------------
+
+    def app(self, environment):
+        from aiohttp import web
+
+        async def health(request):
+            if not await self.pause():
+                raise web.HTTPServiceUnavailable()
+            return web.json_response({"status": "Healthy", "timestamp": datetime.now(timezone.utc).isoformat(),
+                                      "environment": environment})
+
+        async def database_status(request):
+            if not await self.pause():
+                return web.json_response({"error": "Erreur lors de la vérification du statut",
+                                          "status": "❌ Erreur de connexion à la base de données"}, status=400)
+            return web.json_response({
+                "databaseConnected": True,
+                "statistics": {"totalUsers": 12, "totalRoles": 6, "totalBranches": 3, "totalConfigurations": 4},
+                "status": "✅ Base de données opérationnelle",
+                "databaseName": "nalakreditimachann_db",
+            })
+
+        app = web.Application()
+        app.router.add_get("/api/Health", health)
+        app.router.add_get("/api/health", health)
+        app.router.add_get("/api/DatabaseCheck/database-status", database_status)
+        return app
+
+    async def start_http(self, host, environment):
+        from aiohttp import web
+
+        runner = web.AppRunner(self.app(environment))
+        await runner.setup()
+        site = web.TCPSite(runner, host, 0)
+        await site.start()
+        self.runners.append(runner)
+        return f"http://{host}:{site._server.sockets[0].getsockname()[1]}"
+
+    # -- TCP ---------------------------------------------------------------
+
+    async def start_tcp(self, host, handler):
+        async def serve(reader, writer):
+            try:
+                await handler(reader, writer)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                pass
+            finally:
+                writer.close()
+
+        server = await asyncio.start_server(serve, host, 0)
+        self.servers.append(server)
+        return server.sockets[0].getsockname()[1]
+
+    async def postgres(self, reader, writer):
+        length, code = struct.unpack("!II", await reader.readexactly(8))
+        if length == 8 and code == SSL_REQUEST_CODE and await self.pause():
+            writer.write(b"N")
+            await writer.drain()
+
+    async def redis(self, reader, writer):
+        while True:
+            # RESP array: *<n>\r\n followed by n bulk strings ($<len>\r\n<data>\r\n)
+            header = await reader.readline()
+            if not header:
+                return
+            words = []
+            for _ in range(int(header[1:].strip() or 0)):
+                await reader.readline()
+                words.append((await reader.readline()).strip().upper())
+            if not await self.pause():
+                return
+            writer.write(b"+PONG\r\n" if words[:1] == [b"PING"] else b"+OK\r\n")
+            await writer.drain()
+
+    async def rabbitmq(self, reader, writer):
+        if await reader.readexactly(len(AMQP_HEADER)) == AMQP_HEADER and await self.pause():
+            writer.write(_amqp_connection_start())
+            await writer.drain()
+            await reader.read(1)  # wait for the probe to hang up
+
+    async def start(self, host="127.0.0.1", http=True):
+        """Start the stand-ins; return the monitor options pointing at them.
+
+        ``http=False`` leaves out the two API stand-ins (and aiohttp).
+        """
+        options = {}
+        if http:
+            options["--admin-url"] = await self.start_http(host, "StandIn-Admin")
+            options["--branch-url"] = await self.start_http(host, "StandIn-Branch")
+        options["--dsn"] = f"pgping://{host}:{await self.start_tcp(host, self.postgres)}"
+        options["--redis"] = f"redis://{host}:{await self.start_tcp(host, self.redis)}"
+        options["--rabbitmq"] = f"amqp://{host}:{await self.start_tcp(host, self.rabbitmq)}"
+        return options
+
+    async def close(self):
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+        for runner in self.runners:
+            await runner.cleanup()
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="latence ajoutée à chaque réponse")
+    parser.add_argument("--ramp-ms-per-min", type=float, default=0.0, help="latence supplémentaire par minute")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction de requêtes en échec (0-1)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    async def serve():
+        standins = StandIns(args.delay_ms, args.fail_rate, args.ramp_ms_per_min)
+        options = await standins.start(args.host)
+        print("🧪 Cibles locales (Ctrl+C pour arrêter):")
+        for option, url in options.items():
+            print(f"  {option:<12} {url}")
+        print("\nnala-ops monitor " + " ".join(f"{option} {url}" for option, url in options.items()))
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await standins.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
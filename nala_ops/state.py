@@ -0,0 +1,36 @@
+"""
+Small JSON state files (checksums, checkpoints, indexes) kept between runs.
+"""
+
+import json
+import os
+import tempfile
+
+DEFAULT_STATE_DIR = os.environ.get("NALA_OPS_STATE_DIR", ".nala_ops")
+
+
+def state_path(name, directory=None):
+    return os.path.join(directory or DEFAULT_STATE_DIR, name)
+
+
+def load_json(path, default=None):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {} if default is None else default
+
+
+def save_json(path, data):
+    """Write ``data`` atomically so an interrupted run never leaves half a file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True, default=str)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Jenerasyon relève de compte an gwo (batch) pou tout kont epay ak kont kouran.
+
+Transactions are streamed from a server-side cursor ordered by account, grouped
+into one statement per account in the main process, and rendered (PDF and/or
+CSV) by a process pool. Files land in a sharded tree::
+
+    <out>/<YYYY-MM>/<shard>/<kind>_<AccountNumber>.pdf|.csv
+
+where ``shard`` is the first two hex digits of md5(account number), so no
+directory holds more than a few hundred files.
+
+Each file is written to a temporary name and renamed when complete, so a run
+that is interrupted can simply be started again: accounts whose files already
+exist are skipped.
+
+CSV is the default format and has no extra dependency; PDF output needs
+``reportlab`` (pip install reportlab), which is checked once before starting.
+
+Usage:
+    python -m nala_ops.statements --period 2025-10 --out /srv/releves --format pdf,csv --workers 8
+    python -m nala_ops.statements --period 2025-10 --bench 1,2,4,8 --limit 500
+"""
+
+import argparse
+import csv
+import hashlib
+import importlib.util
+import itertools
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ALL_COMPLETED, FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import date, timedelta
+from decimal import Decimal
+
+from nala_ops import db
+from nala_ops.state import save_json
+
+CURRENCIES = {0: "HTG", 1: "USD"}
+TRANSACTION_TYPES = {
+    0: ("Dépôt", 1),
+    1: ("Retrait", -1),
+    2: ("Intérêt", 1),
+    3: ("Frais", -1),
+    4: ("Dépôt d'ouverture", 1),
+    5: ("Autre", 0),
+}
+KIND_LABELS = {"savings": "Compte d'Épargne", "current": "Compte Courant"}
+
+_STATEMENT_SQL = """
+    SELECT '{kind}' AS kind, a."AccountNumber", a."Currency", b."Name",
+           c."FirstName" || ' ' || c."LastName" AS holder,
+           COALESCE(ob."BalanceAfter", 0) AS opening_balance,
+           t."ProcessedAt", t."Type", COALESCE({receipt}, t."Reference") AS reference,
+           t."Description", t."Amount", t."BalanceAfter", t."CreatedAt", t."Id"
+    FROM "{account_table}" a
+    JOIN "SavingsCustomers" c ON c."Id" = a."CustomerId"
+    LEFT JOIN "Branches" b ON b."Id" = a."BranchId"
+    LEFT JOIN LATERAL (
+        SELECT p."BalanceAfter" FROM "{tx_table}" p
+        WHERE p."AccountId" = a."Id" AND p."Status" = 2 AND p."ProcessedAt" < %(start)s
+        ORDER BY p."ProcessedAt" DESC, p."CreatedAt" DESC, p."Id" DESC
+        LIMIT 1
+    ) ob ON true
+    LEFT JOIN "{tx_table}" t
+           ON t."AccountId" = a."Id" AND t."Status" = 2
+          AND t."ProcessedAt" >= %(start)s AND t."ProcessedAt" < %(end)s
+    WHERE a."OpeningDate" < %(end)s
+      AND (a."ClosedAt" IS NULL OR a."ClosedAt" >= %(start)s)
+"""
+
+_TABLES = {
+    # kind: (account table, transaction table, receipt column)
+    "savings": ("SavingsAccounts", "SavingsTransactions", 't."ReceiptNumber"'),
+    # CurrentAccountTransactions has no ReceiptNumber column
+    "current": ("CurrentAccounts", "CurrentAccountTransactions", "NULL"),
+}
+
+
+def statement_query(kinds):
+    parts = []
+    for kind in kinds:
+        account_table, tx_table, receipt = _TABLES[kind]
+        parts.append(_STATEMENT_SQL.format(
+            kind=kind, account_table=account_table, tx_table=tx_table, receipt=receipt))
+    # kind, AccountNumber, ProcessedAt: one contiguous, chronological run per account;
+    # CreatedAt and Id break ties the same way as the opening balance lookup
+    return " UNION ALL ".join(parts) + " ORDER BY 1, 2, 7 NULLS FIRST, 13, 14"
+
+
+def iter_statements(conn, kinds, start, end, itersize=5000):
+    """Group the ordered row stream into one statement dict per account."""
+    rows = db.stream(conn, statement_query(kinds), {"start": start, "end": end}, itersize=itersize)
+    for (kind, account), group in itertools.groupby(rows, key=lambda r: (r[0], r[1])):
+        first = next(group)
+        transactions = [
+            {
+                "date": r[6], "type": r[7], "reference": r[8], "description": r[9],
+                "amount": r[10], "balance": r[11],
+            }
+            for r in itertools.chain([first], group) if r[6] is not None
+        ]
+        yield {
+            "kind": kind,
+            "account": account,
+            "currency": CURRENCIES.get(first[2], str(first[2])),
+            "branch": first[3] or "",
+            "holder": first[4],
+            "opening_balance": first[5],
+            "start": start,
+            "end": end - timedelta(days=1),
+            "transactions": transactions,
+        }
+
+
+def statement_paths(out_dir, statement, formats):
+    account = statement["account"]
+    shard = hashlib.md5(account.encode()).hexdigest()[:2]
+    base = os.path.join(out_dir, shard, f"{statement['kind']}_{account}")
+    return {fmt: f"{base}.{fmt}" for fmt in formats}
+
+
+def is_done(out_dir, statement, formats):
+    return all(os.path.exists(p) for p in statement_paths(out_dir, statement, formats).values())
+
+
+def _atomic(path, write):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def _closing_balance(statement):
+    if statement["transactions"]:
+        return statement["transactions"][-1]["balance"]
+    return statement["opening_balance"]
+
+
+def write_csv(path, statement):
+    def write(tmp):
+        with open(tmp, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(["Compte", statement["account"], "Titulaire", statement["holder"]])
+            w.writerow(["Période", statement["start"], statement["end"], "Devise", statement["currency"]])
+            w.writerow(["Solde d'ouverture", statement["opening_balance"]])
+            w.writerow(["Date", "Type", "Référence", "Description", "Montant", "Solde"])
+            for t in statement["transactions"]:
+                label, sign = TRANSACTION_TYPES.get(t["type"], (str(t["type"]), 0))
+                amount = t["amount"] * sign if sign else t["amount"]
+                w.writerow([t["date"].strftime("%d/%m/%Y %H:%M"), label, t["reference"] or "--",
+                            t["description"] or "", amount, t["balance"]])
+            w.writerow(["Solde de clôture", _closing_balance(statement)])
+
+    _atomic(path, write)
+
+
+def write_pdf(path, statement):
+    try:
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib.styles import getSampleStyleSheet
+        from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+    except ImportError as e:
+        raise RuntimeError("Le format PDF nécessite reportlab (pip install reportlab)") from e
+
+    styles = getSampleStyleSheet()
+    currency = statement["currency"]
+
+    def money(value):
+        return f"{Decimal(value or 0):,.2f} {currency}"
+
+    story = [
+        Paragraph("NALA KREDI TI MACHANN", styles["Title"]),
+        Paragraph("Institution de Microfinance", styles["Normal"]),
+        Spacer(1, 12),
+        Paragraph("RELEVÉ DE COMPTE", styles["Heading2"]),
+        Table([
+            ["Numéro de compte:", statement["account"], "Type:", KIND_LABELS[statement["kind"]]],
+            ["Titulaire:", statement["holder"], "Succursale:", statement["branch"]],
+            ["Période:", f"{statement['start']:%d/%m/%Y} - {statement['end']:%d/%m/%Y}",
+             "Solde d'ouverture:", money(statement["opening_balance"])],
+        ]),
+        Spacer(1, 12),
+    ]
+
+    rows = [["Date", "Type", "Référence", "Montant", "Solde"]]
+    row_styles = []
+    for i, t in enumerate(statement["transactions"], start=1):
+        label, sign = TRANSACTION_TYPES.get(t["type"], (str(t["type"]), 0))
+        rows.append([t["date"].strftime("%d/%m/%Y %H:%M"), label, t["reference"] or "--",
+                     money(t["amount"]), money(t["balance"])])
+        # Same colour code as the desktop statement: green credits, red debits
+        if sign:
+            colour = colors.HexColor("#10b981" if sign > 0 else "#ef4444")
+            row_styles.append(("TEXTCOLOR", (3, i), (3, i), colour))
+        if i % 2 == 0:
+            row_styles.append(("BACKGROUND", (0, i), (-1, i), colors.HexColor("#f8fafc")))
+    if len(rows) == 1:
+        story.append(Paragraph("Aucune transaction pour cette période", styles["Italic"]))
+    else:
+        table = Table(rows, repeatRows=1, colWidths=[90, 100, 110, 100, 100])
+        table.setStyle(TableStyle([
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+            ("LINEBELOW", (0, 0), (-1, 0), 0.5, colors.black),
+            ("ALIGN", (3, 0), (-1, -1), "RIGHT"),
+        ] + row_styles))
+        story.append(table)
+    story += [
+        Spacer(1, 12),
+        Paragraph(f"Total transactions: {len(statement['transactions'])} — "
+                  f"Solde de clôture: {money(_closing_balance(statement))}", styles["Normal"]),
+    ]
+
+    _atomic(path, lambda tmp: SimpleDocTemplate(tmp, pagesize=A4).build(story))
+
+
+WRITERS = {"csv": write_csv, "pdf": write_pdf}
+
+
+def render_statement(statement, out_dir, formats, overwrite=False):
+    """Process-pool entry point: render every missing format (all with ``overwrite``) for one statement."""
+    for fmt, path in statement_paths(out_dir, statement, formats).items():
+        if overwrite or not os.path.exists(path):
+            WRITERS[fmt](path, statement)
+    return statement["account"]
+
+
+def check_formats(formats):
+    """Return an error message for an unknown format or a missing optional dependency."""
+    unknown = [fmt for fmt in formats if fmt not in WRITERS]
+    if unknown:
+        return f"Format inconnu: {', '.join(unknown)} (choix: {', '.join(WRITERS)})"
+    if "pdf" in formats and importlib.util.find_spec("reportlab") is None:
+        return "Le format PDF nécessite reportlab (pip install reportlab ou pip install nala-ops[pdf])"
+    return None
+
+
+def render_all(statements, out_dir, formats, workers, resume=True):
+    """Render ``statements`` with ``workers`` processes; return (rendered, skipped, errors)."""
+    rendered = skipped = 0
+    errors = []
+    # Bound the number of statements held in memory while waiting for workers
+    max_in_flight = workers * 4
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending, labels = set(), {}
+
+        def drain(return_when):
+            nonlocal pending, rendered
+            done, pending = wait(pending, return_when=return_when)
+            for future in done:
+                label = labels.pop(future)
+                try:
+                    future.result()
+                    rendered += 1
+                except Exception as e:
+                    errors.append(f"{label}: {e}")
+
+        for statement in statements:
+            if resume and is_done(out_dir, statement, formats):
+                skipped += 1
+                continue
+            future = executor.submit(render_statement, statement, out_dir, formats, not resume)
+            labels[future] = f"{statement['kind']} {statement['account']}"
+            pending.add(future)
+            if len(pending) >= max_in_flight:
+                drain(FIRST_COMPLETED)
+        if pending:
+            drain(ALL_COMPLETED)
+    return rendered, skipped, errors
+
+
+def month_bounds(period):
+    start = date.fromisoformat(f"{period}-01")
+    end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start, end
+
+
+def previous_month():
+    first = date.today().replace(day=1)
+    return (first - timedelta(days=1)).strftime("%Y-%m")
+
+
+def run(args):
+    start, end = month_bounds(args.period)
+    formats = args.format.split(",")
+    kinds = args.kinds.split(",")
+    out_dir = os.path.join(args.out, args.period)
+    problem = check_formats(formats)
+    if problem:
+        print(f"❌ {problem}")
+        return 2
+
+    conn = db.connect(args.dsn)
+    try:
+        conn.set_session(readonly=True)
+        statements = iter_statements(conn, kinds, start, end)
+        if args.limit:
+            statements = itertools.islice(statements, args.limit)
+
+        if args.bench:
+            return bench(list(statements), formats, [int(w) for w in args.bench.split(",")])
+
+        print("=" * 60)
+        print(f"RELEVÉS DE COMPTE {args.period} -> {out_dir}")
+        print("=" * 60)
+        started = time.perf_counter()
+        rendered, skipped, errors = render_all(statements, out_dir, formats, args.workers, not args.force)
+        elapsed = time.perf_counter() - started
+    finally:
+        conn.close()
+
+    rate = rendered / elapsed if elapsed else 0
+    print(f"✅ Générés: {rendered}, déjà présents (reprise): {skipped}, erreurs: {len(errors)}")
+    print(f"⏱️  {elapsed:.1f}s, {rate:.1f} relevés/s avec {args.workers} workers")
+    for message in errors[:10]:
+        print(f"  ❌ {message}")
+    save_json(os.path.join(out_dir, "_manifest.json"), {
+        "period": args.period, "formats": formats, "kinds": kinds,
+        "rendered": rendered, "skipped": skipped, "errors": errors,
+        "seconds": round(elapsed, 2), "workers": args.workers,
+    })
+    return 1 if errors else 0
+
+
+def bench(statements, formats, worker_counts):
+    """Render the same statements into scratch directories at each worker count."""
+    print(f"Benchmark: {len(statements)} relevés, formats {','.join(formats)}")
+    print(f"{'workers':>8} {'secondes':>10} {'relevés/s':>10}")
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory(prefix="nala-releves-") as scratch:
+            started = time.perf_counter()
+            render_all(statements, scratch, formats, workers, resume=False)
+            elapsed = time.perf_counter() - started
+        print(f"{workers:>8} {elapsed:>10.2f} {len(statements) / elapsed if elapsed else 0:>10.1f}")
+    return 0
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    db.add_dsn_argument(parser)
+    parser.add_argument("--period", default=previous_month(), help="mois YYYY-MM (défaut: mois précédent)")
+    parser.add_argument("--out", default="releves", help="répertoire de sortie")
+    parser.add_argument("--format", default="csv", help="csv (défaut), pdf ou pdf,csv (pdf: reportlab)")
+    parser.add_argument("--kinds", default="savings,current", help="savings, current ou les deux")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--limit", type=int, help="ne traiter que les N premiers comptes")
+    parser.add_argument("--force", action="store_true", help="régénérer même les fichiers existants")
+    parser.add_argument("--bench", help="liste de nombres de workers à mesurer, ex. 1,2,4,8")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
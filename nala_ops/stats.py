@@ -0,0 +1,42 @@
+"""
+Small statistics helpers shared by the benchmarking and monitoring tools.
+"""
+
+import math
+
+
+def percentile(values, p):
+    """Nearest-rank percentile of ``values`` (p in 0-100); None when empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = math.ceil(p / 100.0 * len(ordered))
+    return ordered[max(0, min(len(ordered), rank) - 1)]
+
+
+def summarize(values):
+    """count / p50 / p95 / p99 / max of ``values``."""
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+def format_ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.1f}ms"
+
+
+def slope(points):
+    """Least-squares slope of (x, y) points; None with fewer than two distinct x."""
+    if len(points) < 2:
+        return None
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if not spread:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Jenere yon hash ASP.NET Core Identity V3 ak script SQL pou kreye yon SuperAdmin
+(ansyen create-superadmin-hash.py).
+
+The password is read from ``--password`` or prompted for; it is never written
+into this file or printed back.
+
+Usage:
+    python -m nala_ops.superadmin --email superadmin@nalacredit.com --output /tmp/create_superadmin.sql
+"""
+
+import argparse
+import base64
+import getpass
+import hashlib
+import os
+import sys
+
+from nala_ops.checks import SUPERADMIN_ROLE
+
+# Format: 0x01 || prf || iter_count || salt_size || salt || subkey
+PRF_HMACSHA256 = 0x01
+ITERATIONS = 10000
+SALT_SIZE = 16
+SUBKEY_LENGTH = 32
+
+SQL_TEMPLATE = '''
+-- Kreye wòl yo si yo pa egziste
+INSERT INTO "AspNetRoles" ("Id", "Name", "NormalizedName", "ConcurrencyStamp")
+VALUES
+    ('superadmin-role', 'SuperAdmin', 'SUPERADMIN', gen_random_uuid()::text),
+    ('admin-role', 'Admin', 'ADMIN', gen_random_uuid()::text),
+    ('manager-role', 'Manager', 'MANAGER', gen_random_uuid()::text),
+    ('cashier-role', 'Cashier', 'CASHIER', gen_random_uuid()::text),
+    ('secretary-role', 'Secretary', 'SECRETARY', gen_random_uuid()::text),
+    ('employee-role', 'Employee', 'EMPLOYEE', gen_random_uuid()::text)
+ON CONFLICT ("Id") DO NOTHING;
+
+-- Efase itilizatè sa a si li egziste
+DELETE FROM "AspNetUsers" WHERE "Email" = {email};
+
+-- Kreye itilizatè a
+INSERT INTO "AspNetUsers" (
+    "Id", "UserName", "NormalizedUserName", "Email", "NormalizedEmail", "EmailConfirmed",
+    "PasswordHash", "SecurityStamp", "ConcurrencyStamp", "PhoneNumberConfirmed",
+    "TwoFactorEnabled", "LockoutEnabled", "AccessFailedCount",
+    "FirstName", "LastName", "Role", "IsActive", "CreatedAt"
+)
+VALUES (
+    gen_random_uuid()::text, {email}, {email_upper}, {email}, {email_upper}, true,
+    {password_hash}, gen_random_uuid()::text, gen_random_uuid()::text, false,
+    false, true, 0,
+    {first_name}, {last_name}, {role}, true, NOW()
+);
+
+-- Lyen ak wòl SuperAdmin
+INSERT INTO "AspNetUserRoles" ("UserId", "RoleId")
+SELECT u."Id", 'superadmin-role'
+FROM "AspNetUsers" u
+WHERE u."Email" = {email}
+ON CONFLICT DO NOTHING;
+'''
+
+
+def identity_v3_hash(password, salt=None):
+    """Password hash compatible with ASP.NET Core Identity V3 (PBKDF2-HMACSHA256)."""
+    salt = salt or os.urandom(SALT_SIZE)
+    subkey = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, ITERATIONS, SUBKEY_LENGTH)
+    output = bytes([0x01, PRF_HMACSHA256]) + ITERATIONS.to_bytes(4, "big") + len(salt).to_bytes(4, "big")
+    return base64.b64encode(output + salt + subkey).decode("ascii")
+
+
+def _literal(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def superadmin_sql(email, password_hash, first_name="Super", last_name="Admin"):
+    return SQL_TEMPLATE.format(
+        email=_literal(email), email_upper=_literal(email.upper()), password_hash=_literal(password_hash),
+        first_name=_literal(first_name), last_name=_literal(last_name), role=SUPERADMIN_ROLE,
+    )
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--email", default="superadmin@nalacredit.com")
+    parser.add_argument("--first-name", default="Super")
+    parser.add_argument("--last-name", default="Admin")
+    parser.add_argument("--password", help="défaut: demandé de façon interactive")
+    parser.add_argument("--output", default="/tmp/create_superadmin.sql")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    password = args.password or getpass.getpass("Nouvo modpas SuperAdmin: ")
+    if not password:
+        print("❌ Modpas vid")
+        return 2
+
+    print("🔐 Ap jenere password hash...")
+    password_hash = identity_v3_hash(password)
+    print(f"✅ Hash kreye: {password_hash[:50]}...")
+    with open(args.output, "w") as f:
+        f.write(superadmin_sql(args.email, password_hash, args.first_name, args.last_name))
+
+    print(f"📝 Script SQL kreye: {args.output}")
+    print("\n🚀 Pou egzekite script sa a nan sèvè pwodiksyon:")
+    print(f"docker exec -i nala-postgres psql -U nalauser -d nalakreditimachann_db < {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Diferans done ant pwodiksyon ak devlopman pa moso (chunk) ak hash, san fè dump.
+
+Each table is split into primary-key ranges. For every range both databases
+compute ``count(*)`` and ``md5(string_agg(md5(row), '' ORDER BY pk))`` on the
+server, so only a few bytes cross the network per range. Ranges whose digests
+match are done; ranges that differ are subdivided again (Merkle-style) until
+they are small enough to compare row hashes key by key. The amount of data
+transferred therefore grows with the size of the drift, not the size of the
+table.
+
+Only columns present on both sides are hashed; columns or tables that exist on
+one side only are reported as schema drift.
+
+Usage:
+    python -m nala_ops.sync_diff --source "host=prod dbname=nalakreditimachann_db user=..." \\
+                                 --target "host=localhost dbname=nalakredit user=postgres"
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from nala_ops import db
+from nala_ops.state import save_json
+
+INTEGER_TYPES = {"smallint", "integer", "bigint"}
+
+TABLES_SQL = """
+    SELECT c.relname,
+           array_agg(a.attname ORDER BY array_position(i.indkey::int2[], a.attnum)) AS pk,
+           array_agg(format_type(a.atttypid, a.atttypmod) ORDER BY array_position(i.indkey::int2[], a.attnum)) AS pk_types
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    JOIN pg_index i ON i.indrelid = c.oid AND i.indisprimary
+    JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum = ANY (i.indkey)
+    WHERE n.nspname = %s AND c.relkind = 'r'
+    GROUP BY c.relname
+"""
+
+COLUMNS_SQL = """
+    SELECT c.table_name, c.column_name
+    FROM information_schema.columns c
+    JOIN information_schema.tables t
+      ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+    WHERE c.table_schema = %s AND t.table_type = 'BASE TABLE'
+"""
+
+
+@dataclass
+class TableDiff:
+    table: str
+    missing_in_target: list = field(default_factory=list)
+    extra_in_target: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    columns_only_in_source: list = field(default_factory=list)
+    columns_only_in_target: list = field(default_factory=list)
+    chunks_compared: int = 0
+    bytes_transferred: int = 0
+    note: str = ""
+
+    @property
+    def differs(self):
+        return bool(self.missing_in_target or self.extra_in_target or self.changed
+                    or self.columns_only_in_source or self.columns_only_in_target or self.note)
+
+
+class Side:
+    """One database, with a byte counter for what was fetched from it."""
+
+    def __init__(self, name, dsn):
+        self.name = name
+        self.conn = db.connect(dsn)
+        self.conn.set_session(isolation_level="REPEATABLE READ", readonly=True)
+        self.bytes = 0
+
+    def fetch(self, query, params=None):
+        with self.conn.cursor() as cur:
+            cur.execute(query, params)
+            rows = cur.fetchall()
+        self.bytes += sum(len(str(v)) for row in rows for v in row)
+        return rows
+
+    def close(self):
+        self.conn.rollback()
+        self.conn.close()
+
+
+class TableComparer:
+    def __init__(self, source, target, executor, schema, table, pk_columns, pk_type, columns,
+                 fanout=16, leaf_rows=256):
+        from psycopg2 import sql
+
+        self.sql = sql
+        self.source, self.target = source, target
+        self.executor = executor
+        self.fanout, self.leaf_rows = fanout, leaf_rows
+        self.integer_pk = len(pk_columns) == 1 and pk_type in INTEGER_TYPES
+        self.table_ref = sql.Identifier(schema, table)
+        if len(pk_columns) == 1:
+            self.pk = sql.Identifier(pk_columns[0])
+            # min()/max() do not exist for uuid; other keys are split on percentiles
+            self.bounds = (sql.SQL("min({pk}), max({pk})").format(pk=self.pk) if self.integer_pk
+                           else sql.SQL("NULL, NULL"))
+        else:
+            # Composite keys (AspNetUserRoles, ...) are small link tables: compare
+            # them in one block, keyed by the whole key tuple, without range splits.
+            self.pk = sql.SQL("row({})").format(sql.SQL(", ").join(sql.Identifier(c) for c in pk_columns))
+            self.bounds = sql.SQL("NULL, NULL")
+            self.leaf_rows = float("inf")
+        # row(...)::text is stable across sides because the column list is explicit and sorted
+        self.row_hash = sql.SQL("md5(row({})::text)").format(
+            sql.SQL(", ").join(sql.Identifier(c) for c in columns))
+
+    def _where(self, lo, hi):
+        sql = self.sql
+        parts, params = [], []
+        if lo is not None:
+            parts.append(sql.SQL("{} >= %s").format(self.pk))
+            params.append(lo)
+        if hi is not None:
+            parts.append(sql.SQL("{} < %s").format(self.pk))
+            params.append(hi)
+        clause = sql.SQL(" AND ").join(parts) if parts else sql.SQL("true")
+        return clause, params
+
+    def _both(self, query, params):
+        futures = [self.executor.submit(side.fetch, query, params) for side in (self.source, self.target)]
+        return [f.result() for f in futures]
+
+    def digest(self, lo, hi):
+        where, params = self._where(lo, hi)
+        query = self.sql.SQL(
+            "SELECT count(*), md5(string_agg({h}, '' ORDER BY {pk})), {b} FROM {t} WHERE {w}"
+        ).format(h=self.row_hash, pk=self.pk, b=self.bounds, t=self.table_ref, w=where)
+        return [rows[0] for rows in self._both(query, params)]
+
+    def row_hashes(self, lo, hi):
+        where, params = self._where(lo, hi)
+        query = self.sql.SQL("SELECT {pk}::text, {h} FROM {t} WHERE {w}").format(
+            pk=self.pk, h=self.row_hash, t=self.table_ref, w=where)
+        return [dict(rows) for rows in self._both(query, params)]
+
+    def boundaries(self, lo, hi, side_stats):
+        """Split points inside [lo, hi), taken from the side with more rows."""
+        count = max(s[0] for s in side_stats)
+        if count == 0:
+            return []
+        if self.integer_pk:
+            # Arithmetic split over the keys both sides actually contain
+            low = min(s[2] for s in side_stats if s[2] is not None)
+            high = max(s[3] for s in side_stats if s[3] is not None)
+            step = max(1, (high - low + 1) // self.fanout)
+            return list(range(low + step, high + 1, step))[: self.fanout - 1]
+        side = self.source if side_stats[0][0] >= side_stats[1][0] else self.target
+        where, params = self._where(lo, hi)
+        # Fraction 0 is the lowest key of the range, which is not a useful split point
+        fractions = [i / self.fanout for i in range(self.fanout)]
+        # As text[]: psycopg2 has no caster for uuid[] and would return one "{...}" string.
+        # The points come back in key order and are compared as untyped literals.
+        query = self.sql.SQL(
+            "SELECT (percentile_disc(%s::float8[]) WITHIN GROUP (ORDER BY {pk}))::text[] FROM {t} WHERE {w}"
+        ).format(pk=self.pk, t=self.table_ref, w=where)
+        (points,), = side.fetch(query, [fractions] + params)
+        if not points:
+            return []
+        return list(dict.fromkeys(p for p in points[1:] if p is not None and p != points[0]))
+
+    def compare(self, result, lo=None, hi=None):
+        stats = self.digest(lo, hi)
+        result.chunks_compared += 1
+        (src_count, src_md5, _, _), (dst_count, dst_md5, _, _) = stats
+        if src_count == dst_count and src_md5 == dst_md5:
+            return
+
+        splits = []
+        if max(src_count, dst_count) > self.leaf_rows:
+            splits = self.boundaries(lo, hi, stats)
+        if not splits:
+            src_rows, dst_rows = self.row_hashes(lo, hi)
+            for key, row_md5 in src_rows.items():
+                other = dst_rows.get(key)
+                if other is None:
+                    result.missing_in_target.append(key)
+                elif other != row_md5:
+                    result.changed.append(key)
+            result.extra_in_target.extend(k for k in dst_rows if k not in src_rows)
+            return
+
+        edges = [lo] + splits + [hi]
+        for sub_lo, sub_hi in zip(edges, edges[1:]):
+            self.compare(result, sub_lo, sub_hi)
+
+
+def load_schema(side, schema):
+    tables = {name: (pk, types) for name, pk, types in side.fetch(TABLES_SQL, [schema])}
+    columns = {}
+    for table, column in side.fetch(COLUMNS_SQL, [schema]):
+        columns.setdefault(table, set()).add(column)
+    return tables, columns
+
+
+def diff_databases(source_dsn, target_dsn, schema="public", only=None, fanout=16, leaf_rows=256):
+    source, target = Side("source", source_dsn), Side("target", target_dsn)
+    results, schema_notes = [], []
+    try:
+        src_tables, src_columns = load_schema(source, schema)
+        dst_tables, dst_columns = load_schema(target, schema)
+        for name in sorted(set(src_columns) ^ set(dst_columns)):
+            where = "source" if name in src_columns else "target"
+            schema_notes.append(f"table {name} n'existe que dans {where}")
+
+        names = sorted(set(src_columns) & set(dst_columns))
+        if only:
+            names = [n for n in names if n in only]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            for name in names:
+                result = TableDiff(name)
+                result.columns_only_in_source = sorted(src_columns[name] - dst_columns[name])
+                result.columns_only_in_target = sorted(dst_columns[name] - src_columns[name])
+                pk_info = src_tables.get(name)
+                before = source.bytes + target.bytes
+                if pk_info is None or dst_tables.get(name) != pk_info:
+                    result.note = "clé primaire absente ou différente, table ignorée"
+                else:
+                    pk_columns, pk_types = pk_info
+                    comparer = TableComparer(
+                        source, target, executor, schema, name, pk_columns, pk_types[0],
+                        sorted(src_columns[name] & dst_columns[name]), fanout, leaf_rows)
+                    comparer.compare(result)
+                result.bytes_transferred = source.bytes + target.bytes - before
+                results.append(result)
+    finally:
+        source.close()
+        target.close()
+    return results, schema_notes
+
+
+def report(results, schema_notes, show_keys=10):
+    print("=" * 60)
+    print("📊 DIFERANS PWODIKSYON vs DEVLOPMAN")
+    print("=" * 60)
+    for note in schema_notes:
+        print(f"  ⚠️  {note}")
+
+    total_bytes = 0
+    for r in results:
+        total_bytes += r.bytes_transferred
+        if not r.differs:
+            continue
+        print(f"\n❌ {r.table}  ({r.chunks_compared} chunks, {r.bytes_transferred} octets)")
+        if r.note:
+            print(f"   {r.note}")
+        for label, cols in (("colonnes seulement dans source", r.columns_only_in_source),
+                            ("colonnes seulement dans target", r.columns_only_in_target)):
+            if cols:
+                print(f"   {label}: {', '.join(cols)}")
+        for label, keys in (("manquantes dans target", r.missing_in_target),
+                            ("en trop dans target", r.extra_in_target),
+                            ("modifiées", r.changed)):
+            if keys:
+                sample = ", ".join(keys[:show_keys]) + (" ..." if len(keys) > show_keys else "")
+                print(f"   {len(keys)} lignes {label}: {sample}")
+
+    same = sum(1 for r in results if not r.differs)
+    print(f"\n✅ {same}/{len(results)} tables identiques, {total_bytes} octets transférés au total")
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--source", required=True, help="libpq DSN de la base de référence (production)")
+    parser.add_argument("--target", required=True, help="libpq DSN de la base comparée (développement)")
+    parser.add_argument("--schema", default="public")
+    parser.add_argument("--table", action="append", help="limiter à cette table; répétable")
+    parser.add_argument("--fanout", type=int, default=16, help="sous-plages par niveau")
+    parser.add_argument("--leaf-rows", type=int, default=256,
+                        help="en dessous de ce nombre de lignes, comparer les hash ligne par ligne")
+    parser.add_argument("--show-keys", type=int, default=10)
+    parser.add_argument("--json", help="écrire le résultat complet dans ce fichier JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    started = time.perf_counter()
+    results, schema_notes = diff_databases(
+        args.source, args.target, args.schema, set(args.table or []), args.fanout, args.leaf_rows)
+    report(results, schema_notes, args.show_keys)
+    print(f"Durée: {time.perf_counter() - started:.1f}s")
+    if args.json:
+        save_json(args.json, {"schema": schema_notes, "tables": [r.__dict__ for r in results]})
+    return 1 if schema_notes or any(r.differs for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Verifye fichye ki nan uploads/ yo: orfelen, doublon ak fichye ki manke, kont baz done a.
+
+Program.cs serves two trees at ``/uploads``: WebRootPath/uploads, written by
+FileStorageService, and ContentRoot/uploads, written by SavingsCustomerService
+and MicrocreditLoanApplicationService. Both are scanned by default
+(backend/NalaCreditAPI/wwwroot/uploads and backend/NalaCreditAPI/uploads);
+``--root`` can be given several times instead. Each tree is walked with
+``os.scandir`` and files are hashed (SHA-256, read in ``--chunk-kb`` chunks) by a
+thread pool. Hashes are kept in ``.nala_ops/uploads-index.json`` per root and
+relative path together with size and mtime, so a later scan only rehashes the
+files whose size or mtime changed.
+
+The files are cross-checked in bulk against the rows that point at them:
+
+* ``SavingsCustomerDocuments."FilePath"`` (``uploads/customer-documents/<client>/<guid>.ext``,
+  written by SavingsCustomerService);
+* ``microcredit_application_documents."FilePath"`` (relative to uploads/,
+  written by MicrocreditLoanApplicationService);
+* ``SavingsCustomers."Signature"`` when it holds an ``/uploads/...`` URL
+  (FileUploadController); base64 signatures are stored inline and ignored.
+
+A stored path is looked up in every root, in the order they are served. The
+report lists missing files (rows without a file), referenced files that could
+not be read, size mismatches, orphans (files no row refers to) and duplicates
+(same content stored more than once, in any root). Nothing is deleted.
+
+Usage:
+    python -m nala_ops.uploads_scan --root /var/www/nala-credit/backend/NalaCreditAPI/wwwroot/uploads \
+        --root /var/www/nala-credit/backend/NalaCreditAPI/uploads
+    python -m nala_ops.uploads_scan --no-db --workers 16 --json uploads-report.json
+"""
+
+import argparse
+import hashlib
+import os
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+
+from nala_ops import db
+from nala_ops.state import load_json, save_json, state_path
+
+# In the order Program.cs registers the two /uploads static file providers
+DEFAULT_ROOTS = (
+    os.path.join("backend", "NalaCreditAPI", "wwwroot", "uploads"),  # WebRootPath: FileStorageService
+    os.path.join("backend", "NalaCreditAPI", "uploads"),  # ContentRoot: customer and microcredit documents
+)
+INDEX_VERSION = 2
+
+REFERENCE_QUERIES = {
+    "SavingsCustomerDocuments": """
+        SELECT "Id", "CustomerId", "FilePath", "FileSize" FROM "SavingsCustomerDocuments"
+    """,
+    "microcredit_application_documents": """
+        SELECT "Id"::text, "ApplicationId"::text, "FilePath", "FileSize" FROM microcredit_application_documents
+    """,
+    "SavingsCustomers.Signature": """
+        SELECT "Id", "Id", "Signature", NULL FROM "SavingsCustomers"
+        WHERE "Signature" LIKE '/uploads/%' OR "Signature" LIKE 'uploads/%' OR "Signature" LIKE 'http%/uploads/%'
+    """,
+}
+
+
+@dataclass(frozen=True)
+class FileEntry:
+    path: str  # relative to the root, "/" separated
+    size: int
+    mtime_ns: int
+
+
+@dataclass(frozen=True)
+class Reference:
+    source: str
+    id: str
+    owner: str  # customer or application id
+    path: str  # normalized like FileEntry.path
+    size: int = None
+
+
+# ---------------------------------------------------------------------------
+# Walking and hashing
+# ---------------------------------------------------------------------------
+
+def walk(root):
+    """Yield a FileEntry for every regular file under ``root`` (symlinks are not followed)."""
+    pending = [""]
+    while pending:
+        relative = pending.pop()
+        with os.scandir(os.path.join(root, relative) if relative else root) as entries:
+            for entry in entries:
+                path = f"{relative}/{entry.name}" if relative else entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(path)
+                elif entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    yield FileEntry(path, st.st_size, st.st_mtime_ns)
+
+
+def hash_file(path, chunk_size):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)  # releases the GIL for large chunks
+    return digest.hexdigest()
+
+
+def refresh_index(root, files, index, workers, chunk_size, rehash=False):
+    """Hash new or changed files; return (index, hashed count, hashed bytes, errors)."""
+    fresh, stale = {}, []
+    for f in files:
+        known = index.get(f.path)
+        if not rehash and known and known[0] == f.size and known[1] == f.mtime_ns:
+            fresh[f.path] = known
+        else:
+            stale.append(f)
+
+    errors = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(hash_file, os.path.join(root, f.path), chunk_size): f for f in stale}
+        for future in as_completed(futures):
+            f = futures[future]
+            try:
+                fresh[f.path] = [f.size, f.mtime_ns, future.result()]
+            except OSError as e:  # removed or unreadable since the walk
+                errors[f.path] = str(e)
+    return fresh, len(stale) - len(errors), sum(f.size for f in stale if f.path not in errors), errors
+
+
+# ---------------------------------------------------------------------------
+# Database references
+# ---------------------------------------------------------------------------
+
+def normalize(stored):
+    """Map a stored FilePath / URL to a path relative to the uploads root."""
+    path = stored.strip().replace("\\", "/")
+    marker = path.rfind("/uploads/")
+    if marker >= 0:
+        path = path[marker + len("/uploads/"):]
+    elif path.startswith("uploads/"):
+        path = path[len("uploads/"):]
+    return path.lstrip("/")
+
+
+def load_references(conn):
+    references = []
+    for source, query in REFERENCE_QUERIES.items():
+        for ref_id, owner, stored, size in db.stream(conn, query):
+            if stored:
+                references.append(Reference(source, str(ref_id), str(owner), normalize(stored), size))
+    return references
+
+
+# ---------------------------------------------------------------------------
+# Cross-check
+# ---------------------------------------------------------------------------
+
+def flatten(indexes):
+    """Merge per-root indexes into one keyed by the file's full path."""
+    return {os.path.join(root, path): entry for root, index in indexes.items() for path, entry in index.items()}
+
+
+def cross_check(indexes, references=None, errors=None):
+    """Compare the per-root indexes with the database rows; ``references=None`` skips the database checks.
+
+    ``indexes`` and ``errors`` (files that could not be hashed) map each root, in
+    serving order, to its relative paths.
+    """
+    files = flatten(indexes)
+    by_hash = defaultdict(list)
+    for path, (_size, _mtime, digest) in files.items():
+        by_hash[digest].append(path)
+    duplicates = sorted((sorted(paths) for paths in by_hash.values() if len(paths) > 1),
+                        key=lambda paths: -files[paths[0]][0] * (len(paths) - 1))
+
+    result = {
+        "duplicates": duplicates,
+        "duplicate_bytes": sum(files[paths[0]][0] * (len(paths) - 1) for paths in duplicates),
+    }
+    if references is None:
+        return result
+
+    found, failed = defaultdict(list), {}
+    for root, index in indexes.items():
+        for path, entry in index.items():
+            found[path].append(entry)
+    for root, root_errors in (errors or {}).items():
+        for path, error in root_errors.items():
+            failed.setdefault(path, (os.path.join(root, path), error))
+
+    missing, unreadable, size_mismatch = [], [], []
+    for r in references:
+        if r.path in found:
+            sizes = [entry[0] for entry in found[r.path]]
+            if r.size is not None and r.size not in sizes:
+                size_mismatch.append((r, sizes[0]))
+        elif r.path in failed:
+            unreadable.append((r, failed[r.path][1]))
+        else:
+            missing.append(r)
+    referenced = {r.path for r in references}
+    result.update({
+        "missing": missing,
+        "unreadable": unreadable,
+        "size_mismatch": size_mismatch,
+        "orphans": sorted(os.path.join(root, path) for root, index in indexes.items()
+                          for path in index if path not in referenced),
+    })
+    return result
+
+
+def _size(n):
+    for unit in ("o", "Ko", "Mo", "Go"):
+        if n < 1024 or unit == "Go":
+            return f"{n:.0f} {unit}" if unit == "o" else f"{n:.1f} {unit}"
+        n /= 1024.0
+
+
+def report(result, files, limit):
+    print("\n" + "=" * 60)
+    print("📋 RÉSULTAT")
+    print("=" * 60)
+    if "missing" in result:
+        print(f"❌ Fichiers manquants: {len(result['missing'])}")
+        for r in result["missing"][:limit]:
+            print(f"   {r.source} {r.id} ({r.owner}): {r.path}")
+        print(f"🚫 Fichiers illisibles: {len(result['unreadable'])}")
+        for r, error in result["unreadable"][:limit]:
+            print(f"   {r.source} {r.id} ({r.owner}): {r.path} ({error})")
+        print(f"⚠️  Tailles différentes: {len(result['size_mismatch'])}")
+        for r, actual in result["size_mismatch"][:limit]:
+            print(f"   {r.source} {r.id}: {r.path} (base {r.size} o, disque {actual} o)")
+        orphan_bytes = sum(files[p][0] for p in result["orphans"])
+        print(f"👻 Orphelins: {len(result['orphans'])} ({_size(orphan_bytes)})")
+        for path in result["orphans"][:limit]:
+            print(f"   {path}")
+    print(f"📑 Doublons: {len(result['duplicates'])} groupe(s), {_size(result['duplicate_bytes'])} récupérables")
+    for paths in result["duplicates"][:limit]:
+        print(f"   {files[paths[0]][2][:12]} x{len(paths)} ({_size(files[paths[0]][0])})")
+        for path in paths:
+            print(f"      {path}")
+
+
+def build_parser(parser=None):
+    parser = parser or argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    db.add_dsn_argument(parser)
+    parser.add_argument("--root", action="append", default=None,
+                        help="dossier uploads, répétable (défaut: NALA_UPLOADS_DIR, séparés par "
+                             f"'{os.pathsep}', ou {' et '.join(DEFAULT_ROOTS)})")
+    parser.add_argument("--workers", type=int, default=min(32, (os.cpu_count() or 1) * 4))
+    parser.add_argument("--chunk-kb", type=int, default=1024, help="taille des lectures (défaut 1024 Ko)")
+    parser.add_argument("--rehash", action="store_true", help="ignorer l'index et tout rehacher")
+    parser.add_argument("--no-db", action="store_true", help="doublons seulement, sans la base")
+    parser.add_argument("--limit", type=int, default=20, help="lignes affichées par catégorie")
+    parser.add_argument("--state", default=None, help="index (défaut .nala_ops/uploads-index.json)")
+    parser.add_argument("--json", help="écrire le rapport complet dans ce fichier")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    env_roots = [r for r in os.environ.get("NALA_UPLOADS_DIR", "").split(os.pathsep) if r]
+    roots = list(dict.fromkeys(os.path.abspath(r) for r in args.root or env_roots or DEFAULT_ROOTS))
+    absent = [r for r in roots if not os.path.isdir(r)]
+    roots = [r for r in roots if r not in absent]
+    if not roots:
+        print(f"❌ Dossier introuvable: {', '.join(absent)}")
+        return 2
+    index_file = args.state or state_path("uploads-index.json")
+    state = load_json(index_file)
+    if state.get("version") != INDEX_VERSION:
+        state = {}
+
+    print("=" * 60)
+    print("🔍 INTÉGRITÉ DES UPLOADS")
+    print("=" * 60)
+    for root in roots:
+        print(f"Dossier: {root}")
+    for root in absent:
+        print(f"⚠️  Dossier absent, ignoré: {root}")
+
+    started = time.perf_counter()
+    walked = {root: list(walk(root)) for root in roots}
+    walk_seconds = time.perf_counter() - started
+    indexes, errors, hashed, hashed_bytes = {}, {}, 0, 0
+    for root, files in walked.items():
+        indexes[root], count, size, errors[root] = refresh_index(
+            root, files, state.get("roots", {}).get(root, {}), args.workers, args.chunk_kb * 1024, args.rehash)
+        hashed, hashed_bytes = hashed + count, hashed_bytes + size
+    elapsed = time.perf_counter() - started
+    save_json(index_file, {"version": INDEX_VERSION, "roots": indexes})
+    files = [f for root_files in walked.values() for f in root_files]
+    indexed = sum(len(index) for index in indexes.values())
+    print(f"Fichiers: {len(files)} ({_size(sum(f.size for f in files))}), parcours {walk_seconds:.2f}s")
+    print(f"Hachés: {hashed} ({_size(hashed_bytes)}), réutilisés de l'index: {indexed - hashed}, "
+          f"{args.workers} threads, total {elapsed:.2f}s")
+    for root, root_errors in errors.items():
+        for path, error in sorted(root_errors.items()):
+            print(f"⚠️  {os.path.join(root, path)}: {error}")
+
+    references = None
+    if not args.no_db:
+        conn = db.connect(args.dsn)
+        try:
+            references = load_references(conn)
+        finally:
+            conn.close()
+        print(f"Références en base: {len(references)}")
+
+    result = cross_check(indexes, references, errors)
+    files = flatten(indexes)
+    report(result, files, args.limit)
+    if args.json:
+        output = {
+            "roots": roots,
+            "duplicates": [{"sha256": files[paths[0]][2], "size": files[paths[0]][0], "paths": paths}
+                           for paths in result["duplicates"]],
+        }
+        if references is not None:
+            output["missing"] = [r.__dict__ for r in result["missing"]]
+            output["unreadable"] = [dict(r.__dict__, error=error) for r, error in result["unreadable"]]
+            output["size_mismatch"] = [dict(r.__dict__, actual_size=actual) for r, actual in result["size_mismatch"]]
+            output["orphans"] = result["orphans"]
+        save_json(args.json, output)
+    return 1 if result.get("missing") or result.get("unreadable") or result.get("size_mismatch") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""
+Shared fixtures for the nala_ops tests.
+
+Tests that need PostgreSQL run against the server named by NALA_OPS_TEST_DSN
+(a libpq string for a role allowed to CREATE DATABASE) and are skipped when it
+is not set:
+
+    NALA_OPS_TEST_DSN="host=localhost user=postgres" python -m pytest -q
+"""
+
+import os
+import uuid
+
+import pytest
+
+from nala_ops import db
+
+
+@pytest.fixture(scope="session")
+def pg_dsn():
+    dsn = os.environ.get("NALA_OPS_TEST_DSN")
+    if not dsn:
+        pytest.skip("NALA_OPS_TEST_DSN non défini")
+    pytest.importorskip("psycopg2")
+    return dsn
+
+
+@pytest.fixture
+def scratch_db(pg_dsn):
+    """Return a factory creating empty databases (DSN returned), dropped after the test."""
+    from psycopg2.extensions import make_dsn
+
+    created = []
+
+    def create(setup_sql=None):
+        name = f"nala_ops_test_{uuid.uuid4().hex[:12]}"
+        admin = db.connect(pg_dsn, autocommit=True)
+        try:
+            with admin.cursor() as cur:
+                cur.execute(f'CREATE DATABASE "{name}"')
+        finally:
+            admin.close()
+        created.append(name)
+        dsn = make_dsn(pg_dsn, dbname=name)
+        if setup_sql:
+            conn = db.connect(dsn, autocommit=True)
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(setup_sql)
+            finally:
+                conn.close()
+        return dsn
+
+    yield create
+
+    admin = db.connect(pg_dsn, autocommit=True)
+    try:
+        with admin.cursor() as cur:
+            for name in created:
+                cur.execute("SELECT pg_terminate_backend(pid) FROM pg_stat_activity WHERE datname = %s", [name])
+                cur.execute(f'DROP DATABASE IF EXISTS "{name}"')
+    finally:
+        admin.close()
@@ -0,0 +1,207 @@
+import os
+
+import pytest
+
+from nala_ops import archive, db
+from nala_ops.archive import ArchiveSet, Move, ParquetSink, SETS, check_foreign_keys, main, select_sets
+
+APPLICATIONS_SQL = """
+    CREATE TABLE microcredit_loan_applications ("Id" uuid PRIMARY KEY);
+    CREATE TABLE microcredit_application_documents (
+        "Id" uuid PRIMARY KEY, "ApplicationId" uuid REFERENCES microcredit_loan_applications);
+    CREATE TABLE microcredit_guarantees (
+        "Id" uuid PRIMARY KEY, "ApplicationId" uuid REFERENCES microcredit_loan_applications);
+    CREATE TABLE microcredit_approval_steps (
+        "Id" uuid PRIMARY KEY, "ApplicationId" uuid REFERENCES microcredit_loan_applications);
+    CREATE TABLE microcredit_loans ("Id" uuid PRIMARY KEY, "ApplicationId" uuid REFERENCES microcredit_loan_applications);
+"""
+
+# A closed loan with a blocked guarantee, a closed loan without an application, an open loan
+LOANS_SQL = """
+    CREATE TABLE "SavingsAccounts" ("Id" text PRIMARY KEY, "BlockedBalance" numeric, "AvailableBalance" numeric,
+                                    "UpdatedAt" timestamptz);
+    CREATE TABLE microcredit_loan_applications (
+        "Id" uuid PRIMARY KEY, "Status" int, "UpdatedAt" timestamptz, "BlockedGuaranteeAmount" numeric,
+        "BlockedSavingsAccountId" text REFERENCES "SavingsAccounts");
+    CREATE TABLE microcredit_loans (
+        "Id" uuid PRIMARY KEY, "ApplicationId" uuid REFERENCES microcredit_loan_applications, "Status" int,
+        "LastPaymentDate" timestamptz, "UpdatedAt" timestamptz);
+""" + "".join(f"""
+    CREATE TABLE {table} ("Id" serial PRIMARY KEY, "LoanId" uuid REFERENCES microcredit_loans);"""
+              for table in ("microcredit_payments", "microcredit_payment_schedules", "microcredit_collection_notes")
+              ) + "".join(f"""
+    CREATE TABLE {table} ("Id" serial PRIMARY KEY, "ApplicationId" uuid REFERENCES microcredit_loan_applications);"""
+                          for table in ("microcredit_application_documents", "microcredit_guarantees",
+                                        "microcredit_approval_steps")) + """
+    INSERT INTO "SavingsAccounts" VALUES ('S1', 500, 100, now());
+    INSERT INTO microcredit_loan_applications VALUES
+        ('00000000-0000-0000-0000-00000000000a', 2, now() - interval '900 days', 500, 'S1');
+    INSERT INTO microcredit_loans VALUES
+        ('00000000-0000-0000-0000-000000000001', '00000000-0000-0000-0000-00000000000a', 3,
+         now() - interval '800 days', now() - interval '800 days'),
+        ('00000000-0000-0000-0000-000000000002', NULL, 6, NULL, now() - interval '800 days'),
+        ('00000000-0000-0000-0000-000000000003', NULL, 2, now(), now());
+    INSERT INTO microcredit_payments ("LoanId") VALUES
+        ('00000000-0000-0000-0000-000000000001'), ('00000000-0000-0000-0000-000000000002'),
+        ('00000000-0000-0000-0000-000000000003');
+    INSERT INTO microcredit_guarantees ("ApplicationId") VALUES ('00000000-0000-0000-0000-00000000000a');
+"""
+
+# 3 accounts x 10 transactions older than the cutoff, plus a recent one each
+TRANSACTIONS_SQL = """
+    CREATE TABLE "SavingsTransactions" ("Id" serial PRIMARY KEY, "AccountId" int NOT NULL,
+                                        "ProcessedAt" timestamptz NOT NULL, "BalanceAfter" numeric);
+    INSERT INTO "SavingsTransactions" ("AccountId", "ProcessedAt", "BalanceAfter")
+    SELECT a, now() - interval '800 days' + i * interval '1 hour', i FROM generate_series(1, 3) a, generate_series(1, 10) i;
+    INSERT INTO "SavingsTransactions" ("AccountId", "ProcessedAt", "BalanceAfter")
+    SELECT a, now() - interval '1 day', 11 FROM generate_series(1, 3) a;
+"""
+
+
+def _spec(name):
+    return next(s for s in SETS if s.name == name)
+
+
+def test_select_sets():
+    assert [s.name for s in select_sets(["transactions", "savings-transactions"], False)] == [
+        "savings-transactions", "current-transactions", "term-transactions"]
+    assert [s.name for s in select_sets(["all"], False)] == [
+        "loans", "applications", "savings-transactions", "current-transactions", "term-transactions"]
+    with pytest.raises(SystemExit, match="--allow-open"):
+        select_sets(["open"], False)
+    assert [s.name for s in select_sets(["open"], True)] == ["open-loans", "open-applications"]
+    with pytest.raises(SystemExit, match="inconnu"):
+        select_sets(["nope"], False)
+
+
+def test_check_foreign_keys(scratch_db):
+    conn = db.connect(scratch_db(APPLICATIONS_SQL), autocommit=True)
+    try:
+        with conn.cursor() as cur:
+            assert check_foreign_keys(cur, _spec("applications")) == []
+
+            reversed_order = ArchiveSet("reversed", "microcredit_loan_applications", "true",
+                                        tuple(reversed(_spec("applications").moves)),
+                                        excluded=("microcredit_loans",))
+            problems = check_foreign_keys(cur, reversed_order)
+            assert len(problems) == 3 and all("doit passer avant" in p for p in problems)
+
+            cur.execute('CREATE TABLE audit ("ApplicationId" uuid REFERENCES microcredit_loan_applications)')
+            problems = check_foreign_keys(cur, _spec("applications"))
+            assert len(problems) == 1 and problems[0].startswith("audit référence microcredit_loan_applications")
+    finally:
+        conn.close()
+
+
+def _remaining(dsn):
+    conn = db.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute('SELECT "AccountId", "BalanceAfter" FROM "SavingsTransactions" ORDER BY 1, 2')
+            return cur.fetchall()
+    finally:
+        conn.close()
+
+
+def _archived_ids(out):
+    import pyarrow.parquet as pq
+
+    folder = os.path.join(out, "SavingsTransactions")
+    files = sorted(os.listdir(folder))
+    return files, [i for name in files for i in pq.read_table(os.path.join(folder, name))["Id"].to_pylist()]
+
+
+def test_resume_after_checkpoint_loss_keeps_every_archive(scratch_db, tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    dsn = scratch_db(TRANSACTIONS_SQL)
+    out, state = str(tmp_path / "out"), str(tmp_path / "archive.json")
+    argv = ["--dsn", dsn, "--sets", "savings-transactions", "--older-than", "730", "--apply", "--to", "parquet",
+            "--out", out, "--state", state, "--batch-size", "4", "--min-batch", "4", "--max-batch", "4",
+            "--pause-ms", "0"]
+
+    # Stop after the third batch has committed but before its checkpoint is saved
+    save_json, saves = archive.save_json, []
+
+    def crash_on_third(path, data):
+        saves.append(path)
+        if len(saves) == 3:
+            raise RuntimeError("arrêt simulé")
+        save_json(path, data)
+
+    monkeypatch.setattr(archive, "save_json", crash_on_third)
+    with pytest.raises(RuntimeError):
+        main(argv)
+    monkeypatch.setattr(archive, "save_json", save_json)
+    assert archive.load_json(state)["sets"]["savings-transactions"]["batches"] == 2
+
+    assert main(argv) == 0
+    # The newest transaction before the cutoff of each account is kept for opening balances
+    assert _remaining(dsn) == [(a, b) for a in (1, 2, 3) for b in (10, 11)]
+    files, ids = _archived_ids(out)
+    assert len(ids) == len(set(ids)) == 27
+
+    # A completed run resets the checkpoint; the next run must not replace its files
+    conn = db.connect(dsn, autocommit=True)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""INSERT INTO "SavingsTransactions" ("AccountId", "ProcessedAt", "BalanceAfter")
+                           SELECT 1, now() - interval '900 days', 0 FROM generate_series(1, 5)""")
+    finally:
+        conn.close()
+    assert main(argv) == 0
+    new_files, ids = _archived_ids(out)
+    assert set(files) < set(new_files)
+    assert len(ids) == len(set(ids)) == 32
+
+
+def test_resume_after_file_written_but_not_committed(scratch_db, tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    dsn = scratch_db(TRANSACTIONS_SQL)
+    out, state = str(tmp_path / "out"), str(tmp_path / "archive.json")
+    argv = ["--dsn", dsn, "--sets", "savings-transactions", "--older-than", "730", "--apply", "--to", "parquet",
+            "--out", out, "--state", state, "--batch-size", "4", "--min-batch", "4", "--max-batch", "4",
+            "--pause-ms", "0"]
+
+    # The first batch's file is written and fsynced, then the transaction fails before COMMIT
+    move = ParquetSink.move
+
+    def fail_after_writing(self, *args):
+        move(self, *args)
+        raise RuntimeError("COMMIT impossible")
+
+    monkeypatch.setattr(ParquetSink, "move", fail_after_writing)
+    with pytest.raises(RuntimeError):
+        main(argv)
+    monkeypatch.setattr(ParquetSink, "move", move)
+    [leftover], _ids = _archived_ids(out)
+    assert len(_remaining(dsn)) == 33  # rolled back: every row is still live
+
+    # A new process (new sink) picks the same first key and replaces the leftover file
+    assert main(argv) == 0
+    files, ids = _archived_ids(out)
+    assert leftover in files
+    assert len(ids) == len(set(ids)) == 27
+
+
+def test_loans_without_application_are_archived(scratch_db, tmp_path):
+    dsn = scratch_db(LOANS_SQL)
+    assert main(["--dsn", dsn, "--sets", "loans", "--older-than", "730", "--apply", "--to", "table",
+                 "--state", str(tmp_path / "archive.json"), "--pause-ms", "0"]) == 0
+    conn = db.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute('SELECT "Id"::text FROM microcredit_loans')
+            assert cur.fetchall() == [("00000000-0000-0000-0000-000000000003",)]
+            cur.execute('SELECT count(*) FROM archive.microcredit_loans')
+            assert cur.fetchone() == (2,)
+            cur.execute('SELECT count(*) FROM microcredit_payments')
+            assert cur.fetchone() == (1,)
+            cur.execute('SELECT count(*) FROM microcredit_loan_applications')
+            assert cur.fetchone() == (0,)
+            cur.execute('SELECT count(*) FROM archive.microcredit_guarantees')
+            assert cur.fetchone() == (1,)
+            # The guarantee blocked on the archived application is released
+            cur.execute('SELECT "BlockedBalance", "AvailableBalance" FROM "SavingsAccounts"')
+            assert cur.fetchone() == (0, 600)
+    finally:
+        conn.close()
@@ -0,0 +1,53 @@
+import base64
+import json
+import time
+
+from nala_ops.auth import TokenCache
+
+
+def _token(exp):
+    claims = base64.urlsafe_b64encode(json.dumps({"exp": exp}).encode()).rstrip(b"=").decode()
+    return f"eyJhbGciOiJub25lIn0.{claims}.sig"
+
+
+class _Session:
+    def __init__(self, token):
+        self.token, self.logins = token, []
+
+    def post(self, url, json, timeout):
+        self.logins.append(json)
+        session = self
+
+        class Response:
+            def raise_for_status(self):
+                pass
+
+            def json(self):
+                return {"token": session.token}
+
+        return Response()
+
+
+def test_password_prompt_only_on_cache_miss(tmp_path):
+    cache = TokenCache(str(tmp_path / "tokens.json"))
+    prompts = []
+
+    def password():
+        prompts.append(1)
+        return "secret"
+
+    session = _Session(_token(time.time() + 3600))
+    first = cache.get(session, "https://api.test", "admin@nalacredit.com", password)
+    again = TokenCache(str(tmp_path / "tokens.json")).get(session, "https://api.test/", "Admin@nalacredit.com",
+                                                          password)
+    assert first == again
+    assert len(prompts) == 1
+    assert session.logins == [{"email": "admin@nalacredit.com", "password": "secret"}]
+
+
+def test_expired_token_logs_in_again(tmp_path):
+    cache = TokenCache(str(tmp_path / "tokens.json"))
+    cache.store("https://api.test", "a@b.c", _token(time.time() - 10))
+    session = _Session(_token(time.time() + 3600))
+    assert cache.get(session, "https://api.test", "a@b.c", lambda: "pw") == session.token
+    assert len(session.logins) == 1
@@ -0,0 +1,20 @@
+from nala_ops import cli
+
+
+def test_string_system_exit_is_printed(capsys):
+    cli.register("fail-with-message", "tests.test_cli:_fail", "test")
+    try:
+        assert cli.run_command("fail-with-message", []) == 1
+    finally:
+        del cli.COMMANDS["fail-with-message"]
+    assert "cible inconnue: bogus" in capsys.readouterr().err
+
+
+def _fail(argv):
+    raise SystemExit("cible inconnue: bogus")
+
+
+def test_help_and_argparse_errors_keep_their_code(capsys):
+    assert cli.run_command("monitor", ["--help"]) == 0
+    assert cli.run_command("monitor", ["--interval"]) == 2
+    assert cli.run_command("no-such-command", []) == 2
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from nala_ops.hub_sim import main, parse_ramp, target_clients
+
+pytest.importorskip("aiohttp")
+
+
+def _run(tmp_path, *extra):
+    output = tmp_path / "hub.json"
+    rc = main(["--standin", "--ramp", "0:0,0.5:40", "--duration", "2", "--probe-interval", "0.25",
+               "--grace", "0.5", "--branches", "3", "--json", str(output), *extra])
+    return rc, json.loads(output.read_text())
+
+
+def test_standin_delivers_every_probe(tmp_path):
+    rc, results = _run(tmp_path)
+    assert rc == 0
+    assert results["connected"] == results["clients"] == 40
+    assert results["probes"] > 0
+    assert results["expected"] > 0 and results["dropped"] == 0
+
+
+def test_dropped_messages_are_counted(tmp_path):
+    rc, results = _run(tmp_path, "--standin-drop-rate", "0.5")
+    assert rc == 1
+    assert 0 < results["dropped"] < results["expected"]
+
+
+def test_remote_hub_needs_explicit_flag():
+    with pytest.raises(SystemExit, match="--allow-remote"):
+        main(["--url", "https://admin.nalakreditimachann.com", "--token", "x"])
+    with pytest.raises(SystemExit, match="--url"):
+        main(["--token", "x"])
+
+
+def test_ramp():
+    ramp = parse_ramp("10:100,30:500")
+    assert ramp[0] == (0.0, 0)
+    assert target_clients(ramp, 5) == 50
+    assert target_clients(ramp, 20) == 300
+    assert target_clients(ramp, 99) == 500
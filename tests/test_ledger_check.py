@@ -0,0 +1,118 @@
+from datetime import datetime
+from decimal import Decimal
+
+from nala_ops import db
+from nala_ops.ledger_check import (
+    main, verify_account_transactions, verify_balances, verify_reserve_balances, verify_reserve_movements,
+    verify_sessions, verify_transfers,
+)
+
+D = Decimal
+NOW = datetime(2025, 1, 10, 9, 0)
+
+# Only the columns the checks read
+SCHEMA_SQL = """
+    CREATE TABLE "Branches" ("Id" int PRIMARY KEY);
+    CREATE TABLE "InterBranchTransfers" (
+        "Id" uuid PRIMARY KEY, "TransferNumber" text, "FromBranchId" int, "ToBranchId" int, "Amount" numeric,
+        "ExchangeRate" numeric, "ConvertedAmount" numeric, "Status" int, "ApprovedAt" timestamp,
+        "ProcessedAt" timestamp, "UpdatedAt" timestamp, "CreatedAt" timestamp);
+    CREATE TABLE "InterBranchTransferLogs" ("TransferId" uuid, "Action" text);
+    CREATE TABLE "CashSessions" (
+        "Id" int PRIMARY KEY, "UserId" text, "BranchId" int, "OpeningBalanceHTG" numeric,
+        "OpeningBalanceUSD" numeric, "ClosingBalanceHTG" numeric, "ClosingBalanceUSD" numeric,
+        "SessionStart" timestamp, "SessionEnd" timestamp, "Status" int);
+    CREATE TABLE "Transactions" ("CashSessionId" int, "Type" int, "Amount" numeric, "Currency" int, "Status" int);
+    CREATE TABLE "ExchangeTransactions" (
+        "FromCurrency" int, "FromAmount" numeric, "ToAmount" numeric, "ProcessedBy" text, "CreatedAt" timestamp);
+    CREATE TABLE microcredit_payments ("Amount" numeric, "Currency" int, "ProcessedBy" text, "CreatedAt" timestamp);
+    CREATE TABLE "CurrencyReserves" ("Id" uuid PRIMARY KEY, "BranchId" uuid, "Currency" int, "CurrentBalance" numeric);
+    CREATE TABLE "CurrencyMovements" (
+        "Id" uuid PRIMARY KEY, "CurrencyReserveId" uuid, "Reference" text, "MovementType" int, "Amount" numeric,
+        "BalanceBefore" numeric, "BalanceAfter" numeric, "MovementDate" timestamp, "CreatedAt" timestamp);
+"""
+ACCOUNTS_SQL = """
+    CREATE TABLE "{accounts}" ("Id" text PRIMARY KEY, "BranchId" int, "AccountNumber" text, "Balance" numeric);
+    CREATE TABLE "{transactions}" (
+        "Id" text PRIMARY KEY, "AccountId" text, "AccountNumber" text, "Type" int, "Amount" numeric,
+        "Fees" numeric, "BalanceBefore" numeric, "BalanceAfter" numeric, "Status" int, "Currency" int,
+        "ProcessedBy" text, "ProcessedAt" timestamp, "CreatedAt" timestamp);
+"""
+SEED_SQL = """
+    INSERT INTO "Branches" VALUES (1);
+    INSERT INTO "SavingsAccounts" VALUES ('S1', 1, 'SV-1', 150);
+    INSERT INTO "SavingsTransactions" VALUES
+        ('T1', 'S1', 'SV-1', 0, 100, 0, 0, 100, 2, 0, 'u1', '2025-01-10 10:00', '2025-01-10 10:00'),
+        ('T2', 'S1', 'SV-1', 0, 50, 0, 100, 150, 2, 0, 'u1', '2025-01-11 10:00', '2025-01-11 10:00');
+"""
+
+
+def test_verify_transfers():
+    ok = ("t1", "TR-1", 1, 2, D("100"), D("1"), D("100"), 4, NOW, NOW, NOW, True)
+    bad = ("t2", "TR-2", 1, 1, D("100"), D("130"), D("12000"), 4, None, None, NOW, False)
+    assert list(verify_transfers([ok])) == []
+    messages = [message for ref, message in verify_transfers([bad])]
+    assert [m.split(" ")[0] for m in messages] == ["source", "ConvertedAmount", "statut", "transfert", "transfert"]
+    assert "Amount x ExchangeRate 13000.00" in messages[1]
+
+
+def test_verify_sessions():
+    balanced = (1, "u1", D("1000"), D("10"), D("1250"), D("10"), D("250"), D("0"))
+    off = (2, "u1", D("1000"), D("10"), D("1200"), None, D("250"), D("0"))
+    assert list(verify_sessions([balanced])) == []
+    found = list(verify_sessions([off]))
+    assert [ref for ref, _ in found] == ["session 2 (u1)"] * 2
+    assert "écart -50" in found[0][1] and "sans solde de clôture USD" in found[1][1]
+
+
+def test_verify_account_transactions():
+    deposit = ("savings", "T1", "SV-1", 0, D("100"), D("0"), D("0"), D("100"), None)
+    # A withdrawal may take its fee from the balance or not
+    withdrawal_with_fee = ("savings", "T2", "SV-1", 1, D("40"), D("1"), D("100"), D("59"), D("100"))
+    gap = ("savings", "T3", "SV-1", 0, D("10"), D("0"), D("60"), D("70"), D("59"))
+    wrong_amount = ("current", "T4", "CA-1", 1, D("40"), D("0"), D("100"), D("70"), None)
+    assert list(verify_account_transactions([deposit, withdrawal_with_fee])) == []
+    found = list(verify_account_transactions([gap, wrong_amount]))
+    assert [ref for ref, _ in found] == ["savings SV-1 tx T3", "current CA-1 tx T4"]
+    assert found[0][1] == "BalanceBefore 60 != BalanceAfter précédent 59"
+
+
+def test_verify_balances_and_reserves():
+    assert list(verify_balances([("savings", "SV-1", D("150"), D("150"), D("150"))])) == []
+    assert len(list(verify_balances([("savings", "SV-1", D("150"), D("100"), D("140"))]))) == 2
+    movements = [("m1", 1, "R-1", 0, D("50"), D("100"), D("150"), None),
+                 ("m2", 1, "R-2", 1, D("-20"), D("150"), D("130"), D("150")),
+                 ("m3", 1, "R-3", 1, D("20"), D("131"), D("100"), D("130"))]
+    found = list(verify_reserve_movements(movements))
+    assert [ref for ref, _ in found] == ["mouvement R-3 (devise 1)"] * 2
+    assert list(verify_reserve_balances([("r1", 1, D("100"), D("100")), ("r2", 1, D("5"), None)])) == []
+    assert len(list(verify_reserve_balances([("r1", 1, D("90"), D("100"))]))) == 1
+
+
+def test_unchanged_clean_partitions_are_skipped(scratch_db, tmp_path, capsys):
+    dsn = scratch_db(SCHEMA_SQL
+                     + ACCOUNTS_SQL.format(accounts="SavingsAccounts", transactions="SavingsTransactions")
+                     + ACCOUNTS_SQL.format(accounts="CurrentAccounts", transactions="CurrentAccountTransactions")
+                     + SEED_SQL)
+    argv = ["--dsn", dsn, "--from", "2025-01-10", "--to", "2025-01-11", "--workers", "2",
+            "--state", str(tmp_path / "ledger.json")]
+
+    def run():
+        code = main(argv)
+        summary = capsys.readouterr().out.strip().splitlines()[-1]
+        return code, summary.split(", durée")[0]
+
+    # branch:1:2025-01-10, branch:1:2025-01-11 and branch:1:all
+    assert run() == (0, "Vérifiées: 3, inchangées (ignorées): 0, en erreur: 0")
+    assert run() == (0, "Vérifiées: 0, inchangées (ignorées): 3, en erreur: 0")
+
+    conn = db.connect(dsn, autocommit=True)
+    try:
+        with conn.cursor() as cur:
+            cur.execute('UPDATE "SavingsTransactions" SET "BalanceBefore" = 90, "BalanceAfter" = 140 WHERE "Id" = \'T2\'')
+    finally:
+        conn.close()
+    # The changed day and the all-days balances are re-verified
+    assert run() == (1, "Vérifiées: 2, inchangées (ignorées): 1, en erreur: 0")
+    # Partitions with discrepancies are verified again even when unchanged
+    assert run() == (1, "Vérifiées: 2, inchangées (ignorées): 1, en erreur: 0")
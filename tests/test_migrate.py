@@ -0,0 +1,164 @@
+import json
+
+from nala_ops import db
+from nala_ops.migrate import Catalog, Options, Planner, Step, main, merge_steps, split_statements, unwrap_do
+
+
+def _planner(**options):
+    return Planner(Catalog(None), Options(**options))
+
+
+def test_split_statements():
+    sql = ("-- header; not a statement\n"
+           "SELECT 'a;b', \"x;y\";\n"
+           "/* block;\n comment */ UPDATE t SET v = 'it''s';\n"
+           "DO $body$ BEGIN PERFORM 1; END $body$;\n"
+           "SELECT 2")
+    assert split_statements(sql) == [
+        (2, "SELECT 'a;b', \"x;y\""),
+        (4, "UPDATE t SET v = 'it''s'"),
+        (5, "DO $body$ BEGIN PERFORM 1; END $body$"),
+        (6, "SELECT 2"),
+    ]
+
+
+def test_unwrap_do_if_not_exists():
+    sql = """DO $$ BEGIN
+        IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                       WHERE table_name = 'Loans' AND column_name = 'Notes') THEN
+            ALTER TABLE "Loans" ADD COLUMN "Notes" text;
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM pg_indexes WHERE indexname = 'IX_Loans_Notes') THEN
+            CREATE INDEX "IX_Loans_Notes" ON "Loans" ("Notes");
+        END IF;
+    END $$"""
+    assert unwrap_do(sql) == [
+        'ALTER TABLE "Loans" ADD COLUMN IF NOT EXISTS "Notes" text',
+        'CREATE INDEX IF NOT EXISTS "IX_Loans_Notes" ON "Loans" ("Notes")',
+    ]
+
+
+def test_unwrap_do_table_exists_guard():
+    sql = """DO $$ BEGIN
+        IF EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'Signers') THEN
+            IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                           WHERE table_name = 'Signers' AND column_name = 'UpdatedAt') THEN
+                ALTER TABLE "Signers" ADD COLUMN "UpdatedAt" timestamp;
+            END IF;
+        END IF;
+    END $$"""
+    assert unwrap_do(sql) == ['ALTER TABLE IF EXISTS "Signers" ADD COLUMN IF NOT EXISTS "UpdatedAt" timestamp']
+
+
+def test_unwrap_do_keeps_other_exists_guards():
+    # Unwrapping would drop the condition and make the statement unconditional
+    column_exists = """DO $$ BEGIN
+        IF EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name = 'Loans' AND column_name = 'Old') THEN
+            ALTER TABLE "Loans" DROP COLUMN IF EXISTS "Legacy";
+        END IF;
+    END $$"""
+    other_table = """DO $$ BEGIN
+        IF EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'Archive') THEN
+            ALTER TABLE "Loans" DROP COLUMN IF EXISTS "Legacy";
+        END IF;
+    END $$"""
+    index_under_table_guard = """DO $$ BEGIN
+        IF EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name = 'Loans') THEN
+            CREATE INDEX "IX_Loans_Notes" ON "Loans" ("Notes");
+        END IF;
+    END $$"""
+    for sql in (column_exists, other_table, index_under_table_guard):
+        assert unwrap_do(sql) is None
+        original, steps = _planner().plan_statement(sql)
+        assert [s.sql for s in steps] == [sql]
+
+
+def test_plan_alter_volatile_default_is_backfilled():
+    sql = 'ALTER TABLE "Loans" ADD COLUMN "Token" uuid NOT NULL DEFAULT gen_random_uuid(), ADD COLUMN "Note" text'
+    original, steps = _planner(max_blocking=0).plan_statement(sql)
+    assert original.work == "rewrite"
+    assert [s.kind for s in steps] == ["ddl", "ddl", "backfill", "ddl", "ddl", "ddl", "ddl"]
+    assert steps[0].sql == 'ALTER TABLE "Loans" ADD COLUMN "Token" uuid, ADD COLUMN "Note" text'
+    assert steps[1].sql == 'ALTER TABLE "Loans" ALTER COLUMN "Token" SET DEFAULT gen_random_uuid()'
+    assert steps[2].backfill["where"] == '"Token" IS NULL'
+    assert steps[5].sql == 'ALTER TABLE "Loans" ALTER COLUMN "Token" SET NOT NULL'
+    assert not any(s.blocking for s in steps)
+
+
+def test_plan_alter_constant_default_stays_in_catalog():
+    original, steps = _planner(max_blocking=0).plan_statement(
+        'ALTER TABLE "Loans" ADD COLUMN "Status" int NOT NULL DEFAULT 0')
+    assert original.work == "metadata"
+    assert [s.sql for s in steps] == ['ALTER TABLE "Loans" ADD COLUMN "Status" int NOT NULL DEFAULT 0']
+
+
+def test_merge_steps():
+    prefix = 'ALTER TABLE "Loans"'
+
+    def alter(action, guard=None):
+        return Step("ddl", f"{prefix} {action}", lock="ACCESS EXCLUSIVE", work="metadata", prefix=prefix,
+                    actions=[action], guard=guard)
+
+    merged = merge_steps([alter("ADD COLUMN a int"), alter("ADD COLUMN b int"), Step("query", "SELECT 1"),
+                          alter("ADD COLUMN c int"), alter("ADD CONSTRAINT k CHECK (c > 0)", guard=("SELECT 1", ()))])
+    assert [s.sql for s in merged] == [
+        f"{prefix} ADD COLUMN a int, ADD COLUMN b int",
+        "SELECT 1",
+        f"{prefix} ADD COLUMN c int",
+        f"{prefix} ADD CONSTRAINT k CHECK (c > 0)",
+    ]
+
+
+def test_apply_backfills_seeded_table(scratch_db, tmp_path):
+    dsn = scratch_db("""
+        CREATE TABLE "Loans" ("Id" serial PRIMARY KEY, "Amount" numeric NOT NULL);
+        INSERT INTO "Loans" ("Amount") SELECT g FROM generate_series(1, 12000) g;
+    """)
+    patch = tmp_path / "add-token.sql"
+    patch.write_text('ALTER TABLE "Loans" ADD COLUMN "Token" uuid NOT NULL DEFAULT gen_random_uuid();\n')
+    state = tmp_path / "migrate.json"
+    argv = ["--dsn", dsn, "--state", str(state), "--max-blocking-ms", "0", "--batch-size", "1000",
+            "--pause-ms", "0", "--apply", str(patch)]
+
+    assert main(argv) == 0
+    conn = db.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute('SELECT count(*), count(DISTINCT "Token") FROM "Loans"')
+            assert cur.fetchone() == (12000, 12000)
+            cur.execute("""SELECT is_nullable FROM information_schema.columns
+                           WHERE table_name = 'Loans' AND column_name = 'Token'""")
+            assert cur.fetchone() == ("NO",)
+            cur.execute("SELECT count(*) FROM pg_constraint WHERE conrelid = '\"Loans\"'::regclass AND contype = 'c'")
+            assert cur.fetchone() == (0,)
+    finally:
+        conn.close()
+
+    steps = json.loads(state.read_text())["scripts"][str(patch)]["steps"]
+    backfill = next(s for s in steps.values() if s["kind"] == "backfill")
+    assert backfill["status"] == "ok" and backfill["batches"] > 1
+    assert main(argv) == 0  # already applied: nothing left to do
+
+
+def test_backfill_keeps_literal_percent_signs(scratch_db, tmp_path):
+    dsn = scratch_db("""
+        CREATE TABLE "Loans" ("Id" serial PRIMARY KEY, "Code" text NOT NULL, "Note" text);
+        INSERT INTO "Loans" ("Code") SELECT CASE WHEN g % 3 = 0 THEN 'OLD-' ELSE 'NEW-' END || g
+        FROM generate_series(1, 3000) g;
+    """)
+    patch = tmp_path / "flag-old-loans.sql"
+    patch.write_text("""UPDATE "Loans" SET "Note" = 'taux 100%' WHERE "Code" LIKE 'OLD-%';\n""")
+    state = tmp_path / "migrate.json"
+    assert main(["--dsn", dsn, "--state", str(state), "--max-blocking-ms", "0", "--batch-size", "500",
+                 "--pause-ms", "0", "--apply", str(patch)]) == 0
+
+    steps = json.loads(state.read_text())["scripts"][str(patch)]["steps"]
+    assert [(s["kind"], s["rows"]) for s in steps.values()] == [("backfill", 1000)]
+    conn = db.connect(dsn)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""SELECT "Code" LIKE 'OLD-%', "Note", count(*) FROM "Loans" GROUP BY 1, 2 ORDER BY 1""")
+            assert cur.fetchall() == [(False, None, 2000), (True, "taux 100%", 1000)]
+    finally:
+        conn.close()
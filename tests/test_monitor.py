@@ -0,0 +1,149 @@
+import asyncio
+import json
+import sys
+
+import pytest
+
+from nala_ops.monitor import (
+    DEGRADED, DOWN, UP, Alerts, Monitor, Policy, Series, Target, build_parser, build_targets, render_metrics,
+)
+
+
+def _series(**policy):
+    defaults = dict(window=10, recent=3, baseline=20, fail_threshold=3, max_trend=0.0)
+    return Series(Target("redis", "redis", "redis://localhost:6379", "redis"), Policy(**dict(defaults, **policy)))
+
+
+def _feed(series, latencies, start=0.0, step=1.0):
+    """Record ``latencies`` one second apart; return the state changes."""
+    changes = []
+    for i, latency in enumerate(latencies):
+        changed = series.record(start + i * step, latency, None if latency is not None else "refusé")
+        if changed:
+            changes.append(changed)
+    return changes
+
+
+def test_down_after_consecutive_failures_then_recovers():
+    s = _series(max_error_rate=0.5)
+    assert _feed(s, [0.01] * 5) == []
+    assert _feed(s, [None, None], start=5) == []
+    assert s.state == UP
+    assert _feed(s, [None], start=7) == [(UP, DOWN)]
+    assert s.reason == "3 échecs consécutifs: refusé"
+    assert _feed(s, [0.01], start=8) == [(DOWN, UP)]
+    assert s.failures == 3 and s.probes == 9
+
+
+def test_recovery_waits_for_the_error_rate():
+    s = _series()
+    _feed(s, [None] * 3)
+    # The failures keep the error rate above --max-error-rate until they leave the window
+    assert _feed(s, [0.01] * 10, start=3) == [(DOWN, DEGRADED), (DEGRADED, UP)]
+    assert s.state == UP and s.reason == ""
+
+
+def test_degraded_on_latency_ratio():
+    s = _series()
+    _feed(s, [0.01] * 8)
+    assert _feed(s, [0.2, 0.2], start=8) == [(UP, DEGRADED)]
+    assert s.reason.startswith("médiane récente")
+    assert _feed(s, [0.01, 0.01], start=10) == [(DEGRADED, UP)]
+
+
+def test_degraded_on_error_rate():
+    s = _series(fail_threshold=100)
+    changes = _feed(s, [0.01, None, 0.01, None])
+    assert changes == [(UP, DEGRADED)]
+    assert s.reason == "taux d'erreur 50% sur 4 sondes"
+
+
+def test_degraded_on_latency_trend():
+    s = _series(max_trend=50.0)
+    # +10 ms per second: 600 ms/min, below the 2x ratio against the baseline
+    changes = _feed(s, [0.100 + 0.010 * i for i in range(10)])
+    assert changes == [(UP, DEGRADED)]
+    assert s.reason == "latence en hausse de 600 ms/min"
+
+
+def test_alerts_log_and_on_down_cooldown(tmp_path):
+    log, ran = tmp_path / "alerts.jsonl", tmp_path / "ran.txt"
+    script = tmp_path / "restart.py"
+    script.write_text(f"import sys\nopen({str(ran)!r}, 'a').write(sys.argv[1] + '\\n')\n")
+    alerts = Alerts(str(log), on_down=f"{sys.executable} {script} {{service}}", cooldown=300.0)
+    s = _series()
+
+    async def fail_twice():
+        for start in (0, 10):
+            for previous, _state in _feed(s, [None] * 3, start=start):
+                await alerts.notify(s, previous, None)
+            for previous, _state in _feed(s, [0.01] * 10, start=start + 3):
+                await alerts.notify(s, previous, None)
+
+    asyncio.run(fail_twice())
+    events = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [e["to"] for e in events].count(DOWN) == 2 and events[-1]["to"] == UP
+    assert events[0]["target"] == "redis" and events[0]["service"] == "redis"
+    assert events[0]["reason"] == "3 échecs consécutifs: refusé"
+    # The second outage falls within the cooldown: the service is restarted once
+    assert ran.read_text() == "redis\n"
+    assert alerts.sent == len(events)
+
+
+def test_render_metrics():
+    s = _series()
+    _feed(s, [0.010, 0.020, 0.030, None])
+    text = render_metrics([s])
+    assert text.endswith("\n")
+    lines = set(text.splitlines())
+    assert {
+        'nala_probe_up{target="redis"} 0',
+        'nala_probe_state{target="redis"} 1',  # degraded: 1 failure out of 4
+        'nala_probe_latency_seconds{target="redis",quantile="0.5"} 0.020000',
+        'nala_probe_latency_seconds{target="redis",quantile="0.99"} 0.030000',
+        'nala_probe_latency_seconds_sum{target="redis"} 0.060000',
+        'nala_probe_latency_seconds_count{target="redis"} 3',
+        'nala_probe_failures_total{target="redis"} 1',
+        'nala_probe_trend_ms_per_min{target="redis"} 600.000',
+        "# TYPE nala_probe_latency_seconds summary",
+    } <= lines
+    assert 'nala_probe_trend_ms_per_min{target="redis"} NaN' in render_metrics([_series()])
+
+
+def test_monitor_round_against_standins(tmp_path):
+    aiohttp = pytest.importorskip("aiohttp")
+    from nala_ops.probe_standins import StandIns
+
+    log = tmp_path / "alerts.jsonl"
+
+    async def scenario():
+        healthy, slow = StandIns(), StandIns()
+        options = await healthy.start()
+        options["--redis"] = (await slow.start(http=False))["--redis"]
+        args = build_parser().parse_args([arg for item in options.items() for arg in item])
+        monitor = Monitor(build_targets(args), Policy(window=20, recent=3, baseline=50, max_trend=0.0),
+                          Alerts(str(log)), timeout=2.0)
+        monitor.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=2.0))
+        try:
+            for _ in range(8):
+                results = await monitor.round()
+                assert all(latency is not None for _at, latency, _error in results)
+            slow.delay = 0.15
+            for _ in range(3):
+                await monitor.round()
+            degraded = {s.target.name: s.state for s in monitor.series}
+            slow.delay = 0.0
+            for _ in range(3):
+                await monitor.round()
+            return degraded, {s.target.name: s.state for s in monitor.series}
+        finally:
+            await monitor.session.close()
+            await healthy.close()
+            await slow.close()
+
+    degraded, recovered = asyncio.run(scenario())
+    assert degraded == {"api-admin": UP, "api-admin-db": UP, "api-branch": UP, "api-branch-db": UP,
+                        "postgres": UP, "redis": DEGRADED, "rabbitmq": UP}
+    assert set(recovered.values()) == {UP}
+    events = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [(e["target"], e["from"], e["to"]) for e in events] == [("redis", UP, DEGRADED), ("redis", DEGRADED, UP)]
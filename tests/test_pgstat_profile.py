@@ -0,0 +1,94 @@
+from nala_ops.pgstat_profile import (
+    MARKER, STATEMENT_FIELDS, TABLE_FIELDS, Snapshot, diff, normalize_query, snapshot,
+)
+
+
+def _counters(calls, time_ms, rows=0, hit=0, read=0):
+    return dict(zip(STATEMENT_FIELDS, (calls, time_ms, rows, hit, read)))
+
+
+def _snapshot(taken_at, statements, tables=None):
+    return Snapshot(taken_at, statements, tables or {})
+
+
+def test_normalize_query_collapses_lists():
+    assert normalize_query('SELECT *\n  FROM "Loans" WHERE "Id" IN ($1,  $2, $3)') == \
+        'SELECT * FROM "Loans" WHERE "Id" IN (...)'
+    assert normalize_query('SELECT * FROM t WHERE id IN ($1, $2)') == normalize_query(
+        'SELECT * FROM t WHERE id IN ($1, $2, $3, $4)')
+    assert normalize_query("INSERT INTO t (a, b) VALUES ($1, $2), ($3, $4), ($5, $6)") == \
+        "INSERT INTO t (a, b) VALUES (...), ..."
+    # A single parameter is not a list
+    assert normalize_query("SELECT * FROM t WHERE id = ($1)") == "SELECT * FROM t WHERE id = ($1)"
+
+
+def test_diff_groups_normalized_queries():
+    before = _snapshot(0.0, {(1, 10): ("SELECT 1 WHERE a IN ($1, $2)", _counters(5, 10.0))})
+    after = _snapshot(4.0, {
+        (1, 10): ("SELECT 1 WHERE a IN ($1, $2)", _counters(8, 16.0, hit=3)),
+        (2, 10): ("SELECT 1 WHERE a IN ($1, $2, $3)", _counters(2, 4.0, read=1)),
+    })
+    result = diff(before, after)
+    assert result.seconds == 4.0
+    [query] = result.queries
+    assert query["query"] == "SELECT 1 WHERE a IN (...)"
+    assert (query["calls"], query["time_ms"], query["mean_ms"]) == (5, 10.0, 2.0)
+    assert query["hit_ratio"] == 0.75
+
+
+def test_reset_or_evicted_entry_counts_as_new():
+    before = _snapshot(0.0, {(1, 10): ("SELECT 2", _counters(100, 500.0))},
+                       {"public.t": dict.fromkeys(TABLE_FIELDS, 50)})
+    # pg_stat_statements_reset() or eviction during the run: counters restarted lower
+    after = _snapshot(1.0, {(1, 10): ("SELECT 2", _counters(3, 1.5))},
+                      {"public.t": dict(dict.fromkeys(TABLE_FIELDS, 0), seq_scan=2, seq_tup_read=7)})
+    result = diff(before, after)
+    assert [(q["calls"], q["time_ms"]) for q in result.queries] == [(3, 1.5)]
+    assert [(t["seq_scan"], t["seq_tup_read"]) for t in result.tables] == [(2, 7)]
+
+
+def test_unchanged_entries_are_left_out():
+    statements = {(1, 10): ("SELECT 3", _counters(4, 2.0))}
+    assert diff(_snapshot(0.0, statements), _snapshot(1.0, dict(statements))).queries == []
+
+
+class _Cursor:
+    """Answers the snapshot queries in order, like a server with pg_stat_statements."""
+
+    def __init__(self, statements):
+        self.results = [[(1,)], [(160000,)], statements, [("public.t", 1, 2, 3, 4, 5, 6, 7)]]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, params=None):
+        assert sql.lstrip().startswith(MARKER)
+        self.rows = self.results.pop(0)
+
+    def fetchone(self):
+        return self.rows[0]
+
+    def fetchall(self):
+        return self.rows
+
+
+class _Connection:
+    def __init__(self, statements):
+        self.statements = statements
+
+    def cursor(self):
+        return _Cursor(self.statements)
+
+
+def test_profiler_queries_are_left_out():
+    taken = snapshot(_Connection([
+        (1, 10, 'SELECT * FROM "Loans"', 3, 1.5, 3, 10, 0),
+        (2, 10, f"{MARKER} SELECT 1 FROM pg_extension WHERE extname = $1", 1, 0.1, 1, 1, 0),
+        (3, 10, MARKER + "\n    SELECT s.queryid FROM pg_stat_statements s", 1, 0.2, 5, 2, 0),
+    ]))
+    assert taken.version == 160000
+    assert [query for query, _counters in taken.statements.values()] == ['SELECT * FROM "Loans"']
+    assert taken.tables == {"public.t": dict(zip(TABLE_FIELDS, range(1, 8)))}
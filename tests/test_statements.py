@@ -0,0 +1,42 @@
+import os
+from datetime import date, datetime
+from decimal import Decimal
+
+from nala_ops.statements import check_formats, render_all, statement_paths
+
+
+def _statement(account, when=datetime(2025, 10, 3, 9, 30)):
+    return {
+        "kind": "savings", "account": account, "currency": "HTG", "branch": "Port-au-Prince",
+        "holder": "Marie Joseph", "opening_balance": Decimal("100.00"),
+        "start": date(2025, 10, 1), "end": date(2025, 10, 31),
+        "transactions": [{"date": when, "type": 0, "reference": "R-1", "description": None,
+                          "amount": Decimal("50.00"), "balance": Decimal("150.00")}],
+    }
+
+
+def test_resume_skips_and_overwrite_regenerates(tmp_path):
+    statement = _statement("MJ5380")
+    path = statement_paths(str(tmp_path), statement, ["csv"])["csv"]
+    assert render_all([statement], str(tmp_path), ["csv"], workers=1) == (1, 0, [])
+
+    with open(path, "w") as f:
+        f.write("stale")
+    assert render_all([statement], str(tmp_path), ["csv"], workers=1) == (0, 1, [])
+    assert open(path).read() == "stale"
+
+    assert render_all([statement], str(tmp_path), ["csv"], workers=1, resume=False) == (1, 0, [])
+    assert "MJ5380" in open(path).read()
+
+
+def test_errors_name_the_account(tmp_path):
+    rendered, skipped, errors = render_all([_statement("OK1"), _statement("BAD1", when=None)],
+                                           str(tmp_path), ["csv"], workers=1)
+    assert (rendered, skipped) == (1, 0)
+    assert len(errors) == 1 and errors[0].startswith("savings BAD1: ")
+    assert not os.path.exists(statement_paths(str(tmp_path), _statement("BAD1"), ["csv"])["csv"])
+
+
+def test_check_formats():
+    assert check_formats(["csv"]) is None
+    assert "xls" in check_formats(["csv", "xls"])
@@ -0,0 +1,20 @@
+import re
+
+from nala_ops.checks import ADMIN_ROLES, ROLES
+from nala_ops.superadmin import identity_v3_hash, superadmin_sql
+
+
+def _user_row(sql):
+    insert = re.search(r'INSERT INTO "AspNetUsers" \((?P<columns>.*?)\)\s*VALUES \((?P<values>.*?)\);', sql, re.S)
+    columns = [c.strip().strip('"') for c in insert["columns"].split(",")]
+    values = [v.strip() for v in insert["values"].split(",")]
+    return dict(zip(columns, values))
+
+
+def test_superadmin_gets_the_superadmin_role():
+    row = _user_row(superadmin_sql("o'neil@nalacredit.com", identity_v3_hash("s3cret", b"\0" * 16)))
+    role = int(row["Role"])
+    assert ROLES[role] == "⭐ SuperAdmin"
+    assert role in ADMIN_ROLES  # listed by list-users --admins
+    assert row["Email"] == "'o''neil@nalacredit.com'"
+    assert row["NormalizedEmail"] == "'O''NEIL@NALACREDIT.COM'"
@@ -0,0 +1,77 @@
+import json
+import os
+
+from nala_ops import uploads_scan
+from nala_ops.uploads_scan import Reference, cross_check, main, normalize, refresh_index, walk
+
+
+def _tree(tmp_path):
+    web = tmp_path / "wwwroot" / "uploads"
+    content = tmp_path / "uploads"
+    files = {
+        web / "signatures" / "sig.png": b"signature",
+        content / "customer-documents" / "C1" / "id.pdf": b"piece",
+        content / "microcredit" / "applications" / "A1" / "documents" / "plan.pdf": b"plan",
+        content / "orphan.txt": b"signature",  # same content as sig.png
+    }
+    for path, data in files.items():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    return str(web), str(content)
+
+
+def _scan(roots):
+    indexes, errors = {}, {}
+    for root in roots:
+        indexes[root], _count, _bytes, errors[root] = refresh_index(root, list(walk(root)), {}, 2, 1024)
+    return indexes, errors
+
+
+def test_references_resolve_against_every_root(tmp_path):
+    web, content = _tree(tmp_path)
+    indexes, errors = _scan([web, content])
+    references = [
+        Reference("SavingsCustomers.Signature", "C1", "C1", normalize("http://api/uploads/signatures/sig.png")),
+        Reference("SavingsCustomerDocuments", "1", "C1", normalize("uploads/customer-documents/C1/id.pdf"), 5),
+        Reference("microcredit_application_documents", "2", "A1",
+                  normalize("microcredit/applications/A1/documents/plan.pdf"), 99),
+        Reference("SavingsCustomerDocuments", "3", "C2", normalize("uploads/customer-documents/C2/gone.pdf")),
+    ]
+    result = cross_check(indexes, references, errors)
+    assert [r.id for r in result["missing"]] == ["3"]
+    assert result["unreadable"] == []
+    assert [(r.id, actual) for r, actual in result["size_mismatch"]] == [("2", 4)]
+    assert result["orphans"] == [os.path.join(content, "orphan.txt")]
+    assert result["duplicates"] == [sorted([os.path.join(web, "signatures/sig.png"),
+                                            os.path.join(content, "orphan.txt")])]
+
+
+def test_unhashable_file_is_unreadable_not_missing(tmp_path, monkeypatch):
+    web, content = _tree(tmp_path)
+    hash_file = uploads_scan.hash_file
+
+    def failing(path, chunk_size):
+        if path.endswith("id.pdf"):
+            raise PermissionError(13, "Permission denied", path)
+        return hash_file(path, chunk_size)
+
+    monkeypatch.setattr(uploads_scan, "hash_file", failing)
+    indexes, errors = _scan([web, content])
+    assert list(errors[content]) == ["customer-documents/C1/id.pdf"]
+    result = cross_check(indexes, [Reference("SavingsCustomerDocuments", "1", "C1",
+                                             "customer-documents/C1/id.pdf")], errors)
+    assert result["missing"] == []
+    assert [(r.id, "Permission denied" in error) for r, error in result["unreadable"]] == [("1", True)]
+
+
+def test_main_scans_every_root(tmp_path, monkeypatch):
+    web, content = _tree(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    state, report = tmp_path / "index.json", tmp_path / "report.json"
+    argv = ["--no-db", "--root", web, "--root", content, "--root", str(tmp_path / "absent"),
+            "--state", str(state), "--json", str(report)]
+    assert main(argv) == 0
+    assert sorted(json.loads(state.read_text())["roots"]) == sorted([web, content])
+    assert json.loads(report.read_text())["roots"] == [web, content]
+    assert len(json.loads(report.read_text())["duplicates"]) == 1
+    assert main(["--no-db", "--root", str(tmp_path / "absent"), "--state", str(state)]) == 2